@@ -21,8 +21,13 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from .services.database import init_db, user_manager
 from .services.discrete_socketio import DiscreteSocketManager
-from .services.mqtt import init_mqtt
+from .services.ingest import IngestDispatcher
+from .services.liveness import LivenessTracker
+from .services.mqtt import handle_message, init_mqtt
+from .services.node_registry import NodeRegistry
+from .services.reading_buffer import ReadingBuffer
 from .services.scheduler import init_scheduler
+from .utils.frames import FrameDecoder
 
 mqtt = None
 
@@ -46,6 +51,7 @@ app = FastAPI(
         {"name": "node", "description": "Gestione nodi"},
         {"name": "session", "description": "Gestione delle Sessioni di Lettura"},
         {"name": "alert", "description": "Gestione degli allarmi"},
+        {"name": "ingest", "description": "Stato dell'ingestione dei messaggi MQTT"},
         {"name": "test", "description": "Test"},
     ],
 )
@@ -58,6 +64,11 @@ app.add_middleware(
 )
 
 socketManager = DiscreteSocketManager(app)
+readingBuffer = ReadingBuffer()
+nodeRegistry = NodeRegistry()
+livenessTracker = LivenessTracker()
+ingestDispatcher = IngestDispatcher(handle_message)
+frameDecoder = FrameDecoder()
 
 logger.debug(
     f"List all available loggers: %s",
@@ -84,10 +95,30 @@ async def app_init():
         logger.debug("Loading testing configuration")
         await init_db("mongomock://localhost:27017/test", "test")
 
+    logger.debug("Loading node registry")
+    await nodeRegistry.load()
+
+    logger.debug("Starting ingest workers")
+    ingestDispatcher.start()
+
     logger.debug("Creating default user")
     await user_manager.create_user("foo@bar.com", "baz", "John", "Doe", role="admin")
 
 
+@app.on_event("shutdown")
+async def app_shutdown():
+    logger.debug("Fired 'shutdown' event")
+
+    logger.debug("Draining ingest queues")
+    await ingestDispatcher.stop()
+
+    logger.debug("Flushing pending readings")
+    await readingBuffer.flush()
+
+    logger.debug("Flushing nodes liveness")
+    await livenessTracker.flush()
+
+
 from .routes import main_router
 
 app.include_router(main_router)
@@ -1,5 +1,6 @@
 import logging
 import os
+from typing import Literal
 
 import yaml
 from pydantic import BaseModel
@@ -16,6 +17,15 @@ class AppConfig(BaseModel):
     NODE_TIMEOUT_CHECK_INTERVAL: int
     NODE_TIMEOUT_INTERVAL: int
     ALERT_TRESHOLD: int
+    READING_FLUSH_SIZE: int
+    READING_FLUSH_INTERVAL: int
+    LIVENESS_FLUSH_INTERVAL: int
+    READING_STORAGE: Literal["document", "bucket"] = "document"
+    READING_BUCKET_SIZE: int = 200
+    READING_BUCKET_SECONDS: int = 3600
+    INGEST_WORKERS: int = 8
+    INGEST_QUEUE_SIZE: int = 1000
+    INGEST_OVERFLOW: Literal["block", "drop_newest", "drop_oldest"] = "block"
 
 
 class JwtConfig(BaseModel):
@@ -4,7 +4,7 @@ from beanie import PydanticObjectId
 
 from ..exceptions import NotFoundException
 from ..routes.models import HandlePayload
-from ..services.database import Alert, Node, User
+from ..services.database import Alert, Application, Node, User
 
 
 async def handle_alert(alertID: str, payload: HandlePayload, user: User):
@@ -26,9 +26,50 @@ async def handle_alert(alertID: str, payload: HandlePayload, user: User):
     await node.on_handle()
 
 
-async def get_alert(alert_id: str) -> Alert:
-    alert: Alert | None = await Alert.get(PydanticObjectId(alert_id))
-    if alert is None:
+async def get_alert(alert_id: str) -> Alert.Serialized:
+    alerts = await Alert.serialize_many(
+        {"_id": PydanticObjectId(alert_id)}, strict=True
+    )
+    if len(alerts) == 0:
         raise NotFoundException("Alert")
 
-    return alert
+    return alerts[0]
+
+
+async def get_alerts(
+    applicationID: str,
+    nodeID: int | None = None,
+    isHandled: bool | None = None,
+    start: int | None = None,
+    end: int | None = None,
+) -> list[Alert.Serialized]:
+    from .. import nodeRegistry
+
+    application: Application | None = await Application.get(
+        PydanticObjectId(applicationID)
+    )
+    if application is None:
+        raise NotFoundException("Application")
+
+    if nodeID is None:
+        nodes = [x for x in nodeRegistry.nodes() if x.application == application.id]
+    else:
+        node = nodeRegistry.get(applicationID, nodeID)
+        if node is None:
+            raise NotFoundException("Node")
+
+        nodes = [node]
+
+    match: dict = {"node": {"$in": [x.id for x in nodes]}}
+    if isHandled is not None:
+        match["isHandled"] = isHandled
+
+    raisedAt: dict = {}
+    if start is not None:
+        raisedAt["$gte"] = datetime.fromtimestamp(start)
+    if end is not None:
+        raisedAt["$lte"] = datetime.fromtimestamp(end)
+    if len(raisedAt) > 0:
+        match["raisedAt"] = raisedAt
+
+    return await Alert.serialize_many(match)
@@ -1,7 +1,7 @@
 from beanie.operators import And, Eq
 
 from ..exceptions import NotFoundException
-from ..services.database import Node, Reading
+from ..services.database import AggregatedReading, Node, Reading
 
 
 async def get_session(nodeID: int, sessionID: int | None) -> list[Reading.Aggregated]:
@@ -16,56 +16,22 @@ async def get_session(nodeID: int, sessionID: int | None) -> list[Reading.Aggreg
 
         sessionID = max(sessions_id)
 
-    readings = (
-        await Reading.find(
-            And(Eq(Reading.node, node.id), Eq(Reading.sessionID, sessionID))
+    rows: list[AggregatedReading] = (
+        await AggregatedReading.find(
+            And(
+                Eq(AggregatedReading.node, node.id),
+                Eq(AggregatedReading.sessionID, sessionID),
+            )
         )
-        .aggregate(
-            [
-                {
-                    "$group": {
-                        "_id": {
-                            "readingID": "$readingID",
-                            "canID": "$canID",
-                            "sensor_number": "$sensor_number",
-                        },
-                        "data": {"$addToSet": {"name": "$name", "value": "$value"}},
-                        "published_at": {"$max": "$published_at"},
-                    }
-                },
-                {
-                    "$project": {
-                        "data": {
-                            "$arrayToObject": {
-                                "$zip": {"inputs": ["$data.name", "$data.value"]}
-                            }
-                        },
-                        "published_at": 1,
-                    }
-                },
-                {
-                    "$replaceRoot": {
-                        "newRoot": {
-                            "readingID": "$_id.readingID",
-                            "canID": "$_id.canID",
-                            "sensorNumber": "$_id.sensor_number",
-                            "window1": "$data.w1",
-                            "window2": "$data.w2",
-                            "window3": "$data.w3",
-                            "dangerLevel": "$data.t",
-                            "publishedAt": {"$toLong": "$published_at"},
-                        }
-                    }
-                },
-                {"$addFields": {"nodeID": node.nodeID, "sessionID": sessionID}},
-                {"$sort": {"readingID": 1}},
-            ],
-            projection_model=Reading.Aggregated,
+        .sort(
+            +AggregatedReading.readingID,
+            +AggregatedReading.canID,
+            +AggregatedReading.sensor_number,
         )
         .to_list()
     )
 
-    return readings
+    return [x.serialize(node.nodeID) for x in rows]
 
 
 async def get_sessions_id(nodeID: int) -> list[int]:
@@ -73,6 +39,8 @@ async def get_sessions_id(nodeID: int) -> list[int]:
     if node is None:
         raise NotFoundException("Node")
 
-    sessions_id: list[int] = await Reading.distinct("sessionID", {"node": node.id})
+    sessions_id: list[int] = await AggregatedReading.distinct(
+        "sessionID", {"node": node.id}
+    )
 
     return sessions_id
@@ -4,9 +4,18 @@ import json
 import logging
 from datetime import datetime, timedelta
 
-from beanie import PydanticObjectId
+from beanie import (
+    Delete,
+    Insert,
+    PydanticObjectId,
+    Replace,
+    SaveChanges,
+    Update,
+    after_event,
+)
 from beanie.operators import And, Eq
 from pydantic import BaseModel
+from pymongo import ASCENDING, IndexModel
 
 from ..config import config as Config
 from ..services.database.custom_document import CustomDocument
@@ -22,6 +31,12 @@ class Node(CustomDocument):
     state: NodeState
     lastSeenAt: datetime
 
+    class Settings:
+        indexes = [
+            IndexModel([("application", ASCENDING), ("nodeID", ASCENDING)]),
+            IndexModel([("nodeID", ASCENDING)]),
+        ]
+
     def start_rec(self):
         self._publish("command", "start:0")
 
@@ -70,10 +85,13 @@ class Node(CustomDocument):
         publish(f"{str(self.application)}/{self.nodeID}/{subtopic}", data)
 
     async def just_seen(self) -> bool:
+        from .. import livenessTracker
+
         self.lastSeenAt = datetime.now()
+        livenessTracker.seen(self)
 
+        # Liveness alone gets persisted periodically by the tracker
         if self.state != NodeState.ERROR:
-            await self.save()
             return False
 
         self.state = NodeState.READY
@@ -142,18 +160,43 @@ class Node(CustomDocument):
         ) is not None
 
     def is_timed_out(self) -> bool:
-        return (datetime.now() - self.lastSeenAt) > timedelta(
+        from .. import livenessTracker
+
+        return (datetime.now() - livenessTracker.last_seen(self)) > timedelta(
             seconds=Config.app.NODE_TIMEOUT_INTERVAL
         )
 
+    # Document.update() syncs the instance, so it can be cached as well
+    @after_event([Insert, Replace, SaveChanges, Update])
+    def _on_written(self):
+        from .. import nodeRegistry
+
+        nodeRegistry.put(self)
+
+    @after_event(Delete)
+    def _on_deleted(self):
+        from .. import nodeRegistry
+
+        nodeRegistry.invalidate(self)
+
     @classmethod
     async def from_id(cls, nodeID: int, applicationID: str) -> Node | None:
-        return await cls.find_one(
+        from .. import nodeRegistry
+
+        node = nodeRegistry.get(applicationID, nodeID)
+        if node is not None:
+            return node
+
+        node = await cls.find_one(
             And(
                 Eq(cls.nodeID, nodeID),
                 Eq(cls.application, PydanticObjectId(applicationID)),
             )
         )
+        if node is not None:
+            nodeRegistry.put(node)
+
+        return node
 
     class Serialized(BaseModel):
         nodeID: int
@@ -164,18 +207,36 @@ class Node(CustomDocument):
         unhandledAlertIDs: list[str]
 
     async def serialize(self) -> Node.Serialized:
+        return (await Node.serialize_many([self]))[0]
+
+    @classmethod
+    async def serialize_many(cls, nodes: list[Node]) -> list[Node.Serialized]:
         from ..services.database.models import Alert
 
-        unhandledAlerts = await Alert.find(
-            And(Eq(Alert.node, self.id), Eq(Alert.isHandled, False))
+        # Unhandled alerts of every node in a single query
+        unhandledAlerts = await Alert.aggregate(
+            [
+                {
+                    "$match": {
+                        "node": {"$in": [x.id for x in nodes]},
+                        "isHandled": False,
+                    }
+                },
+                {"$group": {"_id": "$node", "alerts": {"$push": "$_id"}}},
+            ]
         ).to_list()
-        unhandledAlertIDs = [str(x.id) for x in unhandledAlerts]
-
-        return Node.Serialized(
-            nodeID=self.nodeID,
-            nodeName=self.nodeName,
-            application=str(self.application),
-            state=NodeState.to_irma_ui_state(self.state),
-            lastSeenAt=int(self.lastSeenAt.timestamp()),
-            unhandledAlertIDs=unhandledAlertIDs,
-        )
+        unhandledAlertIDs: dict[PydanticObjectId, list[str]] = {
+            x["_id"]: [str(y) for y in x["alerts"]] for x in unhandledAlerts
+        }
+
+        return [
+            Node.Serialized(
+                nodeID=x.nodeID,
+                nodeName=x.nodeName,
+                application=str(x.application),
+                state=NodeState.to_irma_ui_state(x.state),
+                lastSeenAt=int(x.lastSeenAt.timestamp()),
+                unhandledAlertIDs=unhandledAlertIDs.get(x.id, []),
+            )
+            for x in nodes
+        ]
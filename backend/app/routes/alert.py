@@ -1,13 +1,38 @@
 from fastapi import APIRouter, Depends
+from pydantic import BaseModel
 
-from ..controllers.alert import get_alert, handle_alert
+from ..controllers.alert import get_alert, get_alerts, handle_alert
 from ..services.database import Alert, User
-from ..services.jwt import get_user_from_jwt
+from ..services.jwt import get_user_from_jwt, jwt_required
 from .models import HandlePayload
 
 alert_router = APIRouter(prefix="/alert")
 
 
+class GetAlertsResponse(BaseModel):
+    alerts: list[Alert.Serialized]
+
+
+@alert_router.get(
+    "/",
+    dependencies=[Depends(jwt_required)],
+    response_model=GetAlertsResponse,
+    tags=["alert"],
+)
+async def get_alerts_route(
+    applicationID: str,
+    nodeID: int | None = None,
+    isHandled: bool | None = None,
+    start: int | None = None,
+    end: int | None = None,
+):
+    alerts: list[Alert.Serialized] = await get_alerts(
+        applicationID, nodeID, isHandled, start, end
+    )
+
+    return {"alerts": alerts}
+
+
 @alert_router.post("/{alertID}", tags=["alert"])
 async def handle_alert_route(
     alertID: str, payload: HandlePayload, user: User = Depends(get_user_from_jwt)
@@ -23,6 +48,4 @@ async def handle_alert_route(
 
 @alert_router.get("/{alertID}", response_model=Alert.Serialized, tags=["alert"])
 async def get_alert_route(alertID: str):
-    response: Alert = await get_alert(alertID)
-
-    return await response.serialize()
+    return await get_alert(alertID)
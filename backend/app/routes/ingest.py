@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends
+
+from ..services.ingest import IngestDispatcher
+from ..services.jwt import jwt_required
+
+ingest_router = APIRouter(prefix="/ingest")
+
+
+@ingest_router.get(
+    "/metrics",
+    dependencies=[Depends(jwt_required)],
+    response_model=IngestDispatcher.Metrics,
+    tags=["ingest"],
+)
+async def get_ingest_metrics_route():
+    from .. import ingestDispatcher
+
+    return ingestDispatcher.metrics()
@@ -23,7 +23,7 @@ class GetNodesResponse(BaseModel):
 async def get_nodes_route(applicationID: str):
     nodes: list[Node] = await get_nodes(applicationID)
 
-    return {"nodes": [await x.serialize() for x in nodes]}
+    return {"nodes": await Node.serialize_many(nodes)}
 
 
 @node_router.get(
@@ -2,7 +2,16 @@ from beanie import init_beanie
 from mongomock_motor import AsyncMongoMockClient
 from motor.motor_asyncio import AsyncIOMotorClient
 
-from .models import Alert, Application, NodeSettings, Organization, Reading, User
+from .models import (
+    AggregatedReading,
+    Alert,
+    Application,
+    NodeSettings,
+    Organization,
+    Reading,
+    ReadingBucket,
+    User,
+)
 from ...entities.node import Node
 
 
@@ -22,6 +31,8 @@ async def init_db(db_uri: str, db_name: str):
             Node,
             NodeSettings,
             Reading,
+            ReadingBucket,
+            AggregatedReading,
             Alert,
         ],
     )
@@ -0,0 +1,119 @@
+import asyncio
+import sys
+
+from beanie import PydanticObjectId
+from pydantic import BaseModel
+
+from ...entities.node import Node
+from .models import AggregatedReading, Alert, NodeSettings, User
+
+
+class QueryPlan(BaseModel):
+    name: str
+    collection: str
+    stages: list[str]
+    indexes: list[str]
+
+    @property
+    def is_collscan(self) -> bool:
+        return "COLLSCAN" in self.stages
+
+
+def summarize_plan(name: str, collection: str, explained: dict) -> QueryPlan:
+    stages: list[str] = []
+    indexes: list[str] = []
+
+    def walk(stage: dict):
+        stages.append(stage["stage"])
+        if "indexName" in stage:
+            indexes.append(stage["indexName"])
+
+        for child in stage.get("inputStages", []) + [
+            stage[x] for x in ["inputStage", "queryPlan"] if x in stage
+        ]:
+            walk(child)
+
+    walk(explained["queryPlanner"]["winningPlan"])
+
+    return QueryPlan(name=name, collection=collection, stages=stages, indexes=indexes)
+
+
+async def explain_queries() -> list[QueryPlan]:
+    # Placeholder values: the plan doesn't depend on them
+    node_id = PydanticObjectId()
+    application_id = PydanticObjectId()
+
+    queries = [
+        (
+            "Node.from_id",
+            Node,
+            {"nodeID": 1, "application": application_id},
+            None,
+        ),
+        ("Node by nodeID", Node, {"nodeID": 1}, None),
+        ("get_nodes", Node, {"application": application_id}, None),
+        (
+            "get_session",
+            AggregatedReading,
+            {"node": node_id, "sessionID": 1},
+            [("readingID", 1), ("canID", 1), ("sensor_number", 1)],
+        ),
+        (
+            "unhandled alerts",
+            Alert,
+            {"node": {"$in": [node_id]}, "isHandled": False},
+            None,
+        ),
+        ("alert upsert", Alert, {"sessionID": 1, "isHandled": False}, None),
+        ("node settings", NodeSettings, {"node": node_id}, None),
+        ("user by email", User, {"email": "foo@bar.com"}, None),
+    ]
+
+    plans: list[QueryPlan] = []
+
+    for name, document, query, sort in queries:
+        collection = document.get_motor_collection()
+        cursor = collection.find(query)
+        if sort is not None:
+            cursor = cursor.sort(sort)
+
+        plans.append(summarize_plan(name, collection.name, await cursor.explain()))
+
+    # get_sessions_id
+    collection = AggregatedReading.get_motor_collection()
+    explained = await collection.database.command(
+        {
+            "explain": {
+                "distinct": collection.name,
+                "key": "sessionID",
+                "query": {"node": node_id},
+            },
+            "verbosity": "queryPlanner",
+        }
+    )
+    plans.append(summarize_plan("get_sessions_id", collection.name, explained))
+
+    return plans
+
+
+async def main() -> int:
+    from ...config import config as Config
+    from . import init_db
+
+    # Declared indexes get created by init_beanie
+    await init_db(Config.mongo.uri, Config.mongo.db)
+
+    plans = await explain_queries()
+
+    for plan in plans:
+        print(
+            f"{'COLLSCAN' if plan.is_collscan else 'OK':8} "
+            f"{plan.collection}: {plan.name} -> "
+            f"{' < '.join(plan.stages)} {plan.indexes}"
+        )
+
+    return 1 if any(x.is_collscan for x in plans) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
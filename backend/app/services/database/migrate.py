@@ -0,0 +1,104 @@
+import argparse
+import asyncio
+import sys
+from typing import AsyncIterator
+
+from ...config import config as Config
+from .models import AggregatedReading, Reading, ReadingBucket
+
+
+async def iter_readings() -> AsyncIterator[Reading]:
+    if Config.app.READING_STORAGE == "bucket":
+        async for bucket in ReadingBucket.find_all():
+            for reading in bucket.readings():
+                yield reading
+    else:
+        async for reading in Reading.find_all():
+            yield reading
+
+
+async def rebuild_aggregated_readings(batch_size: int) -> int:
+    # Upserts are idempotent, it's safe to run it on a live database
+    count = 0
+    batch: list[Reading] = []
+
+    async for reading in iter_readings():
+        batch.append(reading)
+
+        if len(batch) >= batch_size:
+            await AggregatedReading.upsert_readings(batch)
+            count += len(batch)
+            batch = []
+
+    await AggregatedReading.upsert_readings(batch)
+    count += len(batch)
+
+    return count
+
+
+async def move_readings_to_buckets(batch_size: int, delete: bool) -> int:
+    count = 0
+    batch: list[Reading] = []
+
+    async def flush(batch: list[Reading]) -> int:
+        ids = [x.id for x in batch]
+
+        # Skip readings already moved by an interrupted run
+        moved = set()
+        async for bucket in ReadingBucket.find({"ids": {"$in": ids}}):
+            moved.update(bucket.ids)
+        # Buckets also hold readings of other batches
+        moved &= set(ids)
+
+        await ReadingBucket.push_readings([x for x in batch if x.id not in moved])
+
+        if delete:
+            await Reading.find({"_id": {"$in": ids}}).delete()
+
+        return len(batch) - len(moved)
+
+    # _id order follows insertion, hence published_at, order
+    async for reading in Reading.find_all().sort("_id"):
+        batch.append(reading)
+
+        if len(batch) >= batch_size:
+            count += await flush(batch)
+            batch = []
+
+    if len(batch) > 0:
+        count += await flush(batch)
+
+    return count
+
+
+async def main(args: argparse.Namespace) -> int:
+    from . import init_db
+
+    await init_db(Config.mongo.uri, Config.mongo.db)
+
+    if args.command == "aggregated-readings":
+        count = await rebuild_aggregated_readings(args.batch_size)
+        print(f"Aggregated {count} readings")
+
+    elif args.command == "buckets":
+        count = await move_readings_to_buckets(args.batch_size, args.delete)
+        print(f"Moved {count} readings to buckets")
+
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="IRMA database migrations")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser(
+        "aggregated-readings", help="Build AggregatedReading rows from Readings"
+    )
+    buckets = subparsers.add_parser(
+        "buckets", help="Move Reading documents to ReadingBuckets"
+    )
+    buckets.add_argument(
+        "--delete", action="store_true", help="Delete the moved Reading documents"
+    )
+
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -1,15 +1,20 @@
 from __future__ import annotations
 
-from datetime import datetime
+import logging
+from datetime import datetime, timedelta, timezone
 from typing import Literal
 
 from beanie import Indexed, PydanticObjectId
 from pydantic import BaseModel, Field
+from pymongo import ASCENDING, DESCENDING, IndexModel, UpdateOne
 
+from ...config import config as Config
 from ...exceptions import NotFoundException
 from ...models.node_settings import DetectorSettings
 from .custom_document import CustomDocument
 
+logger = logging.getLogger(__name__)
+
 
 class Organization(CustomDocument):
     organizationName: str
@@ -48,6 +53,9 @@ class User(CustomDocument):
     last_name: str
     role: str = "standard"
 
+    class Settings:
+        indexes = [IndexModel([("email", ASCENDING)])]
+
     class Serialized(BaseModel):
         id: str
         email: str
@@ -72,6 +80,9 @@ class NodeSettings(CustomDocument):
     d3: DetectorSettings | None = None
     d4: DetectorSettings | None = None
 
+    class Settings:
+        indexes = [IndexModel([("node", ASCENDING)])]
+
     class Serialized(BaseModel):
         d1: DetectorSettings | None
         d2: DetectorSettings | None
@@ -98,6 +109,26 @@ class Reading(CustomDocument):
     value: int = 0
     published_at: datetime
 
+    class Settings:
+        indexes = [
+            # (node, sessionID) lookups sorted by readingID
+            IndexModel(
+                [
+                    ("node", ASCENDING),
+                    ("sessionID", ASCENDING),
+                    ("readingID", ASCENDING),
+                ]
+            ),
+        ]
+
+    @classmethod
+    async def find_by_id(cls, id: PydanticObjectId) -> Reading | None:
+        if Config.app.READING_STORAGE == "bucket":
+            bucket = await ReadingBucket.find_one(ReadingBucket.ids == id)
+            return bucket.get_reading(id) if bucket is not None else None
+
+        return await cls.get(id)
+
     class Aggregated(BaseModel):
         nodeID: int
         canID: int
@@ -111,6 +142,204 @@ class Reading(CustomDocument):
         publishedAt: int
 
 
+# Bucket of the Readings of a (node, sessionID, canID, sensor_number)
+# sensor, stored as parallel arrays. A bucket holds up to
+# READING_BUCKET_SIZE samples published within READING_BUCKET_SECONDS.
+class ReadingBucket(CustomDocument):
+    node: PydanticObjectId
+    sessionID: int
+    canID: int
+    sensor_number: int
+    start: datetime
+    samples: int = 0
+
+    ids: list[PydanticObjectId] = []
+    readingIDs: list[int] = []
+    names: list[str] = []
+    values: list[int] = []
+    published_at: list[datetime] = []
+
+    class Settings:
+        indexes = [
+            IndexModel(
+                [
+                    ("node", ASCENDING),
+                    ("sessionID", ASCENDING),
+                    ("canID", ASCENDING),
+                    ("sensor_number", ASCENDING),
+                    ("start", ASCENDING),
+                ]
+            ),
+            # Reading.find_by_id
+            IndexModel([("ids", ASCENDING)]),
+        ]
+
+    @classmethod
+    async def push_readings(cls, readings: list[Reading]):
+        size = Config.app.READING_BUCKET_SIZE
+        seconds = timedelta(seconds=Config.app.READING_BUCKET_SECONDS)
+
+        sensors: dict[tuple, list[Reading]] = {}
+        for x in readings:
+            key = (x.node, x.sessionID, x.canID, x.sensor_number)
+            sensors.setdefault(key, []).append(x)
+
+        requests: list[UpdateOne] = []
+
+        for (node, sessionID, canID, sensor_number), sensor_readings in sensors.items():
+            for i in range(0, len(sensor_readings), size):
+                chunk = sensor_readings[i : i + size]
+                start = chunk[0].published_at
+
+                # Push in the open bucket, if there's room left,
+                # otherwise the upsert creates a new one
+                requests.append(
+                    UpdateOne(
+                        {
+                            "node": node,
+                            "sessionID": sessionID,
+                            "canID": canID,
+                            "sensor_number": sensor_number,
+                            "samples": {"$lte": size - len(chunk)},
+                            "start": {"$gt": start - seconds},
+                        },
+                        {
+                            "$push": {
+                                "ids": {"$each": [x.id for x in chunk]},
+                                "readingIDs": {"$each": [x.readingID for x in chunk]},
+                                "names": {"$each": [x.name for x in chunk]},
+                                "values": {"$each": [x.value for x in chunk]},
+                                "published_at": {
+                                    "$each": [x.published_at for x in chunk]
+                                },
+                            },
+                            "$inc": {"samples": len(chunk)},
+                            "$setOnInsert": {"start": start},
+                        },
+                        upsert=True,
+                    )
+                )
+
+        if len(requests) == 0:
+            return
+
+        # Chunks of the same sensor must be pushed in order
+        await cls.get_motor_collection().bulk_write(requests, ordered=True)
+
+    def _reading(self, i: int) -> Reading:
+        return Reading(
+            id=self.ids[i],
+            node=self.node,
+            canID=self.canID,
+            sensor_number=self.sensor_number,
+            readingID=self.readingIDs[i],
+            sessionID=self.sessionID,
+            name=self.names[i],
+            value=self.values[i],
+            published_at=self.published_at[i],
+        )
+
+    def get_reading(self, id: PydanticObjectId) -> Reading | None:
+        if id not in self.ids:
+            return None
+
+        return self._reading(self.ids.index(id))
+
+    def readings(self) -> list[Reading]:
+        return [self._reading(i) for i in range(len(self.ids))]
+
+
+# Pre-aggregated session row: holds every value of a (readingID, canID,
+# sensor_number) reading, it's upserted on ingest so that get_session
+# doesn't have to group raw Readings.
+class AggregatedReading(CustomDocument):
+    node: PydanticObjectId
+    sessionID: int
+    readingID: int
+    canID: int
+    sensor_number: int
+
+    w1: int = 0
+    w2: int = 0
+    w3: int = 0
+    t: int = 0
+    published_at: datetime
+
+    class Settings:
+        indexes = [
+            IndexModel(
+                [
+                    ("node", ASCENDING),
+                    ("sessionID", ASCENDING),
+                    ("readingID", ASCENDING),
+                    ("canID", ASCENDING),
+                    ("sensor_number", ASCENDING),
+                ],
+                unique=True,
+            ),
+        ]
+
+    @classmethod
+    async def upsert_readings(cls, readings: list[Reading]):
+        rows: dict[tuple, dict] = {}
+
+        # Merge readings belonging to the same row in a single update
+        for x in readings:
+            key = (x.node, x.sessionID, x.readingID, x.canID, x.sensor_number)
+
+            row = rows.setdefault(
+                key,
+                {
+                    "filter": {
+                        "node": x.node,
+                        "sessionID": x.sessionID,
+                        "readingID": x.readingID,
+                        "canID": x.canID,
+                        "sensor_number": x.sensor_number,
+                    },
+                    "values": {},
+                    "published_at": x.published_at,
+                },
+            )
+            row["values"][x.name] = x.value
+            row["published_at"] = max(row["published_at"], x.published_at)
+
+        if len(rows) == 0:
+            return
+
+        await cls.get_motor_collection().bulk_write(
+            [
+                UpdateOne(
+                    row["filter"],
+                    {
+                        "$set": row["values"],
+                        "$max": {"published_at": row["published_at"]},
+                    },
+                    upsert=True,
+                )
+                for row in rows.values()
+            ],
+            ordered=False,
+        )
+
+    def serialize(self, nodeID: int) -> Reading.Aggregated:
+        return Reading.Aggregated(
+            nodeID=nodeID,
+            canID=self.canID,
+            sensorNumber=self.sensor_number,
+            sessionID=self.sessionID,
+            readingID=self.readingID,
+            window1=self.w1,
+            window2=self.w2,
+            window3=self.w3,
+            dangerLevel=self.t,
+            # Stored as naive UTC, like $toLong read it
+            publishedAt=int(
+                self.published_at.replace(tzinfo=timezone.utc).timestamp() * 1000
+            ),
+        )
+
+
 class Alert(CustomDocument):
     reading: PydanticObjectId
     node: PydanticObjectId
@@ -122,6 +351,10 @@ class Alert(CustomDocument):
     handledAt: datetime | None = None
     handleNote: str = ""
 
+    class Settings:
+        # (sessionID, isHandled) queries are covered by the unique sessionID
+        indexes = [IndexModel([("node", ASCENDING), ("isHandled", ASCENDING)])]
+
     class Serialized(BaseModel):
         id: str
         nodeID: int
@@ -131,21 +364,97 @@ class Alert(CustomDocument):
         raisedAt: int
 
     async def serialize(self) -> Alert.Serialized:
+        return (await Alert.serialize_many({"_id": self.id}, strict=True))[0]
+
+    # Serializes the Alerts matching the filter with a single aggregation,
+    # joining their Node and Reading with $lookup. Alerts whose Node or
+    # Reading is missing are skipped, or raise NotFoundException if strict
+    @classmethod
+    async def serialize_many(
+        cls, match: dict, strict: bool = False
+    ) -> list[Alert.Serialized]:
         from . import Node
 
-        node = await Node.get(self.node)
-        if node is None:
-            raise NotFoundException("Node")
+        pipeline: list[dict] = [
+            {"$match": match},
+            {"$sort": {"raisedAt": DESCENDING}},
+            {
+                "$lookup": {
+                    "from": Node.get_motor_collection().name,
+                    "localField": "node",
+                    "foreignField": "_id",
+                    "as": "nodes",
+                }
+            },
+            {
+                "$lookup": {
+                    "from": Reading.get_motor_collection().name,
+                    "localField": "reading",
+                    "foreignField": "_id",
+                    "as": "readings",
+                }
+            },
+        ]
+        # Alerts raised before switching to buckets still point to Readings
+        if Config.app.READING_STORAGE == "bucket":
+            pipeline.append(
+                {
+                    "$lookup": {
+                        "from": ReadingBucket.get_motor_collection().name,
+                        "localField": "reading",
+                        "foreignField": "ids",
+                        "as": "buckets",
+                    }
+                }
+            )
+        pipeline.append(
+            {
+                "$project": {
+                    "reading": 1,
+                    "sessionID": 1,
+                    "raisedAt": 1,
+                    "nodes.nodeID": 1,
+                    "readings.readingID": 1,
+                    "readings.canID": 1,
+                    "buckets.canID": 1,
+                    "buckets.ids": 1,
+                    "buckets.readingIDs": 1,
+                }
+            }
+        )
 
-        reading = await Reading.get(self.reading)
-        if reading is None:
-            raise NotFoundException("Reading")
+        serialized: list[Alert.Serialized] = []
 
-        return Alert.Serialized(
-            id=str(self.id),
-            nodeID=node.nodeID,
-            sessionID=self.sessionID,
-            readingID=reading.readingID,
-            canID=reading.canID,
-            raisedAt=int(self.raisedAt.timestamp()),
-        )
+        for x in await cls.aggregate(pipeline).to_list():
+            missing = None
+            if len(x["nodes"]) == 0:
+                missing = "Node"
+            elif len(x["readings"]) > 0:
+                readingID = x["readings"][0]["readingID"]
+                canID = x["readings"][0]["canID"]
+            elif len(x.get("buckets", [])) > 0:
+                bucket = x["buckets"][0]
+                readingID = bucket["readingIDs"][bucket["ids"].index(x["reading"])]
+                canID = bucket["canID"]
+            else:
+                missing = "Reading"
+
+            if missing is not None:
+                if strict:
+                    raise NotFoundException(missing)
+
+                logger.warning("Skipping alert %s, %s not found", x["_id"], missing)
+                continue
+
+            serialized.append(
+                Alert.Serialized(
+                    id=str(x["_id"]),
+                    nodeID=x["nodes"][0]["nodeID"],
+                    sessionID=x["sessionID"],
+                    readingID=readingID,
+                    canID=canID,
+                    raisedAt=int(x["raisedAt"].timestamp()),
+                )
+            )
+
+        return serialized
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import statistics
+import time
+import zlib
+from collections import deque
+from typing import Awaitable, Callable
+
+from pydantic import BaseModel
+
+from ..config import config as Config
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[str, int, str, bytes], Awaitable[None]]
+
+# Latency samples kept for the metrics percentiles
+LATENCY_SAMPLES = 1000
+
+
+class IngestMessage(BaseModel):
+    applicationID: str
+    nodeID: int
+    topic: str
+    payload: bytes
+    enqueuedAt: float
+
+
+# Dispatches the MQTT messages onto a fixed pool of bounded worker queues.
+# Messages are hashed by (applicationID, nodeID), so a Node's messages are
+# handled in order while different Nodes are handled concurrently.
+# When a queue is full INGEST_OVERFLOW decides what happens:
+#   "block": wait for room, slowing down the MQTT client
+#   "drop_newest": discard the incoming message
+#   "drop_oldest": discard the oldest queued message
+class IngestDispatcher:
+    class Metrics(BaseModel):
+        workers: int
+        depth: list[int]
+        received: int
+        processed: int
+        failed: int
+        dropped: int
+        waitP50: float
+        waitP95: float
+        processingP50: float
+        processingP95: float
+        processingMax: float
+
+    def __init__(self, handler: Handler):
+        self._handler = handler
+        self._workers_count = Config.app.INGEST_WORKERS
+        self._queue_size = Config.app.INGEST_QUEUE_SIZE
+        self._overflow = Config.app.INGEST_OVERFLOW
+
+        self._queues: list[asyncio.Queue[IngestMessage]] = []
+        self._workers: list[asyncio.Task] = []
+
+        self._received = 0
+        self._processed = 0
+        self._failed = 0
+        self._dropped = 0
+        self._wait: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self._processing: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+    @property
+    def running(self) -> bool:
+        return len(self._workers) > 0
+
+    def start(self):
+        if self.running:
+            return
+
+        self._queues = [
+            asyncio.Queue(maxsize=self._queue_size) for _ in range(self._workers_count)
+        ]
+        self._workers = [asyncio.create_task(self._work(x)) for x in self._queues]
+
+        logger.info("Started %s ingest workers", self._workers_count)
+
+    async def stop(self):
+        if not self.running:
+            return
+
+        # Let the workers handle what's already queued
+        for queue in self._queues:
+            await queue.join()
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+        self._workers = []
+        self._queues = []
+
+    def _queue(self, applicationID: str, nodeID: int) -> asyncio.Queue[IngestMessage]:
+        # crc32 is stable across restarts, unlike str hashes
+        key = zlib.crc32(f"{applicationID}/{nodeID}".encode())
+        return self._queues[key % len(self._queues)]
+
+    async def submit(self, applicationID: str, nodeID: int, topic: str, payload: bytes):
+        if not self.running:
+            self.start()
+
+        self._received += 1
+
+        message = IngestMessage(
+            applicationID=applicationID,
+            nodeID=nodeID,
+            topic=topic,
+            payload=payload,
+            enqueuedAt=time.perf_counter(),
+        )
+        queue = self._queue(applicationID, nodeID)
+
+        if self._overflow == "block":
+            await queue.put(message)
+            return
+
+        if queue.full():
+            self._dropped += 1
+
+            if self._overflow == "drop_newest":
+                logger.warning(
+                    "Ingest queue full, dropped message of node %s/%s",
+                    applicationID,
+                    nodeID,
+                )
+                return
+
+            dropped = queue.get_nowait()
+            queue.task_done()
+            logger.warning(
+                "Ingest queue full, dropped oldest message of node %s/%s",
+                dropped.applicationID,
+                dropped.nodeID,
+            )
+
+        queue.put_nowait(message)
+
+    async def _work(self, queue: asyncio.Queue[IngestMessage]):
+        while True:
+            message = await queue.get()
+            started = time.perf_counter()
+            self._wait.append((started - message.enqueuedAt) * 1000)
+
+            try:
+                await self._handler(
+                    message.applicationID,
+                    message.nodeID,
+                    message.topic,
+                    message.payload,
+                )
+                self._processed += 1
+            except Exception:
+                self._failed += 1
+                logger.exception(
+                    "Failed to handle '%s' of node %s/%s",
+                    message.topic,
+                    message.applicationID,
+                    message.nodeID,
+                )
+            finally:
+                self._processing.append((time.perf_counter() - started) * 1000)
+                queue.task_done()
+
+    @staticmethod
+    def _percentile(samples: deque[float], n: int) -> float:
+        if len(samples) < 2:
+            return samples[0] if len(samples) > 0 else 0
+
+        return statistics.quantiles(samples, n=100)[n - 1]
+
+    def metrics(self) -> IngestDispatcher.Metrics:
+        return IngestDispatcher.Metrics(
+            workers=len(self._workers),
+            depth=[x.qsize() for x in self._queues],
+            received=self._received,
+            processed=self._processed,
+            failed=self._failed,
+            dropped=self._dropped,
+            waitP50=self._percentile(self._wait, 50),
+            waitP95=self._percentile(self._wait, 95),
+            processingP50=self._percentile(self._processing, 50),
+            processingP95=self._percentile(self._processing, 95),
+            processingMax=max(self._processing, default=0),
+        )
@@ -0,0 +1,56 @@
+import logging
+from datetime import datetime
+
+from beanie import PydanticObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from ..entities.node import Node
+
+logger = logging.getLogger(__name__)
+
+
+# In-memory table of the Nodes' lastSeenAt. Keepalives and readings only
+# touch the table, the 'flush_liveness' job writes the changed entries
+# to Mongo with a single bulk of $set.
+class LivenessTracker:
+    def __init__(self):
+        self._last_seen: dict[PydanticObjectId, datetime] = {}
+        self._dirty: set[PydanticObjectId] = set()
+
+    def seen(self, node: Node):
+        # Not yet inserted nodes will get lastSeenAt on their first save
+        if node.id is None:
+            return
+
+        self._last_seen[node.id] = node.lastSeenAt
+        self._dirty.add(node.id)
+
+    def last_seen(self, node: Node) -> datetime:
+        if node.id is None:
+            return node.lastSeenAt
+
+        return self._last_seen.get(node.id, node.lastSeenAt)
+
+    async def flush(self):
+        dirty, self._dirty = self._dirty, set()
+
+        if len(dirty) == 0:
+            return
+
+        logger.debug("Flushing lastSeenAt of %s nodes", len(dirty))
+
+        try:
+            await Node.get_motor_collection().bulk_write(
+                [
+                    UpdateOne({"_id": x}, {"$set": {"lastSeenAt": self._last_seen[x]}})
+                    for x in dirty
+                ],
+                ordered=False,
+            )
+        except BulkWriteError as error:
+            logger.error("Failed to flush lastSeenAt: %s", error.details)
+        except Exception:
+            # Nothing was written, keep the entries for the next flush
+            self._dirty |= dirty
+            raise
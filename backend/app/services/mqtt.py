@@ -1,4 +1,3 @@
-import json
 import logging
 import re
 from datetime import datetime
@@ -8,9 +7,8 @@ from fastapi_mqtt import FastMQTT, MQTTConfig
 
 from ..config import MQTTConfig as MQTTConfigInternal
 from ..entities.node import Node
-from ..models.payload import ReadingPayload
 from ..utils.enums import NodeState
-from ..utils.payload import handle_payload
+from ..utils.payload import handle_payload, handle_window_reading
 
 logger = logging.getLogger(__name__)
 
@@ -51,9 +49,9 @@ def init_mqtt(conf: MQTTConfigInternal) -> FastMQTT:
 
     @mqtt.on_message()
     async def on_message(client, topic: str, payload: bytes, qos, properties):
-        from .. import socketManager
+        from .. import ingestDispatcher
 
-        logger.debug(f"Someone published '{payload.decode()}' on '{topic}'")
+        logger.debug(f"Someone published '{payload!r}' on '{topic}'")
 
         topic_sliced = topic.split("/")
 
@@ -61,74 +59,88 @@ def init_mqtt(conf: MQTTConfigInternal) -> FastMQTT:
             applicationID = topic_sliced[0]
             nodeID = topic_sliced[1]
             topic = topic_sliced[2]
-            value = payload.decode()
 
             if not nodeID.isnumeric():
                 logger.error("nodeID '%s' is not parsable", nodeID)
                 return
 
-            nodeID = int(nodeID)
+            await ingestDispatcher.submit(applicationID, int(nodeID), topic, payload)
 
-            node: Node | None = await Node.from_id(nodeID, applicationID)
+        except IndexError as error:
+            logger.error("Invalid topic '{%s}': {%s}", topic, error)
 
-            if topic == "status" and re.match("^launch:.+", value):
-                if node is None:
-                    node = Node(
-                        nodeID=int(nodeID),
-                        application=PydanticObjectId(applicationID),
-                        nodeName=value.split(":")[1],
-                        state=NodeState.READY,
-                        lastSeenAt=datetime.now(),
-                    )
+    return mqtt
 
-                await node.just_seen()
-                await node.on_launch()
 
-                socketManager.emit("change-node")
-                return
+# Handles a message of a Node, called by the ingest dispatcher workers
+async def handle_message(applicationID: str, nodeID: int, topic: str, payload: bytes):
+    from .. import frameDecoder, socketManager
 
-            if node is None:
-                logger.info(
-                    "Detected unregistered Node '{%s}', applicationID '{%s}'. \
-                     Restart it to get it registered",
-                    nodeID,
-                    applicationID,
-                )
-                return
+    value = payload.decode() if topic == "status" else ""
 
-            changed: bool = False
-            await node.just_seen()
+    node: Node | None = await Node.from_id(nodeID, applicationID)
 
-            if topic == "status":
-                if value == "start":
-                    await node.on_start_rec()
-                    changed = True
+    if topic == "status" and re.match("^launch:.+", value):
+        if node is None:
+            node = Node(
+                nodeID=int(nodeID),
+                application=PydanticObjectId(applicationID),
+                nodeName=value.split(":")[1],
+                state=NodeState.READY,
+                lastSeenAt=datetime.now(),
+            )
 
-                elif value == "stop":
-                    await node.on_stop_rec()
-                    changed = True
+        await node.just_seen()
+        await node.on_launch()
 
-                elif value == "keepalive":
-                    pass
+        socketManager.emit("change-node")
+        return
 
-                else:
-                    logger.error(
-                        "Invalid value '{%s}' for sub-topic '{%s}'", value, topic
-                    )
-            elif topic == "payload":
-                data_dict = json.loads(value)
-                reading_payload: ReadingPayload = ReadingPayload.parse_obj(data_dict)
+    if node is None:
+        logger.info(
+            "Detected unregistered Node '{%s}', applicationID '{%s}'. \
+             Restart it to get it registered",
+            nodeID,
+            applicationID,
+        )
+        return
 
-                await handle_payload(node, reading_payload)
-                socketManager.emit("change-reading")
+    changed: bool = False
+    await node.just_seen()
 
-            else:
-                logger.error("Invalid sub-topic '{%s}'", topic)
+    if topic == "status":
+        if value == "start":
+            await node.on_start_rec()
+            changed = True
 
-            if changed:
-                socketManager.emit("change-node")
+        elif value == "stop":
+            await node.on_stop_rec()
+            changed = True
 
-        except IndexError as error:
-            logger.error("Invalid topic '{%s}': {%s}", topic, error)
+        elif value == "keepalive":
+            pass
 
-    return mqtt
+        else:
+            logger.error("Invalid value '{%s}' for sub-topic '{%s}'", value, topic)
+    elif topic == "payload":
+        try:
+            reading_payloads, carried = frameDecoder.decode(
+                applicationID, nodeID, payload
+            )
+        except ValueError as error:
+            logger.error("Invalid payload '%s': %s", payload, error)
+            return
+
+        for reading_payload in reading_payloads:
+            await handle_payload(node, reading_payload)
+
+        # Unchanged readings of a delta frame only fill the aggregated
+        # series, the Node was already updated by the received ones
+        for reading_payload in carried:
+            await handle_window_reading(node, reading_payload, store=False)
+
+    else:
+        logger.error("Invalid sub-topic '{%s}'", topic)
+
+    if changed:
+        socketManager.emit("change-node")
@@ -0,0 +1,37 @@
+import logging
+
+from ..entities.node import Node
+
+logger = logging.getLogger(__name__)
+
+
+# In-memory registry of the known Nodes, keyed by (applicationID, nodeID).
+# It's loaded at startup and kept in sync by Node's document events.
+class NodeRegistry:
+    def __init__(self):
+        self._nodes: dict[tuple[str, int], Node] = {}
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    @staticmethod
+    def _key(applicationID: str, nodeID: int) -> tuple[str, int]:
+        return (str(applicationID), int(nodeID))
+
+    async def load(self):
+        nodes: list[Node] = await Node.find_all().to_list()
+        self._nodes = {self._key(str(x.application), x.nodeID): x for x in nodes}
+
+        logger.info("Loaded %s nodes in registry", len(self._nodes))
+
+    def nodes(self) -> list[Node]:
+        return list(self._nodes.values())
+
+    def get(self, applicationID: str, nodeID: int) -> Node | None:
+        return self._nodes.get(self._key(applicationID, nodeID))
+
+    def put(self, node: Node):
+        self._nodes[self._key(str(node.application), node.nodeID)] = node
+
+    def invalidate(self, node: Node):
+        self._nodes.pop(self._key(str(node.application), node.nodeID), None)
@@ -0,0 +1,82 @@
+import logging
+
+from beanie import PydanticObjectId
+from pymongo.errors import BulkWriteError
+
+from ..config import config as Config
+from .database import AggregatedReading, Reading, ReadingBucket
+
+logger = logging.getLogger(__name__)
+
+
+# Write-behind buffer for Readings: they get inserted with a single
+# unordered insert_many once READING_FLUSH_SIZE is reached, or when
+# the periodic 'flush_readings' job fires, whichever comes first.
+# Each flush also upserts the matching AggregatedReading rows, readings
+# added with store=False only update the AggregatedReading rows. A
+# batch that couldn't be written is put back at the head of the buffer.
+class ReadingBuffer:
+    def __init__(self):
+        self._flush_size = Config.app.READING_FLUSH_SIZE
+        self._readings: list[Reading] = []
+        self._aggregate_only: list[Reading] = []
+
+    def __len__(self) -> int:
+        return len(self._readings) + len(self._aggregate_only)
+
+    async def add(self, reading: Reading, store: bool = True):
+        # Assign the id client-side, so the reading can be referenced
+        # (e.g. by an Alert) before it gets flushed
+        if reading.id is None:
+            reading.id = PydanticObjectId()
+
+        if store:
+            self._readings.append(reading)
+        else:
+            self._aggregate_only.append(reading)
+
+        if len(self) >= self._flush_size:
+            await self.flush()
+
+    async def flush(self):
+        from .. import socketManager
+
+        # Swap the buffer before awaiting, readings added while
+        # inserting will end up in the next batch
+        readings, self._readings = self._readings, []
+        aggregate_only, self._aggregate_only = self._aggregate_only, []
+
+        if len(readings) == 0 and len(aggregate_only) == 0:
+            return
+
+        logger.debug(
+            "Flushing %s readings, %s aggregate only",
+            len(readings),
+            len(aggregate_only),
+        )
+
+        try:
+            if len(readings) == 0:
+                pass
+            elif Config.app.READING_STORAGE == "bucket":
+                await ReadingBucket.push_readings(readings)
+            else:
+                await Reading.insert_many(readings, ordered=False)
+        except BulkWriteError as error:
+            logger.error("Failed to flush readings: %s", error.details)
+        except Exception:
+            # Nothing was written, keep the batch for the next flush
+            self._readings = readings + self._readings
+            self._aggregate_only = aggregate_only + self._aggregate_only
+            raise
+
+        try:
+            await AggregatedReading.upsert_readings(readings + aggregate_only)
+        except BulkWriteError as error:
+            logger.error("Failed to upsert aggregated readings: %s", error.details)
+        except Exception:
+            # Readings are stored, upserting them again is harmless
+            self._aggregate_only = readings + aggregate_only + self._aggregate_only
+            raise
+
+        socketManager.emit("change-reading")
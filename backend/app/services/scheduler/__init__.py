@@ -1,7 +1,12 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 from ...config import config as Config
-from .jobs import check_node_states, trigger_socketio
+from .jobs import (
+    check_node_states,
+    flush_liveness,
+    flush_readings,
+    trigger_socketio,
+)
 
 
 def init_scheduler():
@@ -21,4 +26,18 @@ def init_scheduler():
         seconds=Config.app.SOCKETIO_MIN_FIRE_INTERVAL,
     )
 
+    scheduler.add_job(
+        flush_readings,
+        "interval",
+        id="flush_readings",
+        seconds=Config.app.READING_FLUSH_INTERVAL,
+    )
+
+    scheduler.add_job(
+        flush_liveness,
+        "interval",
+        id="flush_liveness",
+        seconds=Config.app.LIVENESS_FLUSH_INTERVAL,
+    )
+
     scheduler.start()
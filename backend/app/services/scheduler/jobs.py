@@ -7,9 +7,11 @@ logger = logging.getLogger(__name__)
 
 
 async def check_node_states():
-    from ... import socketManager
+    from ... import nodeRegistry, socketManager
 
-    nodes: list[Node] = await Node.find_all().to_list()
+    # lastSeenAt is read from the in-memory LivenessTracker,
+    # the registry holds every known node
+    nodes: list[Node] = nodeRegistry.nodes()
 
     update_frontend = False
 
@@ -27,3 +29,15 @@ async def trigger_socketio():
     from ... import socketManager
 
     await socketManager.periodic_trigger()
+
+
+async def flush_readings():
+    from ... import readingBuffer
+
+    await readingBuffer.flush()
+
+
+async def flush_liveness():
+    from ... import livenessTracker
+
+    await livenessTracker.flush()
@@ -0,0 +1,155 @@
+import json
+import struct
+
+from ..models.payload import ReadingPayload, ReadingPayloadData
+
+# Binary reading frames, little endian:
+#
+#   header: version (B), readings (B), sessionID (I), readingID (I)
+#   reading: payloadType (B), canID (B), sensorNumber (B), value (B), count (I)
+#
+# payloadType is 0 for "total" and 1 for "window". JSON payloads always
+# start with '{' (a reading) or '[' (a snapshot of readings), so the first
+# byte tells the formats apart.
+#
+# Version 2 frames are deltas: they only carry the window readings that
+# changed since the previous frame of the session, the receiver carries
+# the others forward. Version 1 frames are full snapshots (keyframes).
+FRAME_VERSION = 1
+DELTA_FRAME_VERSION = 2
+FRAME_HEADER = struct.Struct("<BBII")
+FRAME_READING = struct.Struct("<BBBBI")
+
+PAYLOAD_TYPES = ["total", "window"]
+
+
+def encode_frame(payloads: list[ReadingPayload], delta: bool = False) -> bytes:
+    sessionID = payloads[0].data.sessionID
+    readingID = payloads[0].data.readingID
+
+    if any(
+        x.data.sessionID != sessionID or x.data.readingID != readingID for x in payloads
+    ):
+        raise ValueError("Readings of a frame must share sessionID and readingID")
+
+    version = DELTA_FRAME_VERSION if delta else FRAME_VERSION
+
+    frame = bytearray(FRAME_HEADER.pack(version, len(payloads), sessionID, readingID))
+    for x in payloads:
+        frame += FRAME_READING.pack(
+            PAYLOAD_TYPES.index(x.payloadType),
+            x.data.canID,
+            x.data.sensorNumber,
+            x.data.value,
+            x.data.count,
+        )
+
+    return bytes(frame)
+
+
+def decode_frame(frame: bytes) -> list[ReadingPayload]:
+    if len(frame) < FRAME_HEADER.size:
+        raise ValueError(f"Invalid frame length '{len(frame)}'")
+
+    version, readings, sessionID, readingID = FRAME_HEADER.unpack_from(frame)
+    if version not in [FRAME_VERSION, DELTA_FRAME_VERSION]:
+        raise ValueError(f"Unsupported frame version '{version}'")
+
+    if len(frame) != FRAME_HEADER.size + readings * FRAME_READING.size:
+        raise ValueError(f"Invalid frame length '{len(frame)}'")
+
+    payloads: list[ReadingPayload] = []
+
+    for payloadType, canID, sensorNumber, value, count in FRAME_READING.iter_unpack(
+        frame[FRAME_HEADER.size :]
+    ):
+        if payloadType >= len(PAYLOAD_TYPES):
+            raise ValueError(f"Invalid payloadType '{payloadType}'")
+
+        # Unpacked fields are already ints, skip pydantic's validation
+        payloads.append(
+            ReadingPayload.construct(
+                payloadType=PAYLOAD_TYPES[payloadType],
+                data=ReadingPayloadData.construct(
+                    value=value,
+                    count=count,
+                    sessionID=sessionID,
+                    readingID=readingID,
+                    canID=canID,
+                    sensorNumber=sensorNumber,
+                ),
+            )
+        )
+
+    return payloads
+
+
+def decode_payload(payload: bytes) -> list[ReadingPayload]:
+    # JSON fallback, a single reading or a snapshot
+    if payload[:1] == b"{":
+        return [ReadingPayload.parse_obj(json.loads(payload))]
+
+    if payload[:1] == b"[":
+        return [ReadingPayload.parse_obj(x) for x in json.loads(payload)]
+
+    return decode_frame(payload)
+
+
+# (payloadType, canID, sensorNumber, window)
+ReadingKey = tuple[str, int, int, int]
+
+
+def reading_key(payload: ReadingPayload) -> ReadingKey:
+    data = payload.data
+    window = data.value if payload.payloadType == "window" else 0
+
+    return (payload.payloadType, data.canID, data.sensorNumber, window)
+
+
+class SessionState:
+    def __init__(self, sessionID: int):
+        self.sessionID = sessionID
+        self.readings: dict[ReadingKey, ReadingPayload] = {}
+
+
+# Rebuilds the full snapshots of the Nodes sending delta frames, keeping
+# the last reading of every sensor of their current session. Payloads of
+# a Node must be decoded in order.
+class FrameDecoder:
+    def __init__(self):
+        self._sessions: dict[tuple[str, int], SessionState] = {}
+
+    # Returns the readings in the payload and the ones carried forward
+    def decode(
+        self, applicationID: str, nodeID: int, payload: bytes
+    ) -> tuple[list[ReadingPayload], list[ReadingPayload]]:
+        payloads = decode_payload(payload)
+
+        # Only binary frames can be deltas
+        if payload[:1] not in [bytes([FRAME_VERSION]), bytes([DELTA_FRAME_VERSION])]:
+            return payloads, []
+
+        version, _, sessionID, readingID = FRAME_HEADER.unpack_from(payload)
+
+        state = self._sessions.get((applicationID, nodeID))
+        if state is None or state.sessionID != sessionID:
+            state = SessionState(sessionID)
+            self._sessions[(applicationID, nodeID)] = state
+
+        received = {reading_key(x): x for x in payloads}
+        state.readings.update(received)
+
+        if version == FRAME_VERSION:
+            return payloads, []
+
+        # Only window snapshots are sent as deltas
+        carried = [
+            ReadingPayload.construct(
+                payloadType=x.payloadType,
+                data=x.data.copy(update={"readingID": readingID}),
+            )
+            for key, x in state.readings.items()
+            if key not in received and x.payloadType == "window"
+        ]
+
+        return payloads, carried
@@ -36,7 +36,7 @@ async def handle_payload(node: Node, payload: ReadingPayload):
 
 
 async def handle_total_reading(node: Node, payload: ReadingPayload):
-    from .. import socketManager
+    from .. import readingBuffer, socketManager
 
     data = payload.data
 
@@ -50,9 +50,12 @@ async def handle_total_reading(node: Node, payload: ReadingPayload):
         name="t",
         value=data.value,
     )
-    await reading.save()
+    await readingBuffer.add(reading)
 
     if data.value >= Config.app.ALERT_TRESHOLD:
+        # Make sure the Reading referenced by the Alert is persisted
+        await readingBuffer.flush()
+
         try:
             await Alert.find_one(
                 And(Eq(Alert.sessionID, data.sessionID), Eq(Alert.isHandled, False))
@@ -73,7 +76,11 @@ async def handle_total_reading(node: Node, payload: ReadingPayload):
         socketManager.emit("change-reading")
 
 
-async def handle_window_reading(node: Node, payload: ReadingPayload):
+async def handle_window_reading(
+    node: Node, payload: ReadingPayload, store: bool = True
+):
+    from .. import readingBuffer
+
     data = payload.data
 
     window_number = data.value
@@ -98,4 +105,4 @@ async def handle_window_reading(node: Node, payload: ReadingPayload):
         value=data.count,
     )
 
-    await reading.save()
+    await readingBuffer.add(reading, store)
@@ -0,0 +1,368 @@
+# Runs a fleet of virtual Nodes in a single asyncio process, against a
+# broker and a running backend, to find how many Nodes the backend can
+# serve. Every virtual Node behaves like node/app.py: it announces itself
+# with 'launch', sends keepalives, handles 'set' payloads and, between
+# the 'start' and 'stop' commands, publishes a window snapshot every
+# --interval seconds and the totals at the end.
+#
+# Sessions are started and stopped through POST /api/command, so the
+# command latency covers REST API -> backend -> broker -> Node. The
+# backend's rate and errors come from GET /api/ingest/metrics; a message
+# latency is the time from its publication to the first metrics poll
+# counting it as handled, an upper bound within --poll seconds.
+#
+# From the backend folder, with a broker and the backend running:
+#
+#     $ python -m benchmarks.fleet --application <applicationID> --nodes 500 \
+#         --email <email> --password <password>
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from random import Random
+from typing import Optional
+
+import requests
+from app.models.payload import ReadingPayload, ReadingPayloadData
+from app.utils.frames import encode_frame
+from gmqtt import Client, Subscription
+
+DETECTORS = 4
+SIPMS = 2
+WINDOWS = 3
+
+
+class Stats:
+    def __init__(self):
+        # Publication times of the messages the backend subscribes to
+        self.sent: list[float] = []
+        self.commands: list[float] = []
+        self.sets = 0
+        self.errors = 0
+
+
+class VirtualNode:
+    def __init__(
+        self,
+        applicationID: str,
+        nodeID: int,
+        args: argparse.Namespace,
+        stats: Stats,
+        random: Random,
+    ):
+        self.applicationID = applicationID
+        self.nodeID = nodeID
+        self.topic = f"{applicationID}/{nodeID}"
+        self.command_sent_at: Optional[float] = None
+
+        self._args = args
+        self._stats = stats
+        self._random = random
+        self._client = Client(f"irma-fleet-{applicationID}-{nodeID}")
+        self._client.on_message = self.on_message
+
+        self._keepalive: Optional[asyncio.Task] = None
+        self._session: Optional[asyncio.Task] = None
+        self._sessionID = 0
+        self._readingID = 0
+        self._counts: dict[tuple[int, int, int], int] = {}
+
+    async def connect(self):
+        if self._args.user:
+            self._client.set_auth_credentials(self._args.user, self._args.mqtt_password)
+
+        await self._client.connect(self._args.host, self._args.port)
+        self._client.subscribe(
+            [Subscription(self.topic + "/command"), Subscription(self.topic + "/set")]
+        )
+
+        self.publish("/status", f"launch:fleet-{self.nodeID}")
+        self._keepalive = asyncio.create_task(self.send_keepalives())
+
+    async def disconnect(self):
+        for task in [self._keepalive, self._session]:
+            if task is not None:
+                task.cancel()
+
+        await self._client.disconnect()
+
+    def publish(self, subtopic: str, payload: str | bytes, qos: int = 0):
+        try:
+            self._client.publish(self.topic + subtopic, payload, qos=qos)
+        except Exception as error:
+            print(f"Node {self.nodeID} failed to publish: {error}")
+            self._stats.errors += 1
+            return
+
+        # The backend doesn't subscribe to the sessions
+        if subtopic != "/sessions":
+            self._stats.sent.append(time.monotonic())
+
+    def on_message(self, client, topic: str, payload: bytes, qos, properties):
+        value = payload.decode()
+
+        if topic.endswith("/command"):
+            if self.command_sent_at is not None:
+                self._stats.commands.append(time.monotonic() - self.command_sent_at)
+                self.command_sent_at = None
+
+            if value == "stop":
+                self.stop_rec()
+            elif value.startswith("start:"):
+                self.start_rec()
+            else:
+                self._stats.errors += 1
+
+        elif topic.endswith("/set"):
+            try:
+                json.loads(value)
+                self._stats.sets += 1
+            except ValueError:
+                self._stats.errors += 1
+
+        return 0
+
+    async def send_keepalives(self):
+        while True:
+            await asyncio.sleep(self._args.keepalive)
+            self.publish("/status", "keepalive")
+
+    def start_rec(self):
+        if self._session is not None:
+            return
+
+        self.publish("/status", "start")
+        self._sessionID = int(time.time())
+        self._counts = {}
+        self.publish("/sessions", str(self._sessionID), qos=1)
+        self._session = asyncio.create_task(self.send_readings())
+
+    def stop_rec(self):
+        if self._session is None:
+            return
+
+        self._session.cancel()
+        self._session = None
+
+        self.publish("/status", "stop")
+        self.publish("/payload", encode_frame(self.totals()), qos=1)
+
+    async def send_readings(self):
+        # Spread the fleet over the interval
+        await asyncio.sleep(self._random.uniform(0, self._args.interval))
+
+        while True:
+            self._readingID = max(int(time.time()), self._readingID + 1)
+            self.publish("/payload", encode_frame(self.snapshot()), qos=1)
+            await asyncio.sleep(self._args.interval)
+
+    def reading(
+        self, payloadType: str, canID: int, sensorNumber: int, value: int, count: int
+    ):
+        return ReadingPayload(
+            payloadType=payloadType,
+            data=ReadingPayloadData(
+                value=value,
+                count=count,
+                sessionID=self._sessionID,
+                readingID=self._readingID,
+                canID=canID,
+                sensorNumber=sensorNumber,
+            ),
+        )
+
+    def snapshot(self) -> list[ReadingPayload]:
+        readings = []
+
+        for window in range(WINDOWS):
+            for canID in range(1, DETECTORS + 1):
+                for sensorNumber in range(1, SIPMS + 1):
+                    key = (canID, sensorNumber, window)
+                    self._counts[key] = self._counts.get(key, 0) + self._random.randint(
+                        0, 100
+                    )
+                    readings.append(
+                        self.reading(
+                            "window", canID, sensorNumber, window, self._counts[key]
+                        )
+                    )
+
+        return readings
+
+    def totals(self) -> list[ReadingPayload]:
+        return [
+            self.reading(
+                "total",
+                canID,
+                sensorNumber,
+                self._random.randint(0, 9),
+                sum(
+                    self._counts.get((canID, sensorNumber, x), 0)
+                    for x in range(WINDOWS)
+                ),
+            )
+            for canID in range(1, DETECTORS + 1)
+            for sensorNumber in range(1, SIPMS + 1)
+        ]
+
+
+class Backend:
+    def __init__(self, args: argparse.Namespace):
+        self._api = args.api.rstrip("/")
+        self._session = requests.Session()
+
+        response = self._session.post(
+            f"{self._api}/api/jwt/",
+            json={"email": args.email, "password": args.password},
+            timeout=10,
+        )
+        response.raise_for_status()
+        self._session.headers[
+            "Authorization"
+        ] = f"Bearer {response.json()['access_token']}"
+
+    def metrics(self) -> dict:
+        response = self._session.get(f"{self._api}/api/ingest/metrics", timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    def command(self, command: int, node: VirtualNode):
+        response = self._session.post(
+            f"{self._api}/api/command/{command}",
+            json={"nodeID": node.nodeID, "applicationID": node.applicationID},
+            timeout=10,
+        )
+        response.raise_for_status()
+
+
+def handled(metrics: dict) -> int:
+    return metrics["processed"] + metrics["failed"] + metrics["dropped"]
+
+
+def percentiles(values: list[float]) -> str:
+    if len(values) < 2:
+        return "n/a"
+
+    quantiles = statistics.quantiles(values, n=100)
+    return (
+        f"p50 {quantiles[49] * 1000:.0f}ms, p95 {quantiles[94] * 1000:.0f}ms, "
+        f"p99 {quantiles[98] * 1000:.0f}ms, max {max(values) * 1000:.0f}ms"
+    )
+
+
+# Messages are assumed to be handled in publication order
+def latencies(sent: list[float], polls: list[tuple[float, int]]) -> list[float]:
+    result: list[float] = []
+
+    for polled_at, count in polls:
+        while len(result) < min(count, len(sent)):
+            result.append(polled_at - sent[len(result)])
+
+    return result
+
+
+async def send_commands(
+    backend: Backend, nodes: list[VirtualNode], command: int, stats: Stats
+):
+    semaphore = asyncio.Semaphore(16)
+
+    async def send(node: VirtualNode):
+        async with semaphore:
+            node.command_sent_at = time.monotonic()
+            try:
+                await asyncio.to_thread(backend.command, command, node)
+            except requests.RequestException as error:
+                print(f"Command to node {node.nodeID} failed: {error}")
+                stats.errors += 1
+
+    await asyncio.gather(*(send(x) for x in nodes))
+
+
+async def run(args: argparse.Namespace):
+    stats = Stats()
+    random = Random(args.seed)
+    backend = await asyncio.to_thread(Backend, args)
+
+    nodes = [
+        VirtualNode(
+            args.application, args.first_node + i, args, stats, Random(random.random())
+        )
+        for i in range(args.nodes)
+    ]
+
+    # Brokers don't like connection storms
+    semaphore = asyncio.Semaphore(args.connect_concurrency)
+
+    async def connect(node: VirtualNode):
+        async with semaphore:
+            await node.connect()
+
+    started = time.monotonic()
+    await asyncio.gather(*(connect(x) for x in nodes))
+    print(f"Connected {len(nodes)} nodes in {time.monotonic() - started:.1f}s")
+
+    # Let the backend register the launched Nodes
+    await asyncio.sleep(2)
+
+    baseline = await asyncio.to_thread(backend.metrics)
+    sent_before = len(stats.sent)
+    polls: list[tuple[float, int]] = []
+
+    async def poll(seconds: float):
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            await asyncio.sleep(args.poll)
+            metrics = await asyncio.to_thread(backend.metrics)
+            polls.append((time.monotonic(), handled(metrics) - handled(baseline)))
+
+    await send_commands(backend, nodes, 0, stats)
+    started = time.monotonic()
+    await poll(args.duration)
+    await send_commands(backend, nodes, 1, stats)
+
+    # Wait for the backend to catch up with the backlog
+    await poll(args.drain)
+    elapsed = time.monotonic() - started
+
+    metrics = await asyncio.to_thread(backend.metrics)
+    await asyncio.gather(*(x.disconnect() for x in nodes))
+
+    sent = stats.sent[sent_before:]
+    received = metrics["received"] - baseline["received"]
+    processed = metrics["processed"] - baseline["processed"]
+
+    print(f"{args.nodes} nodes, {args.interval}s interval, {elapsed:.0f}s run")
+    print(f"published  {len(sent)} messages, {len(sent) / elapsed:.0f} msg/s")
+    print(f"received   {received} messages, lost {len(sent) - received}")
+    print(f"processed  {processed} messages, {processed / elapsed:.0f} msg/s")
+    print(f"latency    {percentiles(latencies(sent, polls))}")
+    print(f"commands   {percentiles(stats.commands)}")
+    print(
+        f"errors     backend failed {metrics['failed'] - baseline['failed']}, "
+        f"dropped {metrics['dropped'] - baseline['dropped']}, "
+        f"fleet {stats.errors}"
+    )
+    print(f"queues     {metrics['depth']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Virtual Node fleet")
+    parser.add_argument("--application", required=True, help="applicationID")
+    parser.add_argument("--nodes", type=int, default=100)
+    parser.add_argument("--first-node", type=int, default=10_000, help="first nodeID")
+    parser.add_argument("--interval", type=float, default=15, help="seconds")
+    parser.add_argument("--keepalive", type=float, default=30, help="seconds")
+    parser.add_argument("--duration", type=float, default=120, help="seconds")
+    parser.add_argument("--drain", type=float, default=15, help="seconds")
+    parser.add_argument("--poll", type=float, default=0.25, help="seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--host", default="localhost", help="MQTT broker")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--user", default=None, help="MQTT user")
+    parser.add_argument("--mqtt-password", default=None)
+    parser.add_argument("--connect-concurrency", type=int, default=50)
+    parser.add_argument("--api", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    asyncio.run(run(parser.parse_args()))
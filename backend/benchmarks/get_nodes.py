@@ -0,0 +1,122 @@
+# Compares the per-node and the batched Node serialization used by
+# GET /api/nodes/, while the number of nodes in the application grows.
+#
+# Needs a running MongoDB, from the backend folder:
+#
+#     $ python -m benchmarks.get_nodes --uri mongodb://localhost:27017
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime
+from random import random, seed
+
+from app.entities.node import Node
+from app.services.database import Alert, init_db
+from app.utils.enums import NodeState
+from beanie import PydanticObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+
+DB_NAME = "irma_benchmark_get_nodes"
+
+
+async def fill(application: PydanticObjectId, nodes: int, alerts: float):
+    await Node.insert_many(
+        [
+            Node(
+                nodeID=x,
+                nodeName=f"node-{x}",
+                application=application,
+                state=NodeState.READY,
+                lastSeenAt=datetime.now(),
+            )
+            for x in range(nodes)
+        ]
+    )
+
+    saved: list[Node] = await Node.find(Node.application == application).to_list()
+    sessionID = await Alert.count()
+    batch: list[Alert] = []
+    for node in saved:
+        if random() >= alerts:
+            continue
+
+        for isHandled in [False, False, True]:
+            batch.append(
+                Alert(
+                    reading=PydanticObjectId(),
+                    node=node.id,
+                    sessionID=sessionID,
+                    isHandled=isHandled,
+                    raisedAt=datetime.now(),
+                )
+            )
+            sessionID += 1
+
+    if len(batch) > 0:
+        await Alert.insert_many(batch)
+
+
+async def get_nodes(application: PydanticObjectId, batched: bool):
+    nodes = await Node.find(Node.application == application).to_list()
+
+    if batched:
+        return await Node.serialize_many(nodes)
+
+    return [await x.serialize() for x in nodes]
+
+
+async def measure(application: PydanticObjectId, batched: bool, queries: int):
+    latencies: list[float] = []
+    for _ in range(queries):
+        started = time.perf_counter()
+        await get_nodes(application, batched)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    return statistics.median(latencies), statistics.quantiles(latencies, n=20)[-1]
+
+
+async def main(args: argparse.Namespace):
+    client = AsyncIOMotorClient(args.uri)
+    await client.drop_database(DB_NAME)
+    await init_db(args.uri, DB_NAME)
+
+    seed(args.seed)
+
+    print(f"{args.queries} requests per size, {args.alerts:.0%} nodes with alerts")
+    print(
+        f"{'nodes':>8}{'per-node p50':>16}{'per-node p95':>16}"
+        f"{'batched p50':>16}{'batched p95':>16}"
+    )
+    for nodes in args.nodes:
+        application = PydanticObjectId()
+        await fill(application, nodes, args.alerts)
+
+        single = await measure(application, False, args.queries)
+        batched = await measure(application, True, args.queries)
+
+        print(
+            f"{nodes:>8}{single[0]:>16.2f}{single[1]:>16.2f}"
+            f"{batched[0]:>16.2f}{batched[1]:>16.2f}"
+        )
+
+    if not args.keep:
+        await client.drop_database(DB_NAME)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="GET /api/nodes/ benchmark")
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument(
+        "--nodes", type=int, nargs="+", default=[10, 50, 100, 500, 1000]
+    )
+    parser.add_argument(
+        "--alerts", type=float, default=0.2, help="Share of nodes with alerts"
+    )
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--keep", action="store_true", help="Keep the benchmark database"
+    )
+
+    asyncio.run(main(parser.parse_args()))
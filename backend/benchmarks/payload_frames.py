@@ -0,0 +1,75 @@
+# Compares JSON payloads and binary frames: bytes on the wire per reading
+# and decode throughput of decode_payload.
+#
+# From the backend folder:
+#
+#     $ python -m benchmarks.payload_frames
+import argparse
+import time
+from random import randint, seed
+
+from app.models.payload import ReadingPayload, ReadingPayloadData
+from app.utils.frames import decode_payload, encode_frame
+
+
+def generate(readings: int) -> list[ReadingPayload]:
+    return [
+        ReadingPayload(
+            payloadType="window" if i % 4 != 3 else "total",
+            data=ReadingPayloadData(
+                value=randint(1, 3),
+                count=randint(0, 2**24 - 1),
+                sessionID=1672531200,
+                readingID=1672531215,
+                canID=randint(1, 4),
+                sensorNumber=randint(1, 2),
+            ),
+        )
+        for i in range(readings)
+    ]
+
+
+def measure(messages: list[bytes], seconds: float) -> float:
+    decoded = 0
+    started = time.perf_counter()
+
+    while time.perf_counter() - started < seconds:
+        for message in messages:
+            decoded += len(decode_payload(message))
+
+    return decoded / (time.perf_counter() - started)
+
+
+def main(args: argparse.Namespace):
+    seed(args.seed)
+
+    print(
+        f"{'readings/msg':>14}{'format':>8}{'bytes/msg':>12}"
+        f"{'bytes/reading':>15}{'readings/s':>14}"
+    )
+    for readings in args.readings:
+        payloads = generate(readings)
+
+        # JSON carries a single reading per message
+        formats = {
+            "json": [x.json().encode() for x in payloads],
+            "binary": [encode_frame(payloads)],
+        }
+
+        for name, messages in formats.items():
+            size = sum(len(x) for x in messages)
+            throughput = measure(messages, args.seconds)
+
+            print(
+                f"{readings:>14}{name:>8}{size / len(messages):>12.1f}"
+                f"{size / readings:>15.1f}{throughput:>14.0f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Payload formats benchmark")
+    parser.add_argument("--readings", type=int, nargs="+", default=[1, 8, 24])
+    parser.add_argument("--seconds", type=float, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+
+    main(parser.parse_args())
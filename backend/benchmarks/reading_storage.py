@@ -0,0 +1,152 @@
+# Compares the "document" and "bucket" Reading storage layouts: disk
+# footprint and latency of loading the raw readings of a session.
+#
+# Needs a running MongoDB, from the backend folder:
+#
+#     $ python -m benchmarks.reading_storage --uri mongodb://localhost:27017
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timedelta
+from random import randint, seed
+
+from beanie import PydanticObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.services.database import Reading, ReadingBucket, init_db
+
+NAMES = ["w1", "w2", "w3"]
+
+
+def generate(nodes: list[PydanticObjectId], sessions: int, cycles: int):
+    start = datetime(2023, 1, 1)
+
+    for node in nodes:
+        for sessionID in range(sessions):
+            for cycle in range(cycles):
+                published_at = start + timedelta(seconds=15 * cycle)
+
+                for canID in range(1, 5):
+                    for sensor_number in range(1, 3):
+                        for name in NAMES:
+                            yield Reading(
+                                id=PydanticObjectId(),
+                                node=node,
+                                canID=canID,
+                                sensor_number=sensor_number,
+                                readingID=int(published_at.timestamp()),
+                                sessionID=sessionID,
+                                published_at=published_at,
+                                name=name,
+                                value=randint(0, 100_000),
+                            )
+
+
+async def fill(layout: str, readings, batch_size: int = 1000):
+    async def flush(batch: list[Reading]):
+        if layout == "bucket":
+            await ReadingBucket.push_readings(batch)
+        else:
+            await Reading.insert_many(batch, ordered=False)
+
+    batch: list[Reading] = []
+    for reading in readings:
+        batch.append(reading)
+
+        if len(batch) >= batch_size:
+            await flush(batch)
+            batch = []
+
+    if len(batch) > 0:
+        await flush(batch)
+
+
+async def load_session(layout: str, node: PydanticObjectId, sessionID: int) -> int:
+    if layout == "bucket":
+        buckets = await ReadingBucket.find(
+            ReadingBucket.node == node, ReadingBucket.sessionID == sessionID
+        ).to_list()
+        return sum(len(x.readings()) for x in buckets)
+
+    readings = (
+        await Reading.find(Reading.node == node, Reading.sessionID == sessionID)
+        .sort(+Reading.readingID)
+        .to_list()
+    )
+    return len(readings)
+
+
+async def run(args: argparse.Namespace, layout: str) -> dict:
+    db_name = f"irma_benchmark_{layout}"
+
+    client = AsyncIOMotorClient(args.uri)
+    await client.drop_database(db_name)
+    await init_db(args.uri, db_name)
+
+    seed(args.seed)
+    nodes = [PydanticObjectId() for _ in range(args.nodes)]
+
+    started = time.perf_counter()
+    await fill(layout, generate(nodes, args.sessions, args.cycles))
+    write_seconds = time.perf_counter() - started
+
+    document = ReadingBucket if layout == "bucket" else Reading
+    stats = await client[db_name].command(
+        "collStats", document.get_motor_collection().name
+    )
+
+    latencies: list[float] = []
+    for i in range(args.queries):
+        node = nodes[i % len(nodes)]
+        sessionID = i % args.sessions
+
+        started = time.perf_counter()
+        await load_session(layout, node, sessionID)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    if not args.keep:
+        await client.drop_database(db_name)
+
+    return {
+        "layout": layout,
+        "documents": stats["count"],
+        "size": stats["size"],
+        "storage": stats["storageSize"],
+        "indexes": stats["totalIndexSize"],
+        "write_s": write_seconds,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": statistics.quantiles(latencies, n=20)[-1],
+    }
+
+
+async def main(args: argparse.Namespace):
+    results = [await run(args, x) for x in ["document", "bucket"]]
+
+    readings = args.nodes * args.sessions * args.cycles * 4 * 2 * len(NAMES)
+    print(f"{readings} readings, {args.queries} session queries")
+    print(
+        f"{'layout':10}{'documents':>12}{'size':>14}{'storage':>14}"
+        f"{'indexes':>14}{'write s':>10}{'p50 ms':>10}{'p95 ms':>10}"
+    )
+    for x in results:
+        print(
+            f"{x['layout']:10}{x['documents']:>12}{x['size']:>14}{x['storage']:>14}"
+            f"{x['indexes']:>14}{x['write_s']:>10.2f}{x['p50_ms']:>10.2f}"
+            f"{x['p95_ms']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reading storage layouts benchmark")
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--nodes", type=int, default=10)
+    parser.add_argument("--sessions", type=int, default=5)
+    parser.add_argument("--cycles", type=int, default=240)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--keep", action="store_true", help="Keep the benchmark databases"
+    )
+
+    asyncio.run(main(parser.parse_args()))
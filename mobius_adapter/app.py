@@ -1,9 +1,17 @@
 import os
+import time
+from threading import Thread
 
+from batcher import Batcher
+from containers import ContainerCache
+from forwarder import Forwarder
+from metrics import messages_received, registry, request_seconds, serve
 from mqtt import register_callbacks
-from paho.mqtt.client import Client
+from paho.mqtt.client import Client, MQTTv5
+from spool import Spool, SpoolDrainer
 
 from config import Config, get_config
+from utils import Data, insert_batch
 
 TESTING = os.environ.get("TESTING", False)
 
@@ -12,19 +20,198 @@ class Adapter:
     def __init__(self):
         self.config: Config = get_config()
 
-        # Init mqtt client
-        self._client = Client()
+        # Init mqtt client, shared subscriptions need MQTT v5
+        if self.config.mqtt.shared_group is not None:
+            # A Node's frames reach any replica, deltas can't be rebuilt
+            print(
+                f"[WARNING] Sharing messages in group "
+                f"'{self.config.mqtt.shared_group}': delta frames are forwarded "
+                "as partial snapshots, Nodes must not enable compression"
+            )
+            self._client = Client(
+                client_id=f"mobius-adapter-{self.config.replica}", protocol=MQTTv5
+            )
+        else:
+            self._client = Client()
         self._client.username_pw_set(self.config.mqtt.user, self.config.mqtt.password)
 
         if self.config.mqtt.tls:
             self._client.tls_set()
 
-        register_callbacks(self._client)
+        self.spool: Spool | None = None
+        if self.config.spool.enabled:
+            self.spool = Spool(
+                self.config.spool.path.format(replica=self.config.replica),
+                max_requests=self.config.spool.max_requests,
+                base_backoff_seconds=self.config.spool.base_backoff_seconds,
+                max_backoff_seconds=self.config.spool.max_backoff_seconds,
+            )
+            print(f"[INFO] Spool has {len(self.spool)} pending requests")
+
+        self.containers = ContainerCache(self.config.containers.max_sessions)
+
+        self.forwarder = Forwarder(
+            workers=self.config.forwarder.workers,
+            queue_size=self.config.forwarder.queue_size,
+            timeout_seconds=self.config.forwarder.timeout_seconds,
+            overflow=self.config.forwarder.overflow,
+            spool=self.spool,
+            containers=self.containers,
+        )
+
+        if self.config.containers.warm:
+            self.containers.warm(
+                self.forwarder.session, self.config.forwarder.timeout_seconds
+            )
+
+        self.forwarder.start()
+
+        self.drainer: SpoolDrainer | None = None
+        if self.spool is not None:
+            self.drainer = SpoolDrainer(
+                self.spool,
+                self.forwarder.session,
+                timeout_seconds=self.config.forwarder.timeout_seconds,
+                drain_rate=self.config.spool.drain_rate,
+                containers=self.containers,
+            )
+            self.drainer.start()
+
+        self.batcher: Batcher | None = None
+        if self.config.batching.enabled:
+            self.batcher = Batcher(
+                self.send_batch,
+                group_by=self.config.batching.group_by,
+                max_readings=self.config.batching.max_readings,
+                max_delay_seconds=self.config.batching.max_delay_seconds,
+            )
+            self.batcher.start()
+
+        register_callbacks(
+            self._client, self.forwarder, self.batcher, self.config.mqtt.shared_group
+        )
+
+        if self.config.metrics.enabled:
+            self.register_metrics()
+            serve(self.config.metrics.host, self.config.metrics.port)
+
+        if self.config.metrics.report_seconds > 0:
+            Thread(target=self.report, daemon=True).start()
 
         self._client.connect(host=self.config.mqtt.url, port=self.config.mqtt.port)
 
     def loop_forever(self):
-        self._client.loop_forever()
+        try:
+            self._client.loop_forever()
+        finally:
+            if self.batcher is not None:
+                self.batcher.flush()
+            self.forwarder.stop()
+
+    # Logs the throughput of this replica, comparable across replicas
+    def report(self):
+        seconds = self.config.metrics.report_seconds
+        received, sent = messages_received.total(), request_seconds.count()
+
+        while True:
+            time.sleep(seconds)
+            received, last_received = messages_received.total(), received
+            sent, last_sent = request_seconds.count(), sent
+
+            print(
+                f"[INFO] Replica '{self.config.replica}': "
+                f"{(received - last_received) / seconds:.1f} msg/s received, "
+                f"{(sent - last_sent) / seconds:.1f} req/s to Mobius, "
+                f"{sum(self.forwarder.depth())} queued"
+            )
+
+    # Counters kept by the components, read when scraped
+    def register_metrics(self):
+        prefix = "mobius_adapter_"
+        forwarder = self.forwarder
+
+        registry.collect(
+            prefix + "queue_depth",
+            "Requests queued by forwarder worker",
+            "gauge",
+            lambda: {str(i): x for i, x in enumerate(forwarder.depth())},
+            label="worker",
+        )
+        registry.collect(
+            prefix + "dropped_total",
+            "Requests dropped by full forwarder queues",
+            "counter",
+            lambda: forwarder.dropped,
+        )
+        registry.collect(
+            prefix + "forwarder_requests_total",
+            "Requests handled by the forwarder, by outcome",
+            "counter",
+            lambda: {
+                "submitted": forwarder.submitted,
+                "sent": forwarder.sent,
+                "failed": forwarder.failed,
+            },
+            label="outcome",
+        )
+
+        registry.collect(
+            prefix + "session_containers_total",
+            "Session container lookups, by outcome",
+            "counter",
+            lambda: {
+                "hit": self.containers.hits,
+                "created": self.containers.created,
+                "waited": self.containers.waited,
+            },
+            label="outcome",
+        )
+
+        if self.batcher is not None:
+            batcher = self.batcher
+            registry.collect(
+                prefix + "batched_readings_total",
+                "Readings added to batches",
+                "counter",
+                lambda: batcher.readings,
+            )
+            registry.collect(
+                prefix + "batches_total",
+                "Batches sent",
+                "counter",
+                lambda: batcher.batches,
+            )
+
+        if self.spool is not None and self.drainer is not None:
+            spool, drainer = self.spool, self.drainer
+            registry.collect(
+                prefix + "spool_size",
+                "Requests in the spool",
+                "gauge",
+                lambda: len(spool),
+            )
+            registry.collect(
+                prefix + "spool_oldest_age_seconds",
+                "Age of the oldest spooled request",
+                "gauge",
+                spool.oldest_age,
+            )
+            registry.collect(
+                prefix + "spool_requests_total",
+                "Spooled requests, by outcome",
+                "counter",
+                lambda: {
+                    "spooled": spool.spooled,
+                    "evicted": spool.evicted,
+                    "drained": drainer.drained,
+                    "retried": drainer.retried,
+                    "discarded": drainer.discarded,
+                },
+                label="outcome",
+            )
+
+    def send_batch(self, readings: list[Data]):
+        self.forwarder.submit(readings[0].sessionID, insert_batch(readings))
 
 
 if __name__ == "__main__":
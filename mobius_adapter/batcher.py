@@ -0,0 +1,93 @@
+import time
+from threading import Condition, Thread
+from typing import Callable
+
+from utils import Data
+
+
+class Batch:
+    def __init__(self, deadline: float):
+        self.readings: list[Data] = []
+        self.deadline = deadline
+
+
+# Groups the readings into batches, sent as a single content instance:
+# by (sessionID, readingID) with group_by "reading", i.e. one per
+# snapshot, or by sessionID with group_by "session", i.e. one per time
+# window. A batch is flushed once it has max_readings readings or
+# max_delay_seconds after its first one.
+class Batcher:
+    def __init__(
+        self,
+        flush: Callable[[list[Data]], None],
+        group_by: str = "reading",
+        max_readings: int = 64,
+        max_delay_seconds: float = 1,
+    ):
+        if group_by not in ["reading", "session"]:
+            raise ValueError(f"Invalid group_by '{group_by}'")
+
+        self._flush = flush
+        self._group_by = group_by
+        self._max_readings = max_readings
+        self._max_delay_seconds = max_delay_seconds
+
+        self._condition = Condition()
+        self._batches: dict[tuple[int, int], Batch] = {}
+
+        self.readings = 0
+        self.batches = 0
+
+    def start(self):
+        Thread(target=self._run, daemon=True).start()
+
+    def add(self, data: Data):
+        key = (
+            data.sessionID,
+            data.readingID if self._group_by == "reading" else 0,
+        )
+
+        with self._condition:
+            batch = self._batches.get(key)
+            if batch is None:
+                batch = Batch(time.monotonic() + self._max_delay_seconds)
+                self._batches[key] = batch
+                self._condition.notify()
+
+            batch.readings.append(data)
+            self.readings += 1
+
+            if len(batch.readings) < self._max_readings:
+                return
+
+            del self._batches[key]
+            self.batches += 1
+
+        self._flush(batch.readings)
+
+    # Flushes every pending batch, e.g. on shutdown
+    def flush(self):
+        with self._condition:
+            batches, self._batches = list(self._batches.values()), {}
+            self.batches += len(batches)
+
+        for batch in batches:
+            self._flush(batch.readings)
+
+    def _expired(self) -> list[Batch]:
+        now = time.monotonic()
+        expired = [x for x, y in self._batches.items() if y.deadline <= now]
+        self.batches += len(expired)
+
+        return [self._batches.pop(x) for x in expired]
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: len(self._batches) > 0)
+                deadline = min(x.deadline for x in self._batches.values())
+                self._condition.wait(max(0, deadline - time.monotonic()))
+                expired = self._expired()
+
+            for batch in expired:
+                self._flush(batch.readings)
@@ -0,0 +1,220 @@
+# Measures how the adapter scales out: runs 1, 2, 4... replicas sharing
+# the Nodes' messages through a shared subscription, floods them with
+# frames from --nodes virtual Nodes, and reports each replica's
+# throughput read from its /metrics endpoint. Mobius is replaced by a
+# local server answering every request after --latency ms, so a replica
+# forwards at most workers / latency requests per second: with linear
+# scaling the total grows by that much with every replica.
+#
+# From the mobius_adapter folder, with a local mosquitto (2.0 or later)
+# listening on 1883 and allowing anonymous clients:
+#
+#     $ python -m benchmarks.scale --replicas 1,2,4
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+import requests
+import yaml
+from frames import FRAME_HEADER, FRAME_READING, FRAME_VERSION
+from paho.mqtt.client import Client
+
+ADAPTER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Mobius(BaseHTTPRequestHandler):
+    latency = 0.02
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        time.sleep(self.latency)
+        self.send_response(201)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    # Session containers discovery
+    def do_GET(self):
+        body = b'{"m2m:uril": []}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def frame(sessionID: int, readingID: int, readings: int) -> bytes:
+    return FRAME_HEADER.pack(FRAME_VERSION, readings, sessionID, readingID) + b"".join(
+        FRAME_READING.pack(1, 1 + i // 6, 1 + i // 3 % 2, i % 3, readingID)
+        for i in range(readings)
+    )
+
+
+# Sum of the samples of a metric, over its labels
+def scrape(port: int, name: str) -> float:
+    text = requests.get(f"http://127.0.0.1:{port}/metrics", timeout=5).text
+    return sum(
+        float(x.rsplit(" ", 1)[1])
+        for x in text.splitlines()
+        if x.startswith(name + "{") or x.startswith(name + " ")
+    )
+
+
+def launch(args: argparse.Namespace, mobius_port: int, replica: int, folder: str):
+    with open(os.path.join(ADAPTER, "config.yaml")) as f:
+        config = yaml.safe_load(f)
+
+    config["mobius_uri"] = f"http://127.0.0.1:{mobius_port}/Mobius/bench"
+    config["replica"] = f"bench-{replica}"
+    config["mqtt"].update(
+        url=args.host, port=args.port, tls=False, shared_group=args.group
+    )
+    config["forwarder"]["workers"] = args.workers
+    config["spool"]["enabled"] = False
+    config["metrics"].update(
+        enabled=True, host="127.0.0.1", port=args.metrics_port + replica
+    )
+
+    path = os.path.join(folder, f"config-{replica}.yaml")
+    with open(path, "w") as f:
+        yaml.safe_dump(config, f)
+
+    return subprocess.Popen(
+        [sys.executable, "app.py"],
+        cwd=ADAPTER,
+        env=dict(os.environ, MOBIUS_ADAPTER_CONFIG=path),
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def wait_ready(ports: list[int]):
+    deadline = time.monotonic() + 30
+    for port in ports:
+        while True:
+            try:
+                scrape(port, "mobius_adapter_requests_in_flight")
+                break
+            except requests.RequestException:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.2)
+
+
+def publish(args: argparse.Namespace, seconds: float) -> int:
+    client = Client()
+    client.connect(args.host, args.port)
+    client.loop_start()
+
+    sessionID = int(time.time())
+    for nodeID in range(args.nodes):
+        client.publish(f"bench/{nodeID}/sessions", str(sessionID), qos=1)
+
+    published = 0
+    interval = 1 / args.rate
+    started = time.monotonic()
+    while time.monotonic() - started < seconds:
+        readingID = int(time.time()) + published
+        client.publish(
+            f"bench/{published % args.nodes}/payload",
+            frame(sessionID, readingID, args.readings),
+        )
+        published += 1
+        time.sleep(max(0, started + published * interval - time.monotonic()))
+
+    client.loop_stop()
+    client.disconnect()
+    return published
+
+
+def measure(args: argparse.Namespace, mobius_port: int, replicas: int) -> float:
+    ports = [args.metrics_port + i for i in range(replicas)]
+
+    with tempfile.TemporaryDirectory() as folder:
+        processes = [launch(args, mobius_port, i, folder) for i in range(replicas)]
+        try:
+            wait_ready(ports)
+            # Let the replicas subscribe
+            time.sleep(1)
+
+            publisher = Thread(target=publish, args=(args, args.duration + 2))
+            publisher.start()
+
+            # Skip the warm up
+            time.sleep(2)
+            before = [scrape(x, "mobius_adapter_request_seconds_count") for x in ports]
+            received = [
+                scrape(x, "mobius_adapter_messages_received_total") for x in ports
+            ]
+            time.sleep(args.duration)
+            after = [scrape(x, "mobius_adapter_request_seconds_count") for x in ports]
+            received = [
+                scrape(x, "mobius_adapter_messages_received_total") - y
+                for x, y in zip(ports, received)
+            ]
+            dropped = [scrape(x, "mobius_adapter_dropped_total") for x in ports]
+            publisher.join()
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.wait()
+
+    rates = [(x - y) / args.duration for x, y in zip(after, before)]
+    for i, rate in enumerate(rates):
+        print(
+            f"  replica {i}: {received[i] / args.duration:7.1f} msg/s received, "
+            f"{rate:7.1f} req/s to Mobius, {dropped[i]:.0f} dropped"
+        )
+
+    return sum(rates)
+
+
+def main(args: argparse.Namespace):
+    Mobius.latency = args.latency / 1000
+    mobius = ThreadingHTTPServer(("127.0.0.1", 0), Mobius)
+    mobius.daemon_threads = True
+    Thread(target=mobius.serve_forever, daemon=True).start()
+
+    capacity = args.workers / Mobius.latency
+    print(
+        f"{args.nodes} nodes, {args.rate:.0f} msg/s of {args.readings} readings, "
+        f"{args.workers} workers at {args.latency:.0f}ms: "
+        f"at most {capacity:.0f} req/s per replica"
+    )
+
+    single = None
+    for replicas in [int(x) for x in args.replicas.split(",")]:
+        print(f"{replicas} replicas")
+        total = measure(args, mobius.server_address[1], replicas)
+
+        if single is None:
+            single = total / replicas
+        print(
+            f"  total {total:.1f} req/s, "
+            f"{total / (replicas * single) * 100:.0f}% of linear scaling"
+        )
+
+    mobius.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Adapter scale-out")
+    parser.add_argument("--replicas", default="1,2,4", help="comma separated")
+    parser.add_argument("--nodes", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=1000, help="messages/s")
+    parser.add_argument("--readings", type=int, default=1, help="per message")
+    parser.add_argument("--workers", type=int, default=2, help="per replica")
+    parser.add_argument("--latency", type=float, default=20, help="Mobius, ms")
+    parser.add_argument("--duration", type=float, default=10, help="seconds")
+    parser.add_argument("--group", default="bench", help="shared subscription")
+    parser.add_argument("--host", default="localhost", help="MQTT broker")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--metrics-port", type=int, default=9200)
+    main(parser.parse_args())
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import os
+import socket
+from typing import Optional
 
 import yaml
 from pydantic import BaseModel
@@ -14,11 +16,61 @@ class MqttConfig(BaseModel):
     tls: bool
     user: str
     password: str
+    # Replicas with the same group share the messages, through MQTT v5
+    # shared subscriptions
+    shared_group: Optional[str] = None
+
+
+class ForwarderConfig(BaseModel):
+    workers: int = 8
+    queue_size: int = 1000
+    timeout_seconds: float = 5
+    # "drop_oldest" or "drop_newest"
+    overflow: str = "drop_oldest"
+
+
+class BatchingConfig(BaseModel):
+    enabled: bool = False
+    # "reading" or "session"
+    group_by: str = "reading"
+    max_readings: int = 64
+    max_delay_seconds: float = 1
+
+
+class SpoolConfig(BaseModel):
+    enabled: bool = True
+    path: str = "data/spool.sqlite"
+    max_requests: int = 100_000
+    # Requests per second resent once Mobius is back
+    drain_rate: float = 10
+    base_backoff_seconds: float = 1
+    max_backoff_seconds: float = 300
+
+
+class ContainersConfig(BaseModel):
+    # Session containers remembered, the most recent are loaded at startup
+    max_sessions: int = 1000
+    warm: bool = True
+
+
+class MetricsConfig(BaseModel):
+    enabled: bool = True
+    host: str = "0.0.0.0"
+    port: int = 9108
+    # Throughput log period
+    report_seconds: float = 60
 
 
 class Config(BaseModel):
     mobius_uri: str
+    # Name of this replica, the hostname by default
+    replica: str = socket.gethostname()
     mqtt: MqttConfig
+    forwarder: ForwarderConfig = ForwarderConfig()
+    batching: BatchingConfig = BatchingConfig()
+    spool: SpoolConfig = SpoolConfig()
+    containers: ContainersConfig = ContainersConfig()
+    metrics: MetricsConfig = MetricsConfig()
 
     @staticmethod
     def _load() -> Config:
@@ -26,7 +78,9 @@ class Config(BaseModel):
         path_list = script_path.split(os.sep)
         relpath = "/config.yaml"
 
-        path = "/".join(path_list[:-1]) + relpath
+        path = os.environ.get(
+            "MOBIUS_ADAPTER_CONFIG", "/".join(path_list[:-1]) + relpath
+        )
         with open(path) as f:
             return Config.parse_obj(yaml.load(f, Loader=yaml.Loader))
 
@@ -0,0 +1,113 @@
+from collections import OrderedDict
+from threading import Event, Lock
+from typing import Optional
+
+import requests
+
+from utils import MobiusRequest, create_session_container, list_session_containers, send
+
+
+class Creation:
+    def __init__(self):
+        self.done = Event()
+        self.error: Optional[requests.RequestException] = None
+
+
+# Remembers the sessionIDs whose container exists, up to max_sessions,
+# the least recently used are forgotten. A content instance for an
+# unknown session creates its container first, exactly once: concurrent
+# requests for that session wait for the same creation.
+class ContainerCache:
+    def __init__(self, max_sessions: int = 1000):
+        self._max_sessions = max_sessions
+        self._lock = Lock()
+        self._known: OrderedDict[int, None] = OrderedDict()
+        self._creating: dict[int, Creation] = {}
+
+        self.hits = 0
+        self.created = 0
+        self.waited = 0
+
+    def __len__(self) -> int:
+        return len(self._known)
+
+    def add(self, sessionID: int):
+        with self._lock:
+            self._known[sessionID] = None
+            self._known.move_to_end(sessionID)
+
+            while len(self._known) > self._max_sessions:
+                self._known.popitem(last=False)
+
+    def discard(self, sessionID: int):
+        with self._lock:
+            self._known.pop(sessionID, None)
+
+    # Loads the most recent containers, sessionIDs being timestamps
+    def warm(self, session: requests.Session, timeout: float):
+        try:
+            sessionIDs = list_session_containers(session, timeout)
+        # A server not answering discovery requests, e.g. mock_mobius
+        except (requests.RequestException, ValueError, KeyError, TypeError) as error:
+            print(f"[WARNING] Couldn't list the session containers: {error}")
+            return
+
+        for sessionID in sorted(sessionIDs)[-self._max_sessions :]:
+            self.add(sessionID)
+
+        print(f"[INFO] Found {len(self)} session containers")
+
+    def ensure(self, session: requests.Session, timeout: float, sessionID: int):
+        with self._lock:
+            if sessionID in self._known:
+                self._known.move_to_end(sessionID)
+                self.hits += 1
+                return
+
+            creation = self._creating.get(sessionID)
+            owner = creation is None
+            if owner:
+                creation = Creation()
+                self._creating[sessionID] = creation
+            else:
+                self.waited += 1
+
+        if not owner:
+            # Connecting and reading may take a timeout each
+            if not creation.done.wait(2 * timeout):
+                raise requests.Timeout(f"Creation of container '{sessionID}' timed out")
+            if creation.error is not None:
+                raise creation.error
+            return
+
+        try:
+            send(session, timeout, create_session_container(sessionID))
+            self.add(sessionID)
+            self.created += 1
+        except requests.RequestException as error:
+            creation.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._creating[sessionID]
+            creation.done.set()
+
+    # Sends a request making sure its session container exists
+    def send(self, session: requests.Session, timeout: float, request: MobiusRequest):
+        if request.sessionID is None:
+            send(session, timeout, request)
+            return
+
+        self.ensure(session, timeout, request.sessionID)
+
+        # The container was just created, or already existed
+        if request.resourceType == 3:
+            return
+
+        try:
+            send(session, timeout, request)
+        except requests.HTTPError as error:
+            # Deleted behind our back, it will be created again on retry
+            if error.response is not None and error.response.status_code == 404:
+                self.discard(request.sessionID)
+            raise
@@ -0,0 +1,128 @@
+import queue
+import time
+import zlib
+from threading import Lock, Thread
+from typing import Optional
+
+import requests
+from containers import ContainerCache
+from requests.adapters import HTTPAdapter
+from spool import Spool
+
+from utils import MobiusRequest, is_retryable, send
+
+
+# Sends the requests to Mobius from a pool of workers, sharing keep-alive
+# connections, so that the MQTT thread never waits for HTTP. Requests
+# with the same key (the sessionID) go to the same worker, in order: a
+# session's container is created before its content instances. When a
+# worker's queue is full the oldest or the newest request is dropped,
+# following overflow, into the spool if there's one. Failed requests
+# that may succeed later are spooled too. With containers, the session
+# container of a request is created when missing.
+class Forwarder:
+    def __init__(
+        self,
+        workers: int = 8,
+        queue_size: int = 1000,
+        timeout_seconds: float = 5,
+        overflow: str = "drop_oldest",
+        spool: Optional[Spool] = None,
+        containers: Optional[ContainerCache] = None,
+    ):
+        if overflow not in ["drop_oldest", "drop_newest"]:
+            raise ValueError(f"Invalid overflow policy '{overflow}'")
+
+        self._timeout = timeout_seconds
+        self._overflow = overflow
+        self._spool = spool
+        self._send = containers.send if containers is not None else send
+        self._queues: list[queue.Queue[Optional[MobiusRequest]]] = [
+            queue.Queue(maxsize=queue_size) for _ in range(workers)
+        ]
+        self._threads: list[Thread] = []
+
+        self.session = requests.Session()
+        # One more connection for the spool drainer
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers + 1)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._lock = Lock()
+        self.submitted = 0
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def start(self):
+        for x in self._queues:
+            thread = Thread(target=self._work, args=(x,), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    # Sends what's queued, within timeout seconds
+    def stop(self, timeout: float = 10):
+        deadline = time.monotonic() + timeout
+        for x in self._queues:
+            try:
+                x.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+
+        for thread in self._threads:
+            thread.join(max(0, deadline - time.monotonic()))
+
+        self.session.close()
+
+    def submit(self, key: int, request: MobiusRequest):
+        worker = self._queues[zlib.crc32(str(key).encode()) % len(self._queues)]
+
+        with self._lock:
+            self.submitted += 1
+
+        try:
+            worker.put_nowait(request)
+            return
+        except queue.Full:
+            pass
+
+        with self._lock:
+            self.dropped += 1
+
+        dropped: Optional[MobiusRequest] = request
+        if self._overflow == "drop_oldest":
+            try:
+                dropped = worker.get_nowait()
+                worker.task_done()
+                worker.put_nowait(request)
+            except (queue.Empty, queue.Full):
+                pass
+
+        if dropped is not None and self._spool is not None:
+            self._spool.put(dropped)
+
+    def depth(self) -> list[int]:
+        return [x.qsize() for x in self._queues]
+
+    def _work(self, pending: queue.Queue[Optional[MobiusRequest]]):
+        while True:
+            request = pending.get()
+            if request is None:
+                pending.task_done()
+                return
+
+            try:
+                self._send(self.session, self._timeout, request)
+
+                with self._lock:
+                    self.sent += 1
+            except requests.RequestException as error:
+                print(f"[ERROR] Mobius request failed: {error}")
+
+                with self._lock:
+                    self.failed += 1
+
+                if self._spool is not None and is_retryable(error):
+                    self._spool.put(request, attempts=1)
+            finally:
+                pending.task_done()
@@ -0,0 +1,159 @@
+import json
+import struct
+
+from utils import Data
+
+# Binary reading frames, little endian:
+#
+#   header: version (B), readings (B), sessionID (I), readingID (I)
+#   reading: payloadType (B), canID (B), sensorNumber (B), value (B), count (I)
+#
+# payloadType is 0 for "total" and 1 for "window". JSON payloads always
+# start with '{' (a reading) or '[' (a snapshot of readings), so the first
+# byte tells the formats apart.
+#
+# Version 2 frames are deltas: they only carry the window readings that
+# changed since the previous frame of the session, the receiver carries
+# the others forward. Version 1 frames are full snapshots (keyframes).
+# Keep in sync with backend/app/utils/frames.py
+FRAME_VERSION = 1
+DELTA_FRAME_VERSION = 2
+FRAME_HEADER = struct.Struct("<BBII")
+FRAME_READING = struct.Struct("<BBBBI")
+
+
+def to_data(
+    nodeID: int,
+    payloadType: str,
+    canID: int,
+    sensorNumber: int,
+    sessionID: int,
+    readingID: int,
+    value: int,
+    count: int,
+) -> Data:
+    # Windows are stored as "w<n>", with the count as value
+    if payloadType == "window":
+        payloadType = f"w{value}"
+        value = count
+
+    return Data(
+        payloadType=payloadType,
+        nodeID=nodeID,
+        canID=canID,
+        sensorNumber=sensorNumber,
+        sessionID=sessionID,
+        readingID=readingID,
+        value=value,
+    )
+
+
+def decode_frame(nodeID: int, frame: bytes) -> list[Data]:
+    if len(frame) < FRAME_HEADER.size:
+        raise ValueError(f"Invalid frame length '{len(frame)}'")
+
+    version, readings, sessionID, readingID = FRAME_HEADER.unpack_from(frame)
+    if version not in [FRAME_VERSION, DELTA_FRAME_VERSION]:
+        raise ValueError(f"Unsupported frame version '{version}'")
+
+    if len(frame) != FRAME_HEADER.size + readings * FRAME_READING.size:
+        raise ValueError(f"Invalid frame length '{len(frame)}'")
+
+    return [
+        to_data(
+            nodeID,
+            "total" if payloadType == 0 else "window",
+            canID,
+            sensorNumber,
+            sessionID,
+            readingID,
+            value,
+            count,
+        )
+        for payloadType, canID, sensorNumber, value, count in FRAME_READING.iter_unpack(
+            frame[FRAME_HEADER.size :]
+        )
+    ]
+
+
+def decode_json(nodeID: int, decoded: dict) -> Data:
+    return to_data(
+        nodeID,
+        decoded["payloadType"],
+        decoded["data"]["canID"],
+        decoded["data"]["sensorNumber"],
+        decoded["data"]["sessionID"],
+        decoded["data"]["readingID"],
+        decoded["data"]["value"],
+        decoded["data"]["count"],
+    )
+
+
+def decode_payload(nodeID: int, payload: bytes) -> list[Data]:
+    # JSON fallback, a single reading or a snapshot
+    if payload[:1] == b"{":
+        return [decode_json(nodeID, json.loads(payload))]
+
+    if payload[:1] == b"[":
+        return [decode_json(nodeID, x) for x in json.loads(payload)]
+
+    return decode_frame(nodeID, payload)
+
+
+class SessionState:
+    def __init__(self, sessionID: int):
+        self.sessionID = sessionID
+        self.readings: dict[tuple[str, int, int], Data] = {}
+
+
+# Rebuilds the full snapshots of the Nodes sending delta frames, keeping
+# the last reading of every sensor of their current session. Without
+# carry_forward, e.g. when the frames of a Node are shared among
+# replicas, delta frames only yield the readings they carry: they're
+# counted in partial and reported.
+class FrameDecoder:
+    def __init__(self, carry_forward: bool = True):
+        self._carry_forward = carry_forward
+        # By (applicationID, nodeID)
+        self._sessions: dict[tuple[str, int], SessionState] = {}
+
+        self.partial = 0
+
+    def decode(self, applicationID: str, nodeID: int, payload: bytes) -> list[Data]:
+        readings = decode_payload(nodeID, payload)
+
+        # Only binary frames can be deltas
+        if payload[:1] not in [bytes([FRAME_VERSION]), bytes([DELTA_FRAME_VERSION])]:
+            return readings
+
+        if not self._carry_forward:
+            if payload[:1] == bytes([DELTA_FRAME_VERSION]):
+                if self.partial == 0:
+                    print(
+                        f"[WARNING] Node {nodeID} of '{applicationID}' sends delta "
+                        "frames, forwarded as partial snapshots with shared "
+                        "subscriptions: disable its compression"
+                    )
+                self.partial += 1
+
+            return readings
+
+        version, _, sessionID, readingID = FRAME_HEADER.unpack_from(payload)
+
+        state = self._sessions.get((applicationID, nodeID))
+        if state is None or state.sessionID != sessionID:
+            state = SessionState(sessionID)
+            self._sessions[(applicationID, nodeID)] = state
+
+        received = {(x.payloadType, x.canID, x.sensorNumber): x for x in readings}
+        state.readings.update(received)
+
+        if version == FRAME_VERSION:
+            return readings
+
+        # Only window snapshots are sent as deltas
+        return readings + [
+            x.copy(update={"readingID": readingID})
+            for key, x in state.readings.items()
+            if key not in received and x.payloadType != "total"
+        ]
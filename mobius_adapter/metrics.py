@@ -0,0 +1,245 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from typing import Callable, Optional
+
+# Metrics in the Prometheus text format, served on GET /metrics:
+#
+#   mobius_adapter_messages_received_total{topic}   MQTT messages
+#   mobius_adapter_decode_seconds                   payload decoding
+#   mobius_adapter_request_seconds{status}          Mobius requests
+#   mobius_adapter_requests_in_flight
+#   mobius_adapter_queue_depth{worker}              forwarder queues
+#   mobius_adapter_dropped_total                    forwarder overflow
+#
+# along with the counters of the forwarder, spool, batcher, container
+# cache and frame decoder, read when scraped.
+
+Labels = tuple[tuple[str, str], ...]
+
+DECODE_BUCKETS = [0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.01]
+REQUEST_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+
+def format_labels(labels: Labels, extra: Optional[tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra is not None else [])
+    if len(pairs) == 0:
+        return ""
+
+    return "{" + ",".join(f'{x}="{y}"' for x, y in pairs) + "}"
+
+
+def format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._lock = Lock()
+
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} {self.type}",
+        ] + self.samples()
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str):
+        super().__init__(name, help)
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    # Sum over the labels
+    def total(self) -> float:
+        with self._lock:
+            return sum(self._values.values())
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = list(self._values.items())
+
+        return [f"{self.name}{format_labels(x)} {format_value(y)}" for x, y in values]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, amount: float = 1, **labels: str):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: list[float]):
+        super().__init__(name, help)
+        self._buckets = sorted(buckets)
+        # Per labels: bucket counts (the last is +Inf), sum
+        self._values: dict[Labels, tuple[list[int], float]] = {}
+
+    def count(self) -> int:
+        with self._lock:
+            return sum(sum(x) for x, _ in self._values.values())
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self._buckets) + 1), 0))
+            for i, bucket in enumerate(self._buckets):
+                if value <= bucket:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+
+            self._values[key] = (counts, total + value)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = [(x, list(y), z) for x, (y, z) in self._values.items()]
+
+        lines = []
+        for labels, counts, total in values:
+            cumulative = 0
+            buckets = [format_value(x) for x in self._buckets] + ["+Inf"]
+            for bucket, count in zip(buckets, counts):
+                cumulative += count
+                le = ("le", bucket)
+                lines.append(
+                    f"{self.name}_bucket{format_labels(labels, le)} {cumulative}"
+                )
+
+            lines.append(
+                f"{self.name}_sum{format_labels(labels)} {format_value(total)}"
+            )
+            lines.append(f"{self.name}_count{format_labels(labels)} {cumulative}")
+
+        return lines
+
+
+# A value owned by a component, e.g. Forwarder.sent, read when scraped.
+# collect returns a value, or the values by the label
+class Collected(Metric):
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        type: str,
+        collect: Callable[[], float | dict[str, float]],
+        label: Optional[str] = None,
+    ):
+        super().__init__(name, help)
+        self.type = type
+        self._collect = collect
+        self._label = label
+
+    def samples(self) -> list[str]:
+        values = self._collect()
+        if self._label is None:
+            return [f"{self.name} {format_value(values)}"]
+
+        return [
+            f"{self.name}{format_labels(((self._label, x),))} {format_value(y)}"
+            for x, y in values.items()
+        ]
+
+
+class Registry:
+    def __init__(self):
+        self._lock = Lock()
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self.register(Counter(name, help))
+
+    def gauge(self, name: str, help: str) -> Gauge:
+        return self.register(Gauge(name, help))
+
+    def histogram(self, name: str, help: str, buckets: list[float]) -> Histogram:
+        return self.register(Histogram(name, help, buckets))
+
+    def collect(
+        self,
+        name: str,
+        help: str,
+        type: str,
+        collect: Callable[[], float | dict[str, float]],
+        label: Optional[str] = None,
+    ):
+        self.register(Collected(name, help, type, collect, label))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+        for metric in metrics:
+            try:
+                lines += metric.render()
+            except Exception as error:
+                print(f"[ERROR] Couldn't collect '{metric.name}': {error}")
+
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+messages_received = registry.counter(
+    "mobius_adapter_messages_received_total", "MQTT messages received, by topic"
+)
+decode_seconds = registry.histogram(
+    "mobius_adapter_decode_seconds", "Time to decode a payload", DECODE_BUCKETS
+)
+request_seconds = registry.histogram(
+    "mobius_adapter_request_seconds",
+    "Mobius request latency, by status code ('error' without a response)",
+    REQUEST_BUCKETS,
+)
+requests_in_flight = registry.gauge(
+    "mobius_adapter_requests_in_flight", "Mobius requests waiting for a response"
+)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+
+        body = registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # Scrapes aren't worth a log line
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host: str, port: int) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    Thread(target=server.serve_forever, daemon=True).start()
+
+    print(f"[INFO] Serving metrics on http://{host}:{port}/metrics")
+    return server
@@ -1,49 +1,64 @@
-import json
+import time
+from typing import Optional
 
+from batcher import Batcher
+from forwarder import Forwarder
+from frames import FrameDecoder
+from metrics import decode_seconds, messages_received, registry
 from paho.mqtt.client import Client, MQTTMessage
 
-from utils import Data, create_session_container, insert
+from utils import create_session_container, insert
 
 
-def register_callbacks(client: Client):
-    def on_connect(client: Client, userdata, flags, rc):
+# HTTP requests are handed to the forwarder, never sent from paho's thread
+# With shared_group, the replicas of the group share the messages, each
+# one received by a single replica
+def register_callbacks(
+    client: Client,
+    forwarder: Forwarder,
+    batcher: Optional[Batcher] = None,
+    shared_group: Optional[str] = None,
+):
+    # Payloads of a Node are received in order by this thread, unless
+    # they're shared among replicas
+    frame_decoder = FrameDecoder(carry_forward=shared_group is None)
+    registry.collect(
+        "mobius_adapter_partial_frames_total",
+        "Delta frames forwarded without the carried forward readings",
+        "counter",
+        lambda: frame_decoder.partial,
+    )
+    prefix = f"$share/{shared_group}/" if shared_group is not None else ""
+
+    # MQTT v5 adds the properties
+    def on_connect(client: Client, userdata, flags, rc, properties=None):
         print("[INFO] Connected to MQTT broker")
 
-        client.subscribe("+/+/payload")
-        client.subscribe("+/+/sessions")
+        client.subscribe(prefix + "+/+/payload")
+        client.subscribe(prefix + "+/+/sessions")
 
-        print("[INFO] Subscribed to '+/+/payload' and '+/+/status'")
+        print(f"[INFO] Subscribed to '{prefix}+/+/payload' and '{prefix}+/+/sessions'")
 
     def on_message(client, userdata, msg: MQTTMessage):
-        print(f"[INFO] Received '{msg.payload.decode()}' from '{msg.topic}'")
-
         applicationID, nodeID, topic = msg.topic.split("/")
         nodeID = int(nodeID)
-
-        payload = msg.payload.decode()
+        messages_received.inc(topic=topic)
 
         if topic == "payload":
-            decoded_data = json.loads(payload)
-
-            if decoded_data["payloadType"] == "window":
-                decoded_data["payloadType"] = f"w{decoded_data['data']['value']}"
-                decoded_data["data"]["value"] = decoded_data["data"]["count"]
+            started = time.perf_counter()
+            readings = frame_decoder.decode(applicationID, nodeID, msg.payload)
+            decode_seconds.observe(time.perf_counter() - started)
 
-            sensor_data = Data(
-                payloadType=decoded_data["payloadType"],
-                nodeID=nodeID,
-                canID=decoded_data["data"]["canID"],
-                sensorNumber=decoded_data["data"]["sensorNumber"],
-                sessionID=decoded_data["data"]["sessionID"],
-                readingID=decoded_data["data"]["readingID"],
-                value=decoded_data["data"]["value"],
-            )
+            for sensor_data in readings:
+                if batcher is not None:
+                    batcher.add(sensor_data)
+                    continue
 
-            insert(sensor_data)
+                forwarder.submit(sensor_data.sessionID, insert(sensor_data))
 
         elif topic == "sessions":
-            new_sessionID = int(payload)
-            create_session_container(new_sessionID)
+            new_sessionID = int(msg.payload.decode())
+            forwarder.submit(new_sessionID, create_session_container(new_sessionID))
         else:
             raise ValueError(f"Invalid topic '{topic}'")
 
@@ -0,0 +1,179 @@
+import os
+import sqlite3
+import time
+from random import uniform
+from threading import Lock, Thread
+from typing import Optional
+
+import requests
+from containers import ContainerCache
+
+from utils import MobiusRequest, is_retryable, send
+
+
+# Disk-backed store of the requests Mobius didn't accept, or that didn't
+# fit the forwarder's queues. A request is retried after a backoff
+# doubling at each attempt, up to max_backoff_seconds. Requests are keyed
+# by their X-M2M-RI, so spooling one twice keeps a single copy. When
+# max_requests is exceeded the oldest ones are evicted.
+class Spool:
+    def __init__(
+        self,
+        path: str,
+        max_requests: int = 100_000,
+        base_backoff_seconds: float = 1,
+        max_backoff_seconds: float = 300,
+    ):
+        self._lock = Lock()
+        self._max_requests = max_requests
+        self._base_backoff_seconds = base_backoff_seconds
+        self._max_backoff_seconds = max_backoff_seconds
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS spool ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "ri TEXT NOT NULL UNIQUE, "
+            "request TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL, "
+            "next_at REAL NOT NULL, "
+            "created_at REAL NOT NULL)"
+        )
+
+        self._size: int = self._db.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+        self.spooled = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def backoff(self, attempts: int) -> float:
+        # Jitter spreads the retries of the requests failed together
+        return uniform(0.5, 1) * min(
+            self._max_backoff_seconds, self._base_backoff_seconds * 2**attempts
+        )
+
+    def put(self, request: MobiusRequest, attempts: int = 0):
+        now = time.time()
+
+        with self._lock:
+            inserted = self._db.execute(
+                "INSERT OR IGNORE INTO spool "
+                "(ri, request, attempts, next_at, created_at) VALUES (?, ?, ?, ?, ?)",
+                (
+                    request.ri,
+                    request.json(),
+                    attempts,
+                    now + self.backoff(attempts),
+                    now,
+                ),
+            )
+            self._size += inserted.rowcount
+            self.spooled += inserted.rowcount
+
+            excess = self._size - self._max_requests
+            if excess > 0:
+                self._db.execute(
+                    "DELETE FROM spool WHERE id IN "
+                    "(SELECT id FROM spool ORDER BY id LIMIT ?)",
+                    (excess,),
+                )
+                self._size -= excess
+                self.evicted += excess
+                print(f"[WARNING] Spool full, evicted {excess} oldest requests")
+
+    # Requests whose backoff elapsed, oldest first
+    def due(self, limit: int) -> list[tuple[int, MobiusRequest, int]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, request, attempts FROM spool WHERE next_at <= ? "
+                "ORDER BY id LIMIT ?",
+                (time.time(), limit),
+            ).fetchall()
+
+        return [(id, MobiusRequest.parse_raw(x), attempts) for id, x, attempts in rows]
+
+    def retry(self, id: int, attempts: int):
+        with self._lock:
+            self._db.execute(
+                "UPDATE spool SET attempts = ?, next_at = ? WHERE id = ?",
+                (attempts, time.time() + self.backoff(attempts), id),
+            )
+
+    def ack(self, id: int):
+        with self._lock:
+            deleted = self._db.execute("DELETE FROM spool WHERE id = ?", (id,))
+            self._size -= deleted.rowcount
+
+    def oldest_age(self) -> float:
+        with self._lock:
+            oldest = self._db.execute("SELECT MIN(created_at) FROM spool").fetchone()[0]
+
+        return time.time() - oldest if oldest is not None else 0
+
+
+# Resends the spooled requests, at most drain_rate per second, so that
+# Mobius coming back isn't flooded with the backlog. A failure stops the
+# current round: while Mobius is down a single request probes it.
+class SpoolDrainer:
+    def __init__(
+        self,
+        spool: Spool,
+        session: requests.Session,
+        timeout_seconds: float = 5,
+        drain_rate: float = 10,
+        report_seconds: float = 60,
+        containers: Optional[ContainerCache] = None,
+    ):
+        self._spool = spool
+        self._send = containers.send if containers is not None else send
+        self._session = session
+        self._timeout = timeout_seconds
+        self._interval = 1 / drain_rate
+        self._report_seconds = report_seconds
+
+        self.drained = 0
+        self.retried = 0
+        self.discarded = 0
+
+    def start(self):
+        Thread(target=self._run, daemon=True).start()
+
+    def _drain(self) -> bool:
+        for id, request, attempts in self._spool.due(100):
+            try:
+                self._send(self._session, self._timeout, request)
+                self._spool.ack(id)
+                self.drained += 1
+            except requests.RequestException as error:
+                if not is_retryable(error):
+                    print(f"[ERROR] Discarding spooled request {request.ri}: {error}")
+                    self._spool.ack(id)
+                    self.discarded += 1
+                    continue
+
+                self._spool.retry(id, attempts + 1)
+                self.retried += 1
+                return False
+            finally:
+                time.sleep(self._interval)
+
+        return True
+
+    def _run(self):
+        reported_at = time.monotonic()
+
+        while True:
+            if not self._drain() or len(self._spool.due(1)) == 0:
+                time.sleep(1)
+
+            if time.monotonic() - reported_at >= self._report_seconds:
+                reported_at = time.monotonic()
+                if len(self._spool) > 0:
+                    print(
+                        f"[INFO] Spool has {len(self._spool)} requests, "
+                        f"oldest {self._spool.oldest_age():.0f}s"
+                    )
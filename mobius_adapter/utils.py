@@ -1,6 +1,10 @@
+import time
 from datetime import datetime
+from typing import Optional
+from uuid import uuid4
 
 import requests
+from metrics import request_seconds, requests_in_flight
 from pydantic import BaseModel
 
 from config import get_config
@@ -25,22 +29,36 @@ def timestamp_millis() -> int:
     return int(datetime.now().timestamp() * 1000)
 
 
-def insert(data: Data):
-    requests.post(
-        f"{config.mobius_uri}/{data.sessionID}",
-        headers={
-            "X-M2M-Origin": "MONEMA",
-            "Content-Type": "application/json;ty=4",
-            "X-M2M-RI": str(timestamp_millis()),
-        },
-        json={
+# A oneM2M request, the X-M2M-RI identifies it across retries
+class MobiusRequest(BaseModel):
+    # Relative to mobius_uri
+    path: str
+    resourceType: int
+    ri: str
+    body: dict
+    sessionID: Optional[int] = None
+
+
+def request_id() -> str:
+    return f"{timestamp_millis()}-{uuid4().hex}"
+
+
+def content_instance(
+    sessionID: int, readingID: int, sensorData: dict | list[dict]
+) -> MobiusRequest:
+    return MobiusRequest(
+        path=f"/{sessionID}",
+        resourceType=4,
+        ri=request_id(),
+        sessionID=sessionID,
+        body={
             "m2m:cin": {
                 "con": {
                     "metadata": {
-                        "sensorId": data.sessionID,
-                        "readingTimestamp": data.readingID,
+                        "sensorId": sessionID,
+                        "readingTimestamp": readingID,
                     },
-                    "sensorData": data.dict(),
+                    "sensorData": sensorData,
                     "cnf": "application/json:0",
                 }
             }
@@ -48,13 +66,89 @@ def insert(data: Data):
     )
 
 
-def create_session_container(sessionID: int):
-    requests.post(
+def insert(data: Data) -> MobiusRequest:
+    return content_instance(data.sessionID, data.readingID, data.dict())
+
+
+# A batch of readings of the same session, as a single content instance
+def insert_batch(readings: list[Data]) -> MobiusRequest:
+    return content_instance(
+        readings[0].sessionID,
+        min(x.readingID for x in readings),
+        [x.dict() for x in readings],
+    )
+
+
+def create_session_container(sessionID: int) -> MobiusRequest:
+    return MobiusRequest(
+        path="",
+        resourceType=3,
+        ri=request_id(),
+        body={"m2m:cnt": {"rn": str(sessionID)}},
+        sessionID=sessionID,
+    )
+
+
+# sessionIDs of the containers found in Mobius
+def list_session_containers(session: requests.Session, timeout: float) -> list[int]:
+    response = session.get(
         config.mobius_uri,
         headers={
-            "Content-Type": "application/json;ty=3",
-            "X-M2M-RI": str(timestamp_millis()),
             "X-M2M-Origin": "MONEMA",
+            "X-M2M-RI": request_id(),
+            "Accept": "application/json",
         },
-        json={"m2m:cnt": {"rn": str(sessionID)}},
+        params={"fu": 1, "ty": 3},
+        timeout=timeout,
+    )
+    response.raise_for_status()
+
+    # Either a list or a space separated string of resource URIs
+    uris = response.json()["m2m:uril"]
+    if isinstance(uris, str):
+        uris = uris.split()
+
+    names = [x.rstrip("/").split("/")[-1] for x in uris]
+    return [int(x) for x in names if x.isnumeric()]
+
+
+def send(session: requests.Session, timeout: float, request: MobiusRequest):
+    started = time.perf_counter()
+    requests_in_flight.inc()
+
+    try:
+        response = session.post(
+            f"{config.mobius_uri}{request.path}",
+            headers={
+                "X-M2M-Origin": "MONEMA",
+                "Content-Type": f"application/json;ty={request.resourceType}",
+                "X-M2M-RI": request.ri,
+            },
+            json=request.body,
+            timeout=timeout,
+        )
+    except requests.RequestException:
+        request_seconds.observe(time.perf_counter() - started, status="error")
+        raise
+    finally:
+        requests_in_flight.dec()
+
+    request_seconds.observe(
+        time.perf_counter() - started, status=str(response.status_code)
+    )
+
+    # The container may already exist
+    if request.resourceType == 3 and response.status_code == 409:
+        return
+
+    response.raise_for_status()
+
+
+# Mobius being down or slow, or a container not created yet
+def is_retryable(error: requests.RequestException) -> bool:
+    response = error.response
+    return (
+        response is None
+        or response.status_code >= 500
+        or response.status_code in [404, 408, 429]
     )
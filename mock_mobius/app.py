@@ -24,6 +24,10 @@ def create_app(config_filename: str = "config.json") -> Flask:
     db = MongoEngine()
     db.init_app(app)
 
+    # Content instances and readings received, to compare batched and
+    # unbatched adapters
+    stats = {"requests": 0, "readings": 0}
+
     @app.route("/<SENSOR_PATH>", methods=["POST"])
     def publish(SENSOR_PATH: str = ""):
         if SENSOR_PATH == "":
@@ -34,8 +38,17 @@ def create_app(config_filename: str = "config.json") -> Flask:
         reading.readingId = secrets.token_urlsafe(16)
         reading.save()
 
+        stats["requests"] += 1
+        stats["readings"] += (
+            len(reading.sensorData) if isinstance(reading.sensorData, list) else 1
+        )
+
         return {}, 200
 
+    @app.route("/", methods=["GET"])
+    def get_stats():
+        return stats, 200
+
     @app.route("/<SENSOR_PATH>", methods=["GET"])
     # Impostare header
     def read(SENSOR_PATH: str = ""):
@@ -3,7 +3,7 @@ from __future__ import annotations
 import json
 
 from flask_mongoengine import Document
-from mongoengine.fields import DictField, FloatField, StringField
+from mongoengine.fields import DynamicField, FloatField, StringField
 
 
 ###############################################################
@@ -16,7 +16,8 @@ class Reading(Document):
     readingTimestamp = StringField(max_length=100, required=True)
     latitude = FloatField()
     longitude = FloatField()
-    sensorData = DictField(required=True)
+    # A reading, or a batch of readings
+    sensorData = DynamicField(required=True)
 
     def to_json(self) -> dict:
         return {
@@ -38,11 +39,11 @@ class Reading(Document):
     def from_json(cls, s: str) -> Reading:
         s_dict = json.loads(s)
         print(s_dict)
+        cin = s_dict["m2m:cin"]
         new_p = Reading()
-        new_p.sensorId = s_dict["m2m:cin"]["con"]["metadata"]["sensorId"]
-        new_p.readingTimestamp = s_dict["m2m:cin"]["con"]["metadata"][
-            "readingTimestamp"
-        ]
-        new_p.sensorData = s_dict["m2m:cin"]["sensorData"]
+        new_p.sensorId = str(cin["con"]["metadata"]["sensorId"])
+        new_p.readingTimestamp = str(cin["con"]["metadata"]["readingTimestamp"])
+        # The adapter sends it within "con", a dict or a list of dicts
+        new_p.sensorData = cin["con"].get("sensorData", cin.get("sensorData"))
 
         return new_p
@@ -1,13 +1,21 @@
 import json
+import signal
+import sys
 import threading
 from os import environ
-from time import sleep
+from queue import Empty, Queue
+from time import monotonic, sleep
+from typing import Optional
 
 import paho.mqtt.client as mqtt
 import yaml
-from can_protocol import DecodedMessage, MessageType
+from can_protocol import DecodedMessage, MessageType, Window
+from compression import DeltaEncoder
+from frames import encode_frame, split
 from irma_bus import IrmaBus
 from mock_bus import MockBus
+from outbox import Outbox, OutboxForwarder
+from snapshot import SnapshotCollector
 
 BYPASS_CAN = bool(environ.get("BYPASS_CAN", 0))
 
@@ -18,11 +26,18 @@ COMMAND_SUBTOPIC = "/command"
 SESSIONS_SUBTOPIC = "/sessions"
 
 
+def load_config() -> dict:
+    with open("config.yaml", "r") as file:
+        loaded_yaml = yaml.load(file, Loader=yaml.Loader)
+        return loaded_yaml["settings"]
+
+
 class Node:
-    def __init__(self):
-        with open("config.yaml", "r") as file:
-            loaded_yaml = yaml.load(file, Loader=yaml.Loader)
-            self.config = loaded_yaml["settings"]
+    def __init__(self, config: Optional[dict] = None):
+        self.config = config if config is not None else load_config()
+
+        # Detectors always have 3 windows, the mock ones can have fewer
+        windows = len(Window)
 
         if not BYPASS_CAN:
             bustype = self.config["can"]["bustype"]
@@ -39,12 +54,48 @@ class Node:
                 filter_id=filter_id,
                 filter_mask=filter_mask,
                 interval_seconds=self.config["can"]["interval_seconds"],
+                detectors=self.config["can"].get("detectors", 4),
+                request_timeout_seconds=self.config["can"].get(
+                    "request_timeout_seconds", 0.5
+                ),
+                record_path=self.config["can"].get("record_path", None),
             )
             print(f"Can type '{bustype}', on channel '{channel}' @{bitrate}")
         else:
-            self.bus = MockBus(interval_seconds=self.config["can"]["interval_seconds"])
+            mock_config = self.config.get("mock", {})
+            windows = mock_config.get("windows", windows)
+            self.bus = MockBus(
+                interval_seconds=self.config["can"]["interval_seconds"],
+                detectors=self.config["can"].get("detectors", 4),
+                windows=windows,
+                fps=mock_config.get("fps", None),
+                seed=mock_config.get("seed", None),
+                bulk=mock_config.get("bulk", False),
+                rate=mock_config.get("rate", 50),
+                alert_probability=mock_config.get("alert_probability", 0),
+                alert_level=mock_config.get("alert_level", 7),
+            )
             print("Started MockBus")
 
+        self.messages: Queue[DecodedMessage] = Queue()
+        self.snapshots = SnapshotCollector(
+            detectors=self.config["can"].get("detectors", 4),
+            deadline_seconds=self.config["can"].get("snapshot_deadline_seconds", 5),
+            windows=windows,
+        )
+
+        # Deltas need binary frames
+        compression_config = self.config.get("compression", {})
+        self.delta_encoder: Optional[DeltaEncoder] = None
+        if (
+            compression_config.get("enabled", False)
+            and self.config["mqtt"].get("payload_format", "binary") == "binary"
+        ):
+            self.delta_encoder = DeltaEncoder(
+                deadband=compression_config.get("deadband", 0),
+                keyframe_every=compression_config.get("keyframe_every", 10),
+            )
+
         self.init_mqtt_client()
 
     def init_mqtt_client(self):
@@ -67,9 +118,23 @@ class Node:
             client.subscribe(self.topic + COMMAND_SUBTOPIC)
             client.subscribe(self.topic + SETTINGS_SUBTOPIC)
 
-            self.launch_keep_alive_daemon()
+            self.forwarder.on_connect()
+
+            # paho reconnects by itself, the daemon must be launched once
+            if not self.keep_alive_launched:
+                self.keep_alive_launched = True
+                self.launch_keep_alive_daemon()
+
+        def on_disconnect(client, userdata, rc):
+            print("Disconnected with result code " + str(rc))
+
+            self.forwarder.on_disconnect()
+
+        def on_publish(client, userdata, mid):
+            self.forwarder.on_publish(mid)
 
         def on_message(client, userdata, msg: mqtt.MQTTMessage):
+            received = monotonic()
             print(f"Someone published '{str(msg.payload)}' on '{msg.topic}'")
 
             topic_sliced = msg.topic.split("/")[2:]
@@ -86,10 +151,36 @@ class Node:
             except ValueError as error:
                 print(f"Caught exception on topic '{msg.topic}': {error}")
 
+            print(
+                f"Handled '{value}' on '{msg.topic}' "
+                f"in {(monotonic() - received) * 1000:.1f} ms"
+            )
+
         self.client.on_connect = on_connect
+        self.client.on_disconnect = on_disconnect
         self.client.on_message = on_message
+        self.client.on_publish = on_publish
 
-        self.client.connect(self.config["mqtt"]["url"], self.config["mqtt"]["port"], 60)
+        outbox_config = self.config.get("outbox", {})
+        self.outbox = Outbox(
+            outbox_config.get("path", "data/outbox.sqlite"),
+            max_messages=outbox_config.get("max_messages", 100_000),
+        )
+        self.forwarder = OutboxForwarder(
+            self.outbox,
+            self.client,
+            replay_rate=outbox_config.get("replay_rate", 50),
+            max_inflight=outbox_config.get("max_inflight", 20),
+        )
+        self.forwarder.start()
+        self.keep_alive_launched = False
+        print(f"Outbox has {len(self.outbox)} pending messages")
+
+        # Connects once loop_start is called, retrying in the background:
+        # with the broker down the Node keeps reading into the Outbox
+        self.client.connect_async(
+            self.config["mqtt"]["url"], self.config["mqtt"]["port"], 60
+        )
 
     def handle_command(self, value: str):
         if value == "stop":
@@ -140,41 +231,70 @@ class Node:
             print(f"Error processing set payload: {error}")
 
     def loop_forever(self):
+        # MQTT commands are handled on paho's network thread, CAN frames are
+        # queued by the bus as they arrive: wake up on a frame or when the
+        # next snapshot deadline passes
+        self.client.loop_start()
+        self.bus.start_listening(self.messages.put)
+
         while True:
-            self.client.loop(0.1)
-            message = self.bus.listen()
-            if message is not None:
+            try:
+                message = self.messages.get(timeout=self.snapshots.next_deadline_in())
                 self.publish_message(message)
+            except Empty:
+                pass
+
+            for snapshot in self.snapshots.expired():
+                self.publish_readings(snapshot)
 
     def publish_message(self, message: DecodedMessage):
         if message["message_type"] in [
             MessageType.RETURN_COUNT_TOTAL,
             MessageType.RETURN_COUNT_WINDOW,
         ]:
-            self.publish_reading(message)
+            snapshot = self.snapshots.add(message)
+            if snapshot is not None:
+                self.publish_readings(snapshot)
         else:
             raise ValueError(f"Unexpected MessageType '{message['message_type']}'")
 
-    def publish_reading(
-        self,
-        message: DecodedMessage,
-    ):
+    def publish_readings(self, messages: list[DecodedMessage]):
+        if self.delta_encoder is not None:
+            for frame in self.delta_encoder.encode(messages):
+                self.enqueue(self.topic + PAYLOAD_SUBTOPIC, frame)
+            return
+
+        if self.config["mqtt"].get("payload_format", "binary") == "binary":
+            for chunk in split(messages):
+                self.enqueue(self.topic + PAYLOAD_SUBTOPIC, encode_frame(chunk))
+            return
+
+        # JSON fallback
         data: str = json.dumps(
-            {
-                "payloadType": "total"
-                if message["message_type"] == MessageType.RETURN_COUNT_TOTAL
-                else "window",
-                "data": {
-                    "canID": message["n_detector"],
-                    "sensorNumber": message["sipm"],
-                    "value": message["value"],
-                    "count": message["count"],
-                    "sessionID": message["sessionID"],
-                    "readingID": message["readingID"],
-                },
-            }
+            [
+                {
+                    "payloadType": "total"
+                    if message["message_type"] == MessageType.RETURN_COUNT_TOTAL
+                    else "window",
+                    "data": {
+                        "canID": message["n_detector"],
+                        "sensorNumber": message["sipm"],
+                        "value": message["value"],
+                        "count": message["count"],
+                        "sessionID": message["sessionID"],
+                        "readingID": message["readingID"],
+                    },
+                }
+                for message in messages
+            ]
         )
-        self.client.publish(self.topic + PAYLOAD_SUBTOPIC, data.encode())
+        self.enqueue(self.topic + PAYLOAD_SUBTOPIC, data.encode())
+
+    def enqueue(self, topic: str, payload: bytes):
+        # Readings and sessions go through the Outbox, status messages
+        # are only meaningful when sent right away
+        self.outbox.put(topic, payload)
+        self.forwarder.notify()
 
     def launch_keep_alive_daemon(self):
         thread = threading.Thread(target=self.periodically_send_keep_alive, daemon=True)
@@ -199,7 +319,7 @@ class Node:
 
         self.client.publish(self.topic + STATUS_SUBTOPIC, "start")
         sessionID = self.bus.start_session(mode)
-        self.client.publish(self.topic + SESSIONS_SUBTOPIC, str(sessionID))
+        self.enqueue(self.topic + SESSIONS_SUBTOPIC, str(sessionID).encode())
 
     def stop_rec(self):
         print("Received MQTT message, sending rec end...")
@@ -209,6 +329,12 @@ class Node:
 
 
 if __name__ == "__main__":
+    # Exit cleanly on 'docker stop', so that recordings get closed
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
     node = Node()
 
-    node.loop_forever()
+    try:
+        node.loop_forever()
+    finally:
+        node.bus.stop()
@@ -0,0 +1,84 @@
+# Compares the per-frame can_protocol.decode with decode_batch, on a list
+# of Messages and on a raw buffer of frames.
+#
+# From the node folder:
+#
+#     $ python -m benchmarks.decode
+import argparse
+import time
+from random import choice, randint, seed
+
+from can.message import Message
+from can_protocol import MessageType, decode, decode_batch
+
+
+def generate(frames: int) -> list[Message]:
+    messages = []
+
+    for _ in range(frames):
+        count = randint(0, 2**24 - 1).to_bytes(3, "little")
+        message_type = choice(
+            [MessageType.RETURN_COUNT_WINDOW] * 3 + [MessageType.RETURN_COUNT_TOTAL]
+        )
+
+        messages.append(
+            Message(
+                arbitration_id=0,
+                data=[
+                    randint(0, 2) | choice([0, 0b10000000]),
+                    0,
+                    randint(0, 9),
+                    count[0],
+                    count[1],
+                    count[2],
+                    message_type,
+                    randint(1, 4),
+                ],
+            )
+        )
+
+    return messages
+
+
+def measure(function, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+
+    return (time.perf_counter() - started) / repeat
+
+
+def main(args: argparse.Namespace):
+    seed(args.seed)
+    messages = generate(args.frames)
+    buffer = b"".join(bytes(x.data) for x in messages)
+
+    # Same results, field by field
+    batch = decode_batch(messages)
+    decoded = [decode(x, 0, 0) for x in messages]
+    assert list(batch.count) == [x["count"] for x in decoded]
+    assert list(batch.value) == [x["value"] for x in decoded]
+    assert list(batch.sipm) == [x["sipm"] for x in decoded]
+
+    results = {
+        "decode": measure(lambda: [decode(x, 0, 0) for x in messages], args.repeat),
+        "decode_batch (Messages)": measure(lambda: decode_batch(messages), args.repeat),
+        "decode_batch (buffer)": measure(lambda: decode_batch(buffer), args.repeat),
+    }
+
+    print(f"{args.frames} frames, mean of {args.repeat} runs")
+    print(f"{'decoder':26}{'ms':>10}{'frames/s':>14}{'speedup':>10}")
+    for name, seconds in results.items():
+        print(
+            f"{name:26}{seconds * 1000:>10.2f}{args.frames / seconds:>14.0f}"
+            f"{results['decode'] / seconds:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CAN frames decoding benchmark")
+    parser.add_argument("--frames", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+
+    main(parser.parse_args())
@@ -0,0 +1,62 @@
+# Measures the frames per second MockBus generates and delivers to its
+# listener, frame by frame and in bulk mode, with no pacing.
+#
+# From the node folder:
+#
+#     $ python -m benchmarks.mock_bus --detectors 16
+import argparse
+import time
+
+from mock_bus import MockBus, TrafficGenerator
+
+
+def measure(args: argparse.Namespace, bulk: bool) -> float:
+    received = 0
+
+    def listener(message):
+        nonlocal received
+        received += 1
+
+    bus = MockBus(
+        detectors=args.detectors,
+        windows=args.windows,
+        fps=float("inf"),
+        seed=args.seed,
+        bulk=bulk,
+    )
+    bus.start_listening(listener)
+
+    bus.start_session(0)
+    started = time.perf_counter()
+    time.sleep(args.seconds)
+    bus.stop_session()
+    elapsed = time.perf_counter() - started - 0.5
+    bus.stop()
+
+    assert received == bus.frames
+    return received / elapsed
+
+
+def main(args: argparse.Namespace):
+    # Same seed, same traffic
+    generators = [
+        TrafficGenerator(args.detectors, args.windows, args.seed) for _ in "ab"
+    ]
+    for generator in generators:
+        generator.start_session()
+    assert generators[0].window_frames() == generators[1].window_frames()
+
+    print(f"{args.detectors} detectors, {args.windows} windows, {args.seconds}s runs")
+    for bulk in [False, True]:
+        print(
+            f"{'bulk' if bulk else 'per frame':12}{measure(args, bulk):>12.0f} frames/s"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MockBus throughput benchmark")
+    parser.add_argument("--detectors", type=int, default=4)
+    parser.add_argument("--windows", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--seconds", type=float, default=3)
+    main(parser.parse_args())
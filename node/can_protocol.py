@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import struct
+from array import array
 from enum import IntEnum, auto
-from typing import Optional, TypedDict
+from typing import Callable, Iterable, Optional, TypedDict
 
 from can.message import Message
 
@@ -294,3 +296,107 @@ def decode(
     else:
         print(f"Unexpected MessageType '{data[6]}'")
         # raise ValueError(f"Unexpected MessageType '{data[6]}'")
+
+
+# Reply frame layout: byte0, byte1, byte2, count (3 bytes), type, detector.
+# The 3 bytes count is unpacked as a 2 bytes low part and a 1 byte high part
+REPLY_FRAME = struct.Struct("<BBBHBBB")
+
+
+def _window_value(byte0: int, byte2: int) -> int:
+    return byte0 & 0b00111111
+
+
+def _total_value(byte0: int, byte2: int) -> int:
+    return byte2
+
+
+# Value extractor of each reply type, indexed by the type byte
+BATCH_DISPATCH: tuple[Optional[Callable[[int, int], int]], ...] = tuple(
+    {
+        MessageType.RETURN_COUNT_WINDOW: _window_value,
+        MessageType.RETURN_COUNT_TOTAL: _total_value,
+    }.get(x)
+    for x in range(256)
+)
+
+
+class DecodedBatch:
+    def __init__(self):
+        self.message_type = array("B")
+        self.detector = array("B")
+        self.sipm = array("B")
+        self.value = array("B")
+        self.count = array("I")
+        self.unknown = 0
+
+    def __len__(self) -> int:
+        return len(self.message_type)
+
+    def messages(self, sessionID: int, readingID: int) -> list[DecodedMessage]:
+        return [
+            {
+                "message_type": MessageType(kind),
+                "n_detector": n_detector,
+                "sipm": sipm,
+                "value": value,
+                "count": count,
+                "sessionID": sessionID,
+                "readingID": readingID,
+            }
+            for kind, n_detector, sipm, value, count in zip(
+                self.message_type, self.detector, self.sipm, self.value, self.count
+            )
+        ]
+
+    def to_numpy(self):
+        # numpy isn't a requirement of the node, import it only when needed
+        import numpy as np
+
+        batch = np.empty(
+            len(self),
+            dtype=[
+                ("message_type", "u1"),
+                ("detector", "u1"),
+                ("sipm", "u1"),
+                ("value", "u1"),
+                ("count", "u4"),
+            ],
+        )
+        for field in batch.dtype.names:
+            batch[field] = getattr(self, field)
+
+        return batch
+
+
+def decode_batch(frames: bytes | bytearray | Iterable[Message]) -> DecodedBatch:
+    # Either the concatenated 8 bytes payloads or the Messages
+    if not isinstance(frames, (bytes, bytearray)):
+        frames = b"".join(bytes(x.data) for x in frames)
+
+    if len(frames) % REPLY_FRAME.size != 0:
+        raise ValueError(f"Invalid frames buffer length '{len(frames)}'")
+
+    batch = DecodedBatch()
+    message_type, detector, sipm, value, count = (
+        batch.message_type,
+        batch.detector,
+        batch.sipm,
+        batch.value,
+        batch.count,
+    )
+
+    for frame in REPLY_FRAME.iter_unpack(frames):
+        byte0, _, byte2, count_low, count_high, kind, n_detector = frame
+        extract = BATCH_DISPATCH[kind]
+        if extract is None:
+            batch.unknown += 1
+            continue
+
+        message_type.append(kind)
+        detector.append(n_detector)
+        sipm.append((byte0 >> 7) + 1)
+        value.append(extract(byte0, byte2))
+        count.append(count_low | count_high << 16)
+
+    return batch
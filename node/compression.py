@@ -0,0 +1,63 @@
+from typing import Optional
+
+from can_protocol import DecodedMessage, MessageType
+from frames import encode_delta_frame, encode_frame, split
+
+# (n_detector, sipm, window)
+SensorKey = tuple[int, int, int]
+
+
+# Encodes the window snapshots of a session as delta frames: only the
+# counts that moved by more than deadband since they were last published
+# are sent, the receivers carry the others forward. A full keyframe is
+# sent every keyframe_every snapshots, and as the first one of a session,
+# so that receivers resync after a restart or lost messages.
+class DeltaEncoder:
+    def __init__(self, deadband: int = 0, keyframe_every: int = 10):
+        self._deadband = deadband
+        self._keyframe_every = max(1, keyframe_every)
+
+        self._sessionID: Optional[int] = None
+        self._snapshots = 0
+        self._published: dict[SensorKey, int] = {}
+
+        self.readings = 0
+        self.suppressed = 0
+
+    def encode(self, messages: list[DecodedMessage]) -> list[bytes]:
+        # Totals are sent once, at the end of the session
+        if messages[0]["message_type"] != MessageType.RETURN_COUNT_WINDOW:
+            return [encode_frame(x) for x in split(messages)]
+
+        sessionID = messages[0]["sessionID"]
+        readingID = messages[0]["readingID"]
+
+        if sessionID != self._sessionID:
+            self._sessionID = sessionID
+            self._snapshots = 0
+            self._published = {}
+
+        keyframe = self._snapshots % self._keyframe_every == 0
+        self._snapshots += 1
+
+        changed: list[DecodedMessage] = []
+        for message in messages:
+            key = (message["n_detector"], message["sipm"], message["value"])
+            published = self._published.get(key)
+
+            # The drift from the published count stays within the deadband
+            if (
+                keyframe
+                or published is None
+                or abs(message["count"] - published) > self._deadband
+            ):
+                self._published[key] = message["count"]
+                changed.append(message)
+
+        self.readings += len(messages)
+        self.suppressed += len(messages) - len(changed)
+
+        if keyframe:
+            return [encode_frame(x) for x in split(messages)]
+
+        return [encode_delta_frame(sessionID, readingID, x) for x in split(changed)]
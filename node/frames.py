@@ -0,0 +1,66 @@
+import struct
+
+from can_protocol import DecodedMessage, MessageType
+
+# Binary reading frames, little endian:
+#
+#   header: version (B), readings (B), sessionID (I), readingID (I)
+#   reading: payloadType (B), canID (B), sensorNumber (B), value (B), count (I)
+#
+# payloadType is 0 for "total" and 1 for "window". Version 2 frames are
+# deltas, only carrying the window readings that changed since the
+# previous frame of the session.
+# Keep in sync with backend/app/utils/frames.py
+FRAME_VERSION = 1
+DELTA_FRAME_VERSION = 2
+FRAME_HEADER = struct.Struct("<BBII")
+FRAME_READING = struct.Struct("<BBBBI")
+
+# Readings count is a single byte
+MAX_FRAME_READINGS = 255
+
+
+# Large snapshots take more than one frame, an empty one still takes one
+def split(messages: list[DecodedMessage]) -> list[list[DecodedMessage]]:
+    return [
+        messages[i : i + MAX_FRAME_READINGS]
+        for i in range(0, len(messages), MAX_FRAME_READINGS)
+    ] or [[]]
+
+
+def encode_frame(messages: list[DecodedMessage]) -> bytes:
+    if len(messages) == 0:
+        raise ValueError(f"Invalid number of readings '{len(messages)}'")
+
+    return pack_frame(
+        FRAME_VERSION, messages[0]["sessionID"], messages[0]["readingID"], messages
+    )
+
+
+# Delta frames may be empty, when nothing changed
+def encode_delta_frame(
+    sessionID: int, readingID: int, messages: list[DecodedMessage]
+) -> bytes:
+    return pack_frame(DELTA_FRAME_VERSION, sessionID, readingID, messages)
+
+
+def pack_frame(
+    version: int, sessionID: int, readingID: int, messages: list[DecodedMessage]
+) -> bytes:
+    if len(messages) > MAX_FRAME_READINGS:
+        raise ValueError(f"Invalid number of readings '{len(messages)}'")
+
+    frame = bytearray(FRAME_HEADER.pack(version, len(messages), sessionID, readingID))
+    for message in messages:
+        if message["sessionID"] != sessionID or message["readingID"] != readingID:
+            raise ValueError("Readings of a frame must share sessionID and readingID")
+
+        frame += FRAME_READING.pack(
+            0 if message["message_type"] == MessageType.RETURN_COUNT_TOTAL else 1,
+            message["n_detector"],
+            message["sipm"],
+            message["value"],
+            message["count"],
+        )
+
+    return bytes(frame)
@@ -1,12 +1,15 @@
 import time
 from threading import Lock
-from time import sleep
-from typing import Optional
+from typing import Callable, Optional
 
 import can_protocol
 from apscheduler.schedulers.background import BackgroundScheduler
+from can import Notifier
 from can.interface import Bus
 from can.message import Message
+from can_protocol import MessageType
+from recording import Recorder
+from request_tracker import RequestKey, RequestTracker
 
 
 class IrmaBus:
@@ -18,6 +21,10 @@ class IrmaBus:
         interval_seconds=30,
         filter_id: Optional[int] = None,
         filter_mask: Optional[int] = None,
+        detectors: int = 4,
+        request_timeout_seconds: float = 0.5,
+        report_every: int = 10,
+        record_path: Optional[str] = None,
     ):
         self._bus = Bus(bustype=bustype, channel=channel, bitrate=bitrate)
         if filter_id and filter_mask:
@@ -29,53 +36,102 @@ class IrmaBus:
         self._readingID = None
         self._scheduler = BackgroundScheduler()
         self._lock = Lock()
+        self._tracker = RequestTracker(
+            detectors=detectors, max_timeout=request_timeout_seconds
+        )
+        self._report_every = report_every
+        self._notifier: Optional[Notifier] = None
+        self._recorder: Optional[Recorder] = None
+        if record_path:
+            self._recorder = Recorder(record_path)
+            print(f"Recording CAN frames to '{record_path}'")
 
         self._scheduler.add_job(self.loop, "interval", seconds=interval_seconds)
         self._scheduler.start(paused=True)
 
     def loop(self):
-        sleep(5)
+        started = time.monotonic()
 
         with self._lock:
             self._readingID = int(time.time())
 
-        # Richiesta finestra1
-        self.send(can_protocol.get_window(can_protocol.Window.W1, can_protocol.Sipm.S1))
-        sleep(0.5)
-        self.send(can_protocol.get_window(can_protocol.Window.W1, can_protocol.Sipm.S2))
-        sleep(0.5)
-
-        # Richiesta finestra2
-        self.send(can_protocol.get_window(can_protocol.Window.W2, can_protocol.Sipm.S1))
-        sleep(0.5)
-        self.send(can_protocol.get_window(can_protocol.Window.W2, can_protocol.Sipm.S2))
-        sleep(0.5)
-
-        # Richiesta finestra3
-        self.send(can_protocol.get_window(can_protocol.Window.W3, can_protocol.Sipm.S1))
-        sleep(0.5)
-        self.send(can_protocol.get_window(can_protocol.Window.W3, can_protocol.Sipm.S2))
-        sleep(0.5)
-
-    def listen(self, timeout=0.5) -> Optional[can_protocol.DecodedMessage]:
-        message = self._bus.recv(timeout)
-
-        if self._sessionID is None:
-            self._sessionID = int(time.time())
-
-        if message is None:
+        # Richiesta finestre 1, 2 e 3
+        for window in [
+            can_protocol.Window.W1,
+            can_protocol.Window.W2,
+            can_protocol.Window.W3,
+        ]:
+            for sipm in [can_protocol.Sipm.S1, can_protocol.Sipm.S2]:
+                self.request(
+                    can_protocol.get_window(window, sipm),
+                    (MessageType.RETURN_COUNT_WINDOW, window.value, int(sipm)),
+                )
+
+        self._tracker.cycle(time.monotonic() - started)
+        if self._tracker.cycle_count % self._report_every == 0:
+            print(f"Reading cycles: {self._tracker.report()}")
+
+    def request(self, message: Message, key: RequestKey) -> bool:
+        # Waits for every detector to reply, or for the request timeout
+        self._tracker.sent(key)
+        self.send(message)
+
+        return self._tracker.wait(key)
+
+    def start_listening(self, callback: Callable[[can_protocol.DecodedMessage], None]):
+        # Frames are decoded as soon as they're received, on the notifier thread
+        def on_frame(message: Message):
+            if self._recorder is not None:
+                self._recorder.record(message)
+
+            decoded = self.decode(message)
+            if decoded is not None:
+                callback(decoded)
+
+        self._notifier = Notifier(self._bus, [on_frame])
+
+    def decode(self, message: Message) -> Optional[can_protocol.DecodedMessage]:
+        # Requests are only received from a replay: the first window
+        # request starts a new reading cycle
+        if message.data[6] in [MessageType.GET_WINDOW, MessageType.GET_TOTAL_COUNT]:
+            if message.data[6] == MessageType.GET_WINDOW and message.data[0] == (
+                can_protocol.Window.W1 | can_protocol.Sipm.S1
+            ):
+                with self._lock:
+                    self._readingID = max(int(time.time()), (self._readingID or 0) + 1)
             return None
 
         with self._lock:
+            if self._sessionID is None:
+                self._sessionID = int(time.time())
             if self._readingID is None:
                 self._readingID = int(time.time())
+            sessionID = self._sessionID
             readingID = self._readingID
 
-        return can_protocol.decode(message, self._sessionID, readingID)
+        decoded = can_protocol.decode(message, sessionID, readingID)
+        if decoded is not None:
+            self._tracker.reply(decoded)
+
+        return decoded
 
     def send(self, message: Message, timeout: Optional[float] = None):
         self._bus.send(message, timeout)
 
+        if self._recorder is not None:
+            self._recorder.record(message, is_rx=False)
+
+    def stop(self):
+        self._scheduler.shutdown(wait=False)
+
+        if self._notifier is not None:
+            self._notifier.stop()
+
+        if self._recorder is not None:
+            self._recorder.stop()
+
+        self._bus.shutdown()
+
     def set_hv(self, detector: int, sipm: int, value: int):
         self.send(
             can_protocol.set_hv(
@@ -120,7 +176,10 @@ class IrmaBus:
         time.sleep(0.5)
         self.send(can_protocol.stop_count())
         time.sleep(0.2)
-        self.send(can_protocol.get_total_count(can_protocol.Sipm.S1))
-        sleep(0.5)
-        self.send(can_protocol.get_total_count(can_protocol.Sipm.S2))
-        sleep(0.5)
+
+        # Richiesta total count ai sipm
+        for sipm in [can_protocol.Sipm.S1, can_protocol.Sipm.S2]:
+            self.request(
+                can_protocol.get_total_count(sipm),
+                (MessageType.RETURN_COUNT_TOTAL, 0, int(sipm)),
+            )
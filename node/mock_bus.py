@@ -1,149 +1,243 @@
+import math
 import time
-from queue import Empty, Queue
-from random import randint
-from threading import Lock
-from typing import Optional
+from random import Random
+from threading import Event, Lock, Thread
+from typing import Callable, Optional
 
 import can_protocol
 from apscheduler.schedulers.background import BackgroundScheduler
 from can.message import Message
-from can_protocol import Detector, Sipm, Window
-
-x = {
-    1: {
-        1: 0,
-        2: 0,
-        3: 0,
-    },
-    2: {
-        1: 0,
-        2: 0,
-        3: 0,
-    },
-    "dangerLevel": 0,
-}
-
-
-cache = [dict.copy(x) for _ in range(4)]
-
-
-def init_cache():
-    for detector in cache:
-        detector[1][1] = 0
-        detector[1][2] = 0
-        detector[1][3] = 0
-        detector[2][1] = 0
-        detector[2][2] = 0
-        detector[2][3] = 0
-        detector["dangerLevel"] = randint(0, 9)
-
-
-def gen_total_count(detector: Detector, sipm: Sipm) -> Message:
-    count = 0
-    for sensor in [1, 2]:
-        for key in cache[detector - 1][sensor]:
-            count += cache[detector - 1][sensor][key]
-
-    encoded_count = count.to_bytes(3, "little")
-    byte0 = sipm
-
-    danger_level = cache[detector - 1]["dangerLevel"]
-
-    return Message(
-        arbitration_id=0,
-        data=[
-            byte0,
-            0,
-            danger_level,
-            encoded_count[0],
-            encoded_count[1],
-            encoded_count[2],
-            can_protocol.MessageType.RETURN_COUNT_TOTAL,
-            detector,
-        ],
-    )
+from can_protocol import REPLY_FRAME, MessageType, Sipm
+
+# Counts are sent on 3 bytes
+MAX_COUNT = 2**24 - 1
+
+SIPMS = [Sipm.S1, Sipm.S2]
 
 
-def gen_window_count(detector: Detector, window: Window, sipm: Sipm) -> Message:
-    cache[detector - 1][int(sipm)][int(window)] += randint(0, 100)
-    reading = cache[detector - 1][int(sipm)][int(window)]
-    encoded_reading = reading.to_bytes(3, "little")
-    byte0 = window | sipm
-
-    return Message(
-        arbitration_id=0,
-        data=[
-            byte0,
-            0,
-            0,
-            encoded_reading[0],
-            encoded_reading[1],
-            encoded_reading[2],
-            can_protocol.MessageType.RETURN_COUNT_WINDOW,
-            detector,
-        ],
+def pack_reply(
+    byte0: int, byte2: int, count: int, kind: MessageType, detector: int
+) -> bytes:
+    return REPLY_FRAME.pack(
+        byte0, 0, byte2, count & 0xFFFF, count >> 16, kind, detector
     )
 
 
+class DetectorState:
+    def __init__(self, rates: list[list[float]], danger_level: int):
+        # Mean counts per cycle, by sipm and window
+        self.rates = rates
+        self.counts = [[0] * len(x) for x in rates]
+        self.danger_level = danger_level
+
+
+# Deterministic source of the detectors' replies: window counts grow by
+# Poisson distributed increments, each detector with its own gain and each
+# window with half the counts of the previous one. With alert_probability
+# a session has a source next to one of the detectors: its rates are
+# source_factor times higher and its danger level reaches alert_level.
+class TrafficGenerator:
+    def __init__(
+        self,
+        detectors: int = 4,
+        windows: int = 3,
+        seed: Optional[int] = None,
+        rate: float = 50,
+        alert_probability: float = 0,
+        alert_level: int = 7,
+        source_factor: float = 5,
+    ):
+        # The backend only stores windows 1 to 3
+        if not 1 <= windows <= len(can_protocol.Window):
+            raise ValueError(
+                f"Invalid windows '{windows}', at most {len(can_protocol.Window)}"
+            )
+
+        self._detectors = detectors
+        self._windows = windows
+        self._rate = rate
+        self._alert_probability = alert_probability
+        self._alert_level = alert_level
+        self._source_factor = source_factor
+
+        self._random = Random(seed)
+        self._states: list[DetectorState] = []
+
+        self.sessions = 0
+        self.alerts = 0
+
+    def start_session(self):
+        source: Optional[int] = None
+        if self._random.random() < self._alert_probability:
+            source = self._random.randrange(self._detectors)
+            self.alerts += 1
+
+        shares = [2.0**-x for x in range(self._windows)]
+        shares = [x / sum(shares) for x in shares]
+
+        # Every detector gets its own counters
+        self._states = []
+        for n in range(self._detectors):
+            gain = max(0.1, self._random.gauss(1, 0.1))
+            if n == source:
+                gain *= self._source_factor
+                danger_level = self._random.randint(self._alert_level, 9)
+            else:
+                danger_level = self._random.randint(0, self._alert_level - 1)
+
+            rates = [[self._rate * gain * x for x in shares] for _ in SIPMS]
+            self._states.append(DetectorState(rates, danger_level))
+
+        self.sessions += 1
+
+    def poisson(self, mean: float) -> int:
+        # Knuth's method takes mean steps, approximate the larger ones
+        if mean > 30:
+            return max(0, round(self._random.gauss(mean, math.sqrt(mean))))
+
+        limit = math.exp(-mean)
+        k = 0
+        p = self._random.random()
+        while p > limit:
+            k += 1
+            p *= self._random.random()
+
+        return k
+
+    # The replies to a reading cycle, as concatenated 8 bytes frames
+    def window_frames(self) -> bytearray:
+        frames = bytearray()
+
+        for window in range(self._windows):
+            for n, state in enumerate(self._states, 1):
+                for i, sipm in enumerate(SIPMS):
+                    count = min(
+                        MAX_COUNT,
+                        state.counts[i][window] + self.poisson(state.rates[i][window]),
+                    )
+                    state.counts[i][window] = count
+
+                    frames += pack_reply(
+                        window | sipm, 0, count, MessageType.RETURN_COUNT_WINDOW, n
+                    )
+
+        return frames
+
+    def total_frames(self) -> bytearray:
+        frames = bytearray()
+
+        for n, state in enumerate(self._states, 1):
+            for i, sipm in enumerate(SIPMS):
+                frames += pack_reply(
+                    sipm,
+                    state.danger_level,
+                    min(MAX_COUNT, sum(state.counts[i])),
+                    MessageType.RETURN_COUNT_TOTAL,
+                    n,
+                )
+
+        return frames
+
+
+# Stands in for IrmaBus when BYPASS_CAN is set. Without fps a reading
+# cycle is generated every interval_seconds, with fps cycles are
+# generated back to back, paced at fps frames per second. In bulk mode
+# each cycle is decoded as a single batch instead of frame by frame.
 class MockBus:
-    def __init__(self, interval_seconds=60):
+    def __init__(
+        self,
+        interval_seconds: float = 60,
+        detectors: int = 4,
+        windows: int = 3,
+        fps: Optional[float] = None,
+        seed: Optional[int] = None,
+        bulk: bool = False,
+        rate: float = 50,
+        alert_probability: float = 0,
+        alert_level: int = 7,
+    ):
         self._sessionID = None
-        self._readingID = None
+        self._readingID = 0
         self._scheduler = BackgroundScheduler()
         self._lock = Lock()
 
+        self._generator = TrafficGenerator(
+            detectors=detectors,
+            windows=windows,
+            seed=seed,
+            rate=rate,
+            alert_probability=alert_probability,
+            alert_level=alert_level,
+        )
+        self._fps = fps
+        self._bulk = bulk
+        self._next_at = 0.0
+        self._running = Event()
+        self._thread: Optional[Thread] = None
+
         self._scheduler.add_job(self.loop, "interval", seconds=interval_seconds)
         self._scheduler.start(paused=True)
 
-        self._msgqueue: Queue = Queue()
+        self._callback: Optional[Callable[[can_protocol.DecodedMessage], None]] = None
+        self.frames = 0
 
     def loop(self):
+        # Cycles may be faster than one per second
+        with self._lock:
+            self._readingID = max(int(time.time()), self._readingID + 1)
+
+        self.emit_frames(self._generator.window_frames())
+
+    def _run(self):
+        self._next_at = time.monotonic()
+
+        while self._running.is_set():
+            self.loop()
+
+    def _pace(self, frames: int):
+        if self._fps is None:
+            return
+
+        self._next_at += frames / self._fps
+        delay = self._next_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        # Don't burst to catch up after falling behind
+        elif delay < -1:
+            self._next_at = time.monotonic()
+
+    def start_listening(self, callback: Callable[[can_protocol.DecodedMessage], None]):
+        self._callback = callback
+
+    def emit_frames(self, frames: bytearray):
+        if not self._bulk:
+            for i in range(0, len(frames), REPLY_FRAME.size):
+                self.emit(
+                    Message(arbitration_id=0, data=frames[i : i + REPLY_FRAME.size])
+                )
+                self._pace(1)
+            return
+
         with self._lock:
-            self._readingID = int(time.time())
-
-        # Richiesta finestra1
-        self._msgqueue.put(gen_window_count(Detector.D1, Window.W1, Sipm.S1))
-        self._msgqueue.put(gen_window_count(Detector.D1, Window.W1, Sipm.S2))
-        self._msgqueue.put(gen_window_count(Detector.D2, Window.W1, Sipm.S1))
-        self._msgqueue.put(gen_window_count(Detector.D2, Window.W1, Sipm.S2))
-        self._msgqueue.put(gen_window_count(Detector.D3, Window.W1, Sipm.S1))
-        self._msgqueue.put(gen_window_count(Detector.D3, Window.W1, Sipm.S2))
-        self._msgqueue.put(gen_window_count(Detector.D4, Window.W1, Sipm.S1))
-        self._msgqueue.put(gen_window_count(Detector.D4, Window.W1, Sipm.S2))
-
-        # Richiesta finestra2
-        self._msgqueue.put(gen_window_count(Detector.D1, Window.W2, Sipm.S1))
-        self._msgqueue.put(gen_window_count(Detector.D1, Window.W2, Sipm.S2))
-        self._msgqueue.put(gen_window_count(Detector.D2, Window.W2, Sipm.S1))
-        self._msgqueue.put(gen_window_count(Detector.D2, Window.W2, Sipm.S2))
-        self._msgqueue.put(gen_window_count(Detector.D3, Window.W2, Sipm.S1))
-        self._msgqueue.put(gen_window_count(Detector.D3, Window.W2, Sipm.S2))
-        self._msgqueue.put(gen_window_count(Detector.D4, Window.W2, Sipm.S1))
-        self._msgqueue.put(gen_window_count(Detector.D4, Window.W2, Sipm.S2))
-
-        # Richiesta finestra3
-        self._msgqueue.put(gen_window_count(Detector.D1, Window.W3, Sipm.S1))
-        self._msgqueue.put(gen_window_count(Detector.D1, Window.W3, Sipm.S2))
-        self._msgqueue.put(gen_window_count(Detector.D2, Window.W3, Sipm.S1))
-        self._msgqueue.put(gen_window_count(Detector.D2, Window.W3, Sipm.S2))
-        self._msgqueue.put(gen_window_count(Detector.D3, Window.W3, Sipm.S1))
-        self._msgqueue.put(gen_window_count(Detector.D3, Window.W3, Sipm.S2))
-        self._msgqueue.put(gen_window_count(Detector.D4, Window.W3, Sipm.S1))
-        self._msgqueue.put(gen_window_count(Detector.D4, Window.W3, Sipm.S2))
-
-    def listen(self, timeout=0.5) -> Optional[can_protocol.DecodedMessage]:
-        try:
-            message = self._msgqueue.get(timeout=timeout)
-        except Empty:
-            message = None
-
-        if message is None:
-            return None
+            readingID = self._readingID
 
+        batch = can_protocol.decode_batch(frames)
+        if self._callback is not None:
+            for decoded in batch.messages(self._sessionID, readingID):
+                self._callback(decoded)
+
+        self.frames += len(batch)
+        self._pace(len(batch))
+
+    def emit(self, message: Message):
         with self._lock:
             readingID = self._readingID
 
-        return can_protocol.decode(message, self._sessionID, readingID)
+        decoded = can_protocol.decode(message, self._sessionID, readingID)
+        if decoded is not None and self._callback is not None:
+            self._callback(decoded)
+
+        self.frames += 1
 
     def set_hv(self, detector: int, sipm: int, value: int):
         print(
@@ -162,26 +256,34 @@ class MockBus:
               window '{window_number}' with value '{value}'"
         )
 
+    def stop(self):
+        self._running.clear()
+        self._scheduler.shutdown(wait=False)
+
     def start_session(self, mode: int) -> int:
         self._sessionID = int(time.time())
-        init_cache()
+        self._generator.start_session()
         # TODO: tweak
         time.sleep(0.5)
-        self._scheduler.resume()
+
+        if self._fps is None:
+            self._scheduler.resume()
+        else:
+            self._running.set()
+            self._thread = Thread(target=self._run, daemon=True)
+            self._thread.start()
 
         return self._sessionID
 
     def stop_session(self):
-        self._scheduler.pause()
+        if self._thread is None:
+            self._scheduler.pause()
+        else:
+            self._running.clear()
+            self._thread.join()
+            self._thread = None
         # TODO: tweak
         time.sleep(0.5)
 
         # Richiesta total count ai sipm
-        self._msgqueue.put(gen_total_count(Detector.D1, Sipm.S1))
-        self._msgqueue.put(gen_total_count(Detector.D1, Sipm.S2))
-        self._msgqueue.put(gen_total_count(Detector.D2, Sipm.S1))
-        self._msgqueue.put(gen_total_count(Detector.D2, Sipm.S2))
-        self._msgqueue.put(gen_total_count(Detector.D3, Sipm.S1))
-        self._msgqueue.put(gen_total_count(Detector.D3, Sipm.S2))
-        self._msgqueue.put(gen_total_count(Detector.D4, Sipm.S1))
-        self._msgqueue.put(gen_total_count(Detector.D4, Sipm.S2))
+        self.emit_frames(self._generator.total_frames())
@@ -0,0 +1,158 @@
+import os
+import sqlite3
+import time
+from threading import Condition, Lock, Thread
+
+import paho.mqtt.client as mqtt
+
+
+# Disk-backed queue of the outgoing MQTT messages, so that readings survive
+# broker outages and restarts. Messages are deleted once the broker
+# acknowledged them. When max_messages is exceeded the oldest ones are
+# evicted.
+class Outbox:
+    def __init__(self, path: str, max_messages: int = 100_000):
+        self._lock = Lock()
+        self._max_messages = max_messages
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "topic TEXT NOT NULL, "
+            "payload BLOB NOT NULL)"
+        )
+
+        self._size: int = self._db.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def put(self, topic: str, payload: bytes):
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO outbox (topic, payload) VALUES (?, ?)", (topic, payload)
+            )
+            self._size += 1
+
+            excess = self._size - self._max_messages
+            if excess > 0:
+                self._db.execute(
+                    "DELETE FROM outbox WHERE id IN "
+                    "(SELECT id FROM outbox ORDER BY id LIMIT ?)",
+                    (excess,),
+                )
+                self._size -= excess
+                self.evicted += excess
+                print(f"Outbox full, evicted {excess} oldest messages")
+
+    def pending(self, after_id: int, limit: int) -> list[tuple[int, str, bytes]]:
+        with self._lock:
+            return self._db.execute(
+                "SELECT id, topic, payload FROM outbox WHERE id > ? ORDER BY id LIMIT ?",
+                (after_id, limit),
+            ).fetchall()
+
+    def ack(self, id: int):
+        with self._lock:
+            deleted = self._db.execute("DELETE FROM outbox WHERE id = ?", (id,))
+            self._size -= deleted.rowcount
+
+
+# Publishes the Outbox messages with QoS 1, max_inflight unacknowledged
+# at a time. A backlog, i.e. more messages than a batch, is replayed at
+# most replay_rate per second. Messages in flight during a disconnection
+# are resent by paho on reconnection, after a restart the whole Outbox is
+# sent again.
+class OutboxForwarder:
+    def __init__(
+        self,
+        outbox: Outbox,
+        client: mqtt.Client,
+        replay_rate: float = 50,
+        max_inflight: int = 20,
+    ):
+        self._outbox = outbox
+        self._client = client
+        self._interval = 1 / replay_rate
+        self._max_inflight = max_inflight
+
+        # paho calls on_publish holding its own locks: never call the
+        # client while holding this one
+        self._condition = Condition()
+        self._connected = False
+        self._last_id = 0
+        self._inflight: dict[int, int] = {}
+        # Acknowledgements received while publish() hadn't returned yet
+        self._publishing = False
+        self._acked: set[int] = set()
+
+    def start(self):
+        Thread(target=self._run, daemon=True).start()
+
+    def notify(self):
+        with self._condition:
+            self._condition.notify_all()
+
+    def on_connect(self):
+        with self._condition:
+            self._connected = True
+            self._condition.notify_all()
+
+    def on_disconnect(self):
+        with self._condition:
+            self._connected = False
+
+    def on_publish(self, mid: int):
+        with self._condition:
+            id = self._inflight.pop(mid, None)
+            if id is None:
+                # Possibly ours, acknowledged before publish() returned.
+                # Otherwise a message published elsewhere, e.g. a QoS 0
+                # status, that mustn't be mistaken for a later one of ours
+                if self._publishing:
+                    self._acked.add(mid)
+                return
+
+            self._outbox.ack(id)
+            self._condition.notify_all()
+
+    def _can_send(self) -> bool:
+        return (
+            self._connected
+            and len(self._inflight) < self._max_inflight
+            and len(self._outbox.pending(self._last_id, 1)) > 0
+        )
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(self._can_send)
+                messages = self._outbox.pending(
+                    self._last_id, self._max_inflight - len(self._inflight)
+                )
+
+            # Live messages fit a batch, only a backlog is throttled
+            backlog = len(self._outbox.pending(messages[-1][0], 1)) > 0
+
+            for id, topic, payload in messages:
+                with self._condition:
+                    self._publishing = True
+
+                info = self._client.publish(topic, payload, qos=1)
+
+                with self._condition:
+                    self._publishing = False
+                    self._last_id = id
+                    if info.mid in self._acked:
+                        self._outbox.ack(id)
+                    else:
+                        self._inflight[info.mid] = id
+                    self._acked.clear()
+
+                if backlog:
+                    time.sleep(self._interval)
@@ -0,0 +1,84 @@
+import time
+from threading import Lock
+from typing import Optional
+
+import can
+from can.interface import Bus
+from can.message import Message
+
+
+# Records the received and sent CAN frames, with their timestamps. The
+# format follows the file extension, e.g. ".blf" or ".asc".
+class Recorder:
+    def __init__(self, path: str):
+        self._lock = Lock()
+        self._writer = can.Logger(path)
+        self.frames = 0
+
+    def record(self, message: Message, is_rx: bool = True):
+        message.is_rx = is_rx
+        if not message.timestamp:
+            message.timestamp = time.time()
+
+        # Frames are received and sent from different threads
+        with self._lock:
+            self._writer.on_message_received(message)
+            self.frames += 1
+
+    def stop(self):
+        with self._lock:
+            self._writer.stop()
+
+
+# Sends the frames received in a recording on a bus, at speed times the
+# recorded rate, or as fast as possible when speed is None. With
+# send_requests the frames sent by the node are replayed too, marking
+# the reading cycles.
+class Replayer:
+    def __init__(
+        self,
+        path: str,
+        bus: Bus,
+        speed: Optional[float] = 1,
+        send_requests: bool = False,
+    ):
+        self._path = path
+        self._bus = bus
+        self._speed = speed
+        self._send_requests = send_requests
+        self.frames = 0
+        self.elapsed = 0.0
+
+    def replay(self):
+        started = time.monotonic()
+        first_timestamp: Optional[float] = None
+
+        for message in can.LogReader(self._path):
+            # Requests sent by the node aren't part of the traffic to replay
+            if not message.is_rx and not self._send_requests:
+                continue
+
+            if self._speed is not None:
+                if first_timestamp is None:
+                    first_timestamp = message.timestamp
+
+                delay = (message.timestamp - first_timestamp) / self._speed - (
+                    time.monotonic() - started
+                )
+                if delay > 0:
+                    time.sleep(delay)
+
+            self._bus.send(
+                Message(
+                    arbitration_id=message.arbitration_id,
+                    is_extended_id=message.is_extended_id,
+                    data=message.data,
+                )
+            )
+            self.frames += 1
+
+        self.elapsed = time.monotonic() - started
+
+    @property
+    def rate(self) -> float:
+        return self.frames / self.elapsed if self.elapsed > 0 else 0
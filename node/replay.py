@@ -0,0 +1,81 @@
+# Replays a CAN recording into a Node through a virtual bus, so that the
+# whole node -> MQTT -> backend pipeline runs on real traffic.
+#
+#     $ python3 replay.py data/can.blf --speed 10
+#     $ python3 replay.py data/can.blf --max
+import argparse
+import threading
+import time
+
+from app import Node, load_config
+from can.interface import Bus
+from recording import Replayer
+
+CHANNEL = "replay"
+
+
+def report(node: Node, replayer: Replayer, done: threading.Event, every: float):
+    while not done.wait(every):
+        print(
+            f"Replayed {replayer.frames} frames, "
+            f"node queue {node.messages.qsize()}, outbox {len(node.outbox)}"
+        )
+
+
+def main(args: argparse.Namespace):
+    config = load_config()
+    config["can"].update(
+        {
+            "bustype": "virtual",
+            "channel": CHANNEL,
+            "filter_id": None,
+            "filter_mask": None,
+            "record_path": None,
+        }
+    )
+
+    node = Node(config)
+    replayer = Replayer(
+        args.path,
+        Bus(bustype="virtual", channel=CHANNEL),
+        speed=None if args.max else args.speed,
+        # The node's requests give each reading cycle its readingID
+        send_requests=True,
+    )
+
+    done = threading.Event()
+    threading.Thread(target=node.loop_forever, daemon=True).start()
+    threading.Thread(
+        target=report, args=(node, replayer, done, args.report_every), daemon=True
+    ).start()
+
+    # Give the node time to connect to the broker
+    time.sleep(1)
+    replayer.replay()
+    done.set()
+
+    print(
+        f"Replayed {replayer.frames} frames in {replayer.elapsed:.2f}s "
+        f"({replayer.rate:.0f} frames/s)"
+    )
+
+    # What's left shows how far the node is behind the replay
+    while node.messages.qsize() > 0 or len(node.outbox) > 0:
+        print(
+            f"Draining: node queue {node.messages.qsize()}, outbox {len(node.outbox)}"
+        )
+        time.sleep(args.report_every)
+
+    node.bus.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a CAN recording")
+    parser.add_argument("path", help="Recording, '.blf' or '.asc'")
+    parser.add_argument(
+        "--speed", type=float, default=1, help="Multiple of the recorded rate"
+    )
+    parser.add_argument("--max", action="store_true", help="Replay as fast as possible")
+    parser.add_argument("--report-every", type=float, default=1)
+
+    main(parser.parse_args())
@@ -0,0 +1,122 @@
+import statistics
+import time
+from collections import deque
+from threading import Condition
+from typing import Optional
+
+from can_protocol import DecodedMessage, MessageType
+
+# (reply MessageType, window, sipm)
+RequestKey = tuple[MessageType, int, int]
+
+# Cycle times kept for the report
+CYCLE_SAMPLES = 100
+
+
+def reply_key(message: DecodedMessage) -> Optional[RequestKey]:
+    if message["message_type"] == MessageType.RETURN_COUNT_WINDOW:
+        return (MessageType.RETURN_COUNT_WINDOW, message["value"], message["sipm"])
+
+    if message["message_type"] == MessageType.RETURN_COUNT_TOTAL:
+        return (MessageType.RETURN_COUNT_TOTAL, 0, message["sipm"])
+
+    return None
+
+
+class Request:
+    def __init__(self, sent_at: float):
+        self.sent_at = sent_at
+        self.detectors: set[int] = set()
+        self.latency = 0.0
+
+
+# Correlates the broadcast requests with the detectors' replies, so that
+# the next request is sent as soon as every detector answered. The
+# timeout of a request follows the observed latencies: it's
+# latency_factor times their moving average, within [min, max].
+class RequestTracker:
+    def __init__(
+        self,
+        detectors: int = 4,
+        min_timeout: float = 0.05,
+        max_timeout: float = 0.5,
+        latency_factor: float = 3,
+        smoothing: float = 0.2,
+    ):
+        self._detectors = detectors
+        self._min_timeout = min_timeout
+        self._max_timeout = max_timeout
+        self._latency_factor = latency_factor
+        self._smoothing = smoothing
+
+        self._condition = Condition()
+        self._requests: dict[RequestKey, Request] = {}
+        self._latency: Optional[float] = None
+
+        self.timeouts = 0
+        self.cycle_count = 0
+        self.cycles: deque[float] = deque(maxlen=CYCLE_SAMPLES)
+
+    @property
+    def timeout(self) -> float:
+        if self._latency is None:
+            return self._max_timeout
+
+        return min(
+            self._max_timeout,
+            max(self._min_timeout, self._latency_factor * self._latency),
+        )
+
+    def sent(self, key: RequestKey):
+        with self._condition:
+            self._requests[key] = Request(time.monotonic())
+
+    def reply(self, message: DecodedMessage):
+        key = reply_key(message)
+
+        with self._condition:
+            request = self._requests.get(key)
+            if request is None:
+                return
+
+            request.detectors.add(message["n_detector"])
+            request.latency = time.monotonic() - request.sent_at
+
+            if len(request.detectors) >= self._detectors:
+                self._condition.notify_all()
+
+    def wait(self, key: RequestKey) -> bool:
+        with self._condition:
+            completed = self._condition.wait_for(
+                lambda: len(self._requests[key].detectors) >= self._detectors,
+                self.timeout,
+            )
+            request = self._requests.pop(key)
+
+        if not completed:
+            self.timeouts += 1
+            return False
+
+        # Learn from complete requests only, timeouts would inflate it
+        if self._latency is None:
+            self._latency = request.latency
+        else:
+            self._latency += self._smoothing * (request.latency - self._latency)
+
+        return True
+
+    def cycle(self, seconds: float):
+        self.cycle_count += 1
+        self.cycles.append(seconds)
+
+    def report(self) -> str:
+        cycles = list(self.cycles)
+
+        return (
+            f"cycles {self.cycle_count}, "
+            f"avg {statistics.mean(cycles) if cycles else 0:.3f}s, "
+            f"max {max(cycles, default=0):.3f}s, "
+            f"latency {self._latency or 0:.3f}s, "
+            f"timeout {self.timeout:.3f}s, "
+            f"timeouts {self.timeouts}"
+        )
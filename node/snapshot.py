@@ -0,0 +1,66 @@
+import time
+from typing import Optional
+
+from can_protocol import DecodedMessage, MessageType
+
+# Sipms replying to each request of a detector
+SIPMS = 2
+
+
+class Snapshot:
+    def __init__(self, expected: int, deadline: float):
+        self.messages: list[DecodedMessage] = []
+        self.expected = expected
+        self.deadline = deadline
+
+    def is_complete(self) -> bool:
+        return len(self.messages) >= self.expected
+
+
+# Collects the replies of a reading cycle, i.e. the ones sharing sessionID,
+# readingID and message type, into a single snapshot. A snapshot is
+# released once every detector replied or its deadline passed.
+class SnapshotCollector:
+    def __init__(
+        self, detectors: int = 4, deadline_seconds: float = 5, windows: int = 3
+    ):
+        self._detectors = detectors
+        # Replies expected from each detector: one per window or one total
+        self._expected = {
+            MessageType.RETURN_COUNT_WINDOW: windows * SIPMS,
+            MessageType.RETURN_COUNT_TOTAL: SIPMS,
+        }
+        self._deadline_seconds = deadline_seconds
+        self._snapshots: dict[tuple[int, int, MessageType], Snapshot] = {}
+
+    def add(self, message: DecodedMessage) -> Optional[list[DecodedMessage]]:
+        key = (message["sessionID"], message["readingID"], message["message_type"])
+
+        snapshot = self._snapshots.get(key)
+        if snapshot is None:
+            snapshot = Snapshot(
+                self._expected[message["message_type"]] * self._detectors,
+                time.monotonic() + self._deadline_seconds,
+            )
+            self._snapshots[key] = snapshot
+
+        snapshot.messages.append(message)
+
+        if snapshot.is_complete():
+            del self._snapshots[key]
+            return snapshot.messages
+
+        return None
+
+    def next_deadline_in(self) -> Optional[float]:
+        if len(self._snapshots) == 0:
+            return None
+
+        deadline = min(x.deadline for x in self._snapshots.values())
+        return max(0, deadline - time.monotonic())
+
+    def expired(self) -> list[list[DecodedMessage]]:
+        now = time.monotonic()
+        expired = [x for x, y in self._snapshots.items() if y.deadline <= now]
+
+        return [self._snapshots.pop(x).messages for x in expired]
@@ -191,3 +191,130 @@ class TestAlertInfo:
             "raisedAt",
         ]:
             assert key in response.json(), "Invalid response structure"
+
+
+class TestGetAlerts:
+    endpoint = "/api/alert/"
+
+    async def setup_alerts(self) -> tuple[db.Application, list[db.Alert]]:
+        org = db.Organization(organizationName="foo")
+        await org.save()
+        app = db.Application(applicationName="bar", organization=org.id)
+        await app.save()
+        alerts = []
+        for nodeID in [1, 2]:
+            node = db.Node(
+                nodeID=nodeID,
+                nodeName="nodeName",
+                application=app.id,
+                state=NodeState.ALERT_READY,
+                lastSeenAt=datetime.now(),
+            )
+            await node.save()
+            for isHandled, raisedAt in [(False, 1000), (True, 2000)]:
+                reading = db.Reading(
+                    node=node.id,
+                    canID=nodeID,
+                    sensor_number=1,
+                    readingID=raisedAt,
+                    sessionID=nodeID * 10 + raisedAt,
+                    published_at=datetime.fromtimestamp(raisedAt),
+                    name="t",
+                )
+                await reading.save()
+                alert = db.Alert(
+                    reading=reading.id,
+                    node=node.id,
+                    sessionID=reading.sessionID,
+                    isHandled=isHandled,
+                    raisedAt=datetime.fromtimestamp(raisedAt),
+                )
+                await alert.save()
+                alerts.append(alert)
+
+        return app, alerts
+
+    # Getting alerts of a non-existing application
+    def test_get_non_existing_application(self, app_client: TestClient, auth_header):
+        response = app_client.get(
+            self.endpoint + "?applicationID=63186eab0ca2d54a5c258384",
+            headers=auth_header,
+        )
+
+        assert (
+            response.status_code == 404
+        ), "Invalid response code when getting alerts of non-existing application"
+
+    @pytest.mark.asyncio
+    async def test_get_filtered(self, app_client: TestClient, auth_header):
+        app, alerts = await self.setup_alerts()
+        # Done setup
+
+        def get_ids(query: str) -> set[str]:
+            response = app_client.get(
+                self.endpoint + f"?applicationID={str(app.id)}" + query,
+                headers=auth_header,
+            )
+            assert response.status_code == 200, "Invalid response code getting alerts"
+
+            return {x["id"] for x in response.json()["alerts"]}
+
+        assert get_ids("") == {str(x.id) for x in alerts}, "Invalid unfiltered alerts"
+        assert get_ids("&nodeID=2") == {
+            str(alerts[2].id),
+            str(alerts[3].id),
+        }, "Invalid alerts filtered by node"
+        assert get_ids("&isHandled=false") == {
+            str(alerts[0].id),
+            str(alerts[2].id),
+        }, "Invalid alerts filtered by handled state"
+        assert get_ids("&start=1500&end=2500") == {
+            str(alerts[1].id),
+            str(alerts[3].id),
+        }, "Invalid alerts filtered by time range"
+
+    # Alerts pointing to bucketed Readings
+    @pytest.mark.asyncio
+    async def test_get_bucket(self, app_client: TestClient, auth_header):
+        app, alerts = await self.setup_alerts()
+        readings = await db.Reading.find_all().to_list()
+        await db.ReadingBucket.push_readings(readings)
+        await db.Reading.delete_all()
+        # Done setup
+
+        with patch("backend.app.config.config.app.READING_STORAGE", "bucket"):
+            response = app_client.get(
+                self.endpoint + f"?applicationID={str(app.id)}&nodeID=2",
+                headers=auth_header,
+            )
+
+        assert response.status_code == 200, "Invalid response code getting alerts"
+        assert sorted(
+            (x["nodeID"], x["canID"], x["readingID"]) for x in response.json()["alerts"]
+        ) == [(2, 2, 1000), (2, 2, 2000)], "Invalid alerts of bucketed readings"
+
+    # Alerts whose Reading is gone don't hide the others
+    @pytest.mark.asyncio
+    async def test_get_dangling(self, app_client: TestClient, auth_header):
+        app, alerts = await self.setup_alerts()
+        await db.Reading.find_one({"_id": alerts[0].reading}).delete()
+        # Done setup
+
+        response = app_client.get(
+            self.endpoint + f"?applicationID={str(app.id)}",
+            headers=auth_header,
+        )
+
+        assert response.status_code == 200, "Invalid response code getting alerts"
+        assert {x["id"] for x in response.json()["alerts"]} == {
+            str(x.id) for x in alerts[1:]
+        }, "Invalid alerts with a dangling one"
+
+        response = app_client.get(
+            self.endpoint + str(alerts[0].id),
+            headers=auth_header,
+        )
+
+        assert (
+            response.status_code == 404
+        ), "Invalid response code getting a dangling alert"
@@ -1,6 +1,7 @@
 from datetime import datetime
 
 import pytest
+from beanie import PydanticObjectId
 from fastapi.testclient import TestClient
 
 from backend.app.models.node_settings import DetectorSettings, SensorSettings
@@ -48,6 +49,55 @@ class TestGetNodes:
 
         assert response.json()["nodes"][0]["nodeName"] == self.name
 
+    @pytest.mark.asyncio
+    async def test_get_unhandled_alerts(self, app_client: TestClient, auth_header):
+        o = db.Organization(organizationName="foo")
+        await o.save()
+        a = db.Application(applicationName="bar", organization=o.id)
+        await a.save()
+        nodes = []
+        for nodeID in range(3):
+            n = db.Node(
+                nodeID=nodeID,
+                nodeName=self.name,
+                application=a.id,
+                state=NodeState.ALERT_READY,
+                lastSeenAt=datetime.now(),
+            )
+            await n.save()
+            nodes.append(n)
+        alerts = []
+        for sessionID, (node, isHandled) in enumerate(
+            [(nodes[0], False), (nodes[0], False), (nodes[0], True), (nodes[1], False)]
+        ):
+            alert = db.Alert(
+                reading=PydanticObjectId(),
+                node=node.id,
+                sessionID=sessionID,
+                isHandled=isHandled,
+                raisedAt=datetime.now(),
+            )
+            await alert.save()
+            alerts.append(alert)
+        # Done setup
+
+        response = app_client.get(
+            self.endpoint + f"?applicationID={str(a.id)}",
+            headers=auth_header,
+        )
+
+        assert response.status_code == 200, "Invalid response code when getting nodes"
+
+        unhandled = {
+            x["nodeID"]: sorted(x["unhandledAlertIDs"])
+            for x in response.json()["nodes"]
+        }
+        assert unhandled == {
+            0: sorted([str(alerts[0].id), str(alerts[1].id)]),
+            1: [str(alerts[3].id)],
+            2: [],
+        }, "Invalid unhandled alerts when getting nodes"
+
 
 class TestGetSettings:
     def endpoint(self, nodeID: int):
@@ -4,6 +4,7 @@ import pytest
 from fastapi.testclient import TestClient
 
 from backend.app.services import database as db
+from backend.app.services.reading_buffer import ReadingBuffer
 from backend.app.utils.enums import NodeState
 
 
@@ -66,6 +67,7 @@ class TestGetSessions:
             lastSeenAt=datetime.now(),
         )
         await node.save()
+        buffer = ReadingBuffer()
         r1 = db.Reading(
             node=node.id,
             canID=1,
@@ -75,7 +77,7 @@ class TestGetSessions:
             published_at=datetime.now(),
             name="t",
         )
-        await r1.save()
+        await buffer.add(r1)
         r2 = db.Reading(
             node=node.id,
             canID=2,
@@ -85,7 +87,7 @@ class TestGetSessions:
             published_at=datetime.now(),
             name="t",
         )
-        await r2.save()
+        await buffer.add(r2)
         r3 = db.Reading(
             node=node.id,
             canID=3,
@@ -95,7 +97,8 @@ class TestGetSessions:
             published_at=datetime.now(),
             name="t",
         )
-        await r3.save()
+        await buffer.add(r3)
+        await buffer.flush()
         # Done setup
 
         response = app_client.get(
@@ -125,6 +128,7 @@ class TestGetSessions:
             lastSeenAt=datetime.now(),
         )
         await node.save()
+        buffer = ReadingBuffer()
         r1 = db.Reading(
             node=node.id,
             canID=1,
@@ -134,7 +138,7 @@ class TestGetSessions:
             published_at=datetime.now(),
             name="t",
         )
-        await r1.save()
+        await buffer.add(r1)
         r2 = db.Reading(
             node=node.id,
             canID=2,
@@ -144,7 +148,7 @@ class TestGetSessions:
             published_at=datetime.now(),
             name="t",
         )
-        await r2.save()
+        await buffer.add(r2)
         r3 = db.Reading(
             node=node.id,
             canID=3,
@@ -154,7 +158,8 @@ class TestGetSessions:
             published_at=datetime.now(),
             name="t",
         )
-        await r3.save()
+        await buffer.add(r3)
+        await buffer.flush()
         # Done setup
 
         response = app_client.get(
@@ -235,6 +240,7 @@ class TestGetSessionID:
             lastSeenAt=datetime.now(),
         )
         await node.save()
+        buffer = ReadingBuffer()
         r1 = db.Reading(
             node=node.id,
             canID=1,
@@ -244,7 +250,7 @@ class TestGetSessionID:
             published_at=datetime.now(),
             name="t",
         )
-        await r1.save()
+        await buffer.add(r1)
         r2 = db.Reading(
             node=node.id,
             canID=2,
@@ -254,7 +260,8 @@ class TestGetSessionID:
             published_at=datetime.now(),
             name="t",
         )
-        await r2.save()
+        await buffer.add(r2)
+        await buffer.flush()
         # Done setup
 
         response = app_client.get(
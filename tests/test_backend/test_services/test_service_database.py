@@ -0,0 +1,204 @@
+import time
+from datetime import datetime
+
+import pytest
+from beanie import PydanticObjectId
+from fastapi.testclient import TestClient
+from mock import patch
+
+from backend.app.services import database as db
+from backend.app.services.database.explain import summarize_plan
+from backend.app.services.database.migrate import move_readings_to_buckets
+
+
+class TestIndexes:
+    # Declared indexes get created on init
+    @pytest.mark.asyncio
+    async def test_declared_indexes(self, app_client: TestClient):
+        expected = [
+            (db.Reading, [("node", 1), ("sessionID", 1), ("readingID", 1)]),
+            (
+                db.AggregatedReading,
+                [
+                    ("node", 1),
+                    ("sessionID", 1),
+                    ("readingID", 1),
+                    ("canID", 1),
+                    ("sensor_number", 1),
+                ],
+            ),
+            (db.Alert, [("node", 1), ("isHandled", 1)]),
+            (db.Node, [("application", 1), ("nodeID", 1)]),
+            (db.Node, [("nodeID", 1)]),
+            (db.NodeSettings, [("node", 1)]),
+            (db.User, [("email", 1)]),
+        ]
+
+        for document, keys in expected:
+            info = await document.get_motor_collection().index_information()
+
+            assert keys in [
+                list(x["key"]) for x in info.values()
+            ], f"Missing index {keys} on {document.__name__}"
+
+
+def test_summarize_plan():
+    explained = {
+        "queryPlanner": {
+            "winningPlan": {
+                "stage": "FETCH",
+                "inputStage": {
+                    "stage": "IXSCAN",
+                    "indexName": "node_1_sessionID_1_readingID_1",
+                },
+            }
+        }
+    }
+
+    plan = summarize_plan("get_session", "Reading", explained)
+
+    assert plan.stages == ["FETCH", "IXSCAN"], "Invalid plan stages"
+    assert plan.indexes == ["node_1_sessionID_1_readingID_1"], "Invalid plan indexes"
+    assert not plan.is_collscan, "Index scan reported as COLLSCAN"
+
+    plan = summarize_plan(
+        "get_session",
+        "Reading",
+        {"queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}}},
+    )
+
+    assert plan.is_collscan, "COLLSCAN not detected"
+
+
+class TestAggregatedReading:
+    # Readings of the same row are merged together
+    @pytest.mark.asyncio
+    async def test_upsert_readings(self, app_client: TestClient):
+        node = PydanticObjectId()
+        readings = [
+            db.Reading(
+                node=node,
+                canID=1,
+                sensor_number=2,
+                readingID=10,
+                sessionID=1,
+                published_at=datetime.now(),
+                name=name,
+                value=value,
+            )
+            for name, value in [("w1", 1), ("w2", 2), ("w3", 3)]
+        ]
+
+        await db.AggregatedReading.upsert_readings(readings[:2])
+        await db.AggregatedReading.upsert_readings(readings[2:])
+
+        rows = await db.AggregatedReading.find_all().to_list()
+
+        assert len(rows) == 1, "Invalid number of aggregated rows"
+
+        aggregated = rows[0].serialize(123)
+
+        assert (
+            aggregated.nodeID == 123
+            and aggregated.canID == 1
+            and aggregated.sensorNumber == 2
+            and aggregated.readingID == 10
+            and aggregated.window1 == 1
+            and aggregated.window2 == 2
+            and aggregated.window3 == 3
+            and aggregated.dangerLevel == 0
+        ), "Invalid aggregated reading"
+
+    # published_at is naive UTC, whatever the server's timezone
+    def test_serialize_published_at(self):
+        row = db.AggregatedReading(
+            node=PydanticObjectId(),
+            sessionID=1,
+            readingID=10,
+            canID=1,
+            sensor_number=2,
+            published_at=datetime(2023, 1, 1),
+        )
+
+        with patch.dict("os.environ", {"TZ": "Europe/Rome"}):
+            time.tzset()
+            publishedAt = row.serialize(123).publishedAt
+        time.tzset()
+
+        assert publishedAt == 1672531200000, "publishedAt is not UTC"
+
+
+class TestReadingBucket:
+    # Readings get packed in buckets of at most READING_BUCKET_SIZE samples
+    @pytest.mark.asyncio
+    async def test_push_readings(self, app_client: TestClient):
+        node = PydanticObjectId()
+        readings = [
+            db.Reading(
+                id=PydanticObjectId(),
+                node=node,
+                canID=1,
+                sensor_number=1,
+                readingID=i,
+                sessionID=1,
+                published_at=datetime.now(),
+                name="w1",
+                value=i,
+            )
+            for i in range(5)
+        ]
+
+        with patch("backend.app.config.config.app.READING_BUCKET_SIZE", 3):
+            await db.ReadingBucket.push_readings(readings[:2])
+            await db.ReadingBucket.push_readings(readings[2:])
+
+        buckets = await db.ReadingBucket.find_all().sort("start").to_list()
+
+        assert [x.samples for x in buckets] == [2, 3], "Invalid bucket sizes"
+        assert [x.value for x in buckets[0].readings() + buckets[1].readings()] == [
+            0,
+            1,
+            2,
+            3,
+            4,
+        ], "Invalid bucket contents"
+
+        with patch("backend.app.config.config.app.READING_STORAGE", "bucket"):
+            reading = await db.Reading.find_by_id(readings[3].id)
+
+        assert (
+            reading and reading.readingID == 3 and reading.node == node
+        ), "Reading not found in buckets"
+
+    # A resumed migration only moves the readings left behind
+    @pytest.mark.asyncio
+    async def test_resume_move_to_buckets(self, app_client: TestClient):
+        node = PydanticObjectId()
+        readings = [
+            db.Reading(
+                id=PydanticObjectId(),
+                node=node,
+                canID=1,
+                sensor_number=1,
+                readingID=i,
+                sessionID=1,
+                published_at=datetime.now(),
+                name="w1",
+                value=i,
+            )
+            for i in range(5)
+        ]
+        await db.Reading.insert_many(readings)
+
+        # Interrupted after moving the first readings
+        await db.ReadingBucket.push_readings(readings[:3])
+
+        count = await move_readings_to_buckets(batch_size=2, delete=False)
+
+        assert count == 2, "Invalid number of moved readings"
+
+        buckets = await db.ReadingBucket.find_all().to_list()
+
+        assert sorted(
+            x.value for bucket in buckets for x in bucket.readings()
+        ) == list(range(5)), "Readings were moved twice or not at all"
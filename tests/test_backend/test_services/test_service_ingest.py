@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from mock import patch
+
+from backend.app.services.ingest import IngestDispatcher
+
+
+class TestIngestDispatcher:
+    # A Node's messages are handled in order, different Nodes concurrently
+    @pytest.mark.asyncio
+    async def test_ordering(self):
+        handled: list[tuple[int, bytes]] = []
+        concurrent = 0
+        max_concurrent = 0
+
+        async def handler(applicationID: str, nodeID: int, topic: str, payload: bytes):
+            nonlocal concurrent, max_concurrent
+            concurrent += 1
+            max_concurrent = max(max_concurrent, concurrent)
+            await asyncio.sleep(0.001)
+            handled.append((nodeID, payload))
+            concurrent -= 1
+
+        with patch("backend.app.config.config.app.INGEST_WORKERS", 4):
+            dispatcher = IngestDispatcher(handler)
+
+        for i in range(20):
+            for nodeID in range(8):
+                await dispatcher.submit("app", nodeID, "payload", str(i).encode())
+        await dispatcher.stop()
+
+        for nodeID in range(8):
+            assert [int(x[1]) for x in handled if x[0] == nodeID] == list(
+                range(20)
+            ), "Invalid per-node ordering"
+
+        assert max_concurrent > 1, "Nodes not handled concurrently"
+
+        metrics = dispatcher.metrics()
+        assert (
+            metrics.received == metrics.processed == 160 and metrics.dropped == 0
+        ), "Invalid metrics"
+
+    # Failing messages are counted and don't stop the worker
+    @pytest.mark.asyncio
+    async def test_failure(self):
+        async def handler(applicationID: str, nodeID: int, topic: str, payload: bytes):
+            if payload == b"fail":
+                raise ValueError()
+
+        dispatcher = IngestDispatcher(handler)
+        for payload in [b"fail", b"ok"]:
+            await dispatcher.submit("app", 1, "payload", payload)
+        await dispatcher.stop()
+
+        metrics = dispatcher.metrics()
+        assert metrics.failed == 1 and metrics.processed == 1, "Invalid metrics"
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "overflow,expected",
+        [("drop_newest", [b"0", b"1", b"2"]), ("drop_oldest", [b"0", b"3", b"4"])],
+    )
+    async def test_overflow(self, overflow: str, expected: list[bytes]):
+        handled: list[bytes] = []
+        release = asyncio.Event()
+
+        async def handler(applicationID: str, nodeID: int, topic: str, payload: bytes):
+            await release.wait()
+            handled.append(payload)
+
+        with patch("backend.app.config.config.app.INGEST_WORKERS", 1), patch(
+            "backend.app.config.config.app.INGEST_QUEUE_SIZE", 2
+        ), patch("backend.app.config.config.app.INGEST_OVERFLOW", overflow):
+            dispatcher = IngestDispatcher(handler)
+
+        await dispatcher.submit("app", 1, "payload", b"0")
+        # Let the worker pick up the first message
+        await asyncio.sleep(0)
+        for i in range(1, 5):
+            await dispatcher.submit("app", 1, "payload", str(i).encode())
+
+        assert dispatcher.metrics().depth == [2], "Invalid queue depth"
+
+        release.set()
+        await dispatcher.stop()
+
+        assert handled == expected, "Invalid messages after overflow"
+        assert dispatcher.metrics().dropped == 2, "Invalid dropped count"
+
+
+class TestIngestMetrics:
+    endpoint = "/api/ingest/metrics"
+
+    def test_get(self, app_client: TestClient, auth_header):
+        response = app_client.get(self.endpoint, headers=auth_header)
+
+        assert response.status_code == 200, "Invalid response code getting metrics"
+        assert "depth" in response.json(), "Invalid response structure"
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from mock import AsyncMock, MagicMock, patch
+
+from backend.app.services import database as db
+from backend.app.services.liveness import LivenessTracker
+from backend.app.utils.enums import NodeState
+
+
+class TestLivenessTracker:
+    # lastSeenAt is kept in memory and written only on flush
+    @pytest.mark.asyncio
+    async def test_flush(self, app_client: TestClient):
+        tracker = LivenessTracker()
+
+        o = db.Organization(organizationName="foo")
+        await o.save()
+        a = db.Application(applicationName="bar", organization=o.id)
+        await a.save()
+        launchedAt = datetime.now() - timedelta(hours=1)
+        node = db.Node(
+            nodeID=123,
+            nodeName="nodeName",
+            application=a.id,
+            state=NodeState.READY,
+            lastSeenAt=launchedAt,
+        )
+        await node.save()
+        # Done setup
+
+        node.lastSeenAt = datetime.now()
+        tracker.seen(node)
+
+        assert (
+            tracker.last_seen(node) == node.lastSeenAt
+        ), "Invalid lastSeenAt in liveness table"
+        assert (
+            stored := await db.Node.get(node.id)
+        ) and stored.lastSeenAt < node.lastSeenAt, "lastSeenAt written before flush"
+
+        await tracker.flush()
+
+        assert (
+            stored := await db.Node.get(node.id)
+        ) and stored.lastSeenAt > launchedAt, "lastSeenAt not written on flush"
+
+    # A failed flush keeps the entries for the next one
+    @pytest.mark.asyncio
+    async def test_flush_failure(self, app_client: TestClient):
+        tracker = LivenessTracker()
+
+        o = db.Organization(organizationName="foo")
+        await o.save()
+        a = db.Application(applicationName="bar", organization=o.id)
+        await a.save()
+        launchedAt = datetime.now() - timedelta(hours=1)
+        node = db.Node(
+            nodeID=123,
+            nodeName="nodeName",
+            application=a.id,
+            state=NodeState.READY,
+            lastSeenAt=launchedAt,
+        )
+        await node.save()
+        # Done setup
+
+        node.lastSeenAt = datetime.now()
+        tracker.seen(node)
+
+        collection = MagicMock(bulk_write=AsyncMock(side_effect=ConnectionError()))
+        with patch.object(
+            db.Node, "get_motor_collection", return_value=collection
+        ), pytest.raises(ConnectionError):
+            await tracker.flush()
+
+        assert (
+            stored := await db.Node.get(node.id)
+        ) and stored.lastSeenAt < node.lastSeenAt, "lastSeenAt written by failed flush"
+
+        await tracker.flush()
+
+        assert (
+            stored := await db.Node.get(node.id)
+        ) and stored.lastSeenAt > launchedAt, "lastSeenAt of failed flush was lost"
+
+    # Keepalives don't save the node, state transitions do
+    @pytest.mark.asyncio
+    async def test_just_seen(self, app_client: TestClient):
+        o = db.Organization(organizationName="foo")
+        await o.save()
+        a = db.Application(applicationName="bar", organization=o.id)
+        await a.save()
+        node = db.Node(
+            nodeID=123,
+            nodeName="nodeName",
+            application=a.id,
+            state=NodeState.ERROR,
+            lastSeenAt=datetime.now() - timedelta(hours=1),
+        )
+        await node.save()
+        # Done setup
+
+        assert await node.just_seen(), "ERROR -> READY transition not detected"
+        assert not node.is_timed_out(), "Node timed out right after being seen"
+        assert (
+            stored := await db.Node.get(node.id)
+        ) and stored.state == NodeState.READY, "State transition not persisted"
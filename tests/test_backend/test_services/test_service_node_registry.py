@@ -0,0 +1,67 @@
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app.services import database as db
+from backend.app.utils.enums import NodeState
+
+
+class TestNodeRegistry:
+    # Saving and deleting a Node keeps the registry in sync
+    @pytest.mark.asyncio
+    async def test_sync_on_write(self, app_client: TestClient):
+        from backend.app import nodeRegistry
+
+        o = db.Organization(organizationName="foo")
+        await o.save()
+        a = db.Application(applicationName="bar", organization=o.id)
+        await a.save()
+        node = db.Node(
+            nodeID=123,
+            nodeName="nodeName",
+            application=a.id,
+            state=NodeState.READY,
+            lastSeenAt=datetime.now(),
+        )
+        await node.save()
+
+        assert (
+            cached := nodeRegistry.get(str(a.id), 123)
+        ) and cached.id == node.id, "Inserted node not found in registry"
+
+        node.state = NodeState.RUNNING
+        await node.save()
+
+        assert (
+            cached := nodeRegistry.get(str(a.id), 123)
+        ) and cached.state == NodeState.RUNNING, "Registry not updated on save"
+
+        await node.delete()
+
+        assert nodeRegistry.get(str(a.id), 123) is None, "Deleted node still cached"
+
+    # Known nodes are looked up without querying the database
+    @pytest.mark.asyncio
+    async def test_from_id(self, app_client: TestClient):
+        o = db.Organization(organizationName="foo")
+        await o.save()
+        a = db.Application(applicationName="bar", organization=o.id)
+        await a.save()
+        node = db.Node(
+            nodeID=123,
+            nodeName="nodeName",
+            application=a.id,
+            state=NodeState.READY,
+            lastSeenAt=datetime.now(),
+        )
+        await node.save()
+
+        # Remove it behind the registry's back
+        await db.Node.get_motor_collection().delete_one({"_id": node.id})
+
+        assert (
+            await db.Node.from_id(123, str(a.id))
+        ) is not None, "Registered node was not served from the registry"
+
+        assert (await db.Node.from_id(456, str(a.id))) is None, "Unknown node was found"
@@ -0,0 +1,86 @@
+from datetime import datetime
+
+import pytest
+from beanie import PydanticObjectId
+from fastapi.testclient import TestClient
+from mock import patch
+
+from backend.app.services import database as db
+from backend.app.services.reading_buffer import ReadingBuffer
+
+
+def make_reading(readingID: int) -> db.Reading:
+    return db.Reading(
+        node=PydanticObjectId(),
+        canID=1,
+        sensor_number=1,
+        readingID=readingID,
+        sessionID=1,
+        published_at=datetime.now(),
+        name="w1",
+        value=readingID,
+    )
+
+
+class TestReadingBuffer:
+    # Readings are kept in memory until flushed
+    @pytest.mark.asyncio
+    async def test_add(self, app_client: TestClient):
+        buffer = ReadingBuffer()
+
+        reading = make_reading(1)
+        await buffer.add(reading)
+
+        assert len(buffer) == 1, "Reading was not buffered"
+        assert reading.id is not None, "Reading id was not assigned"
+        assert (
+            await db.Reading.find_all().count() == 0
+        ), "Reading was written before flushing"
+
+        await buffer.flush()
+
+        assert len(buffer) == 0, "Buffer was not emptied"
+        assert (
+            saved := await db.Reading.get(reading.id)
+        ) and saved.value == 1, "Flushed reading not found in database"
+
+    # Reaching the size limit triggers a flush
+    @pytest.mark.asyncio
+    async def test_flush_on_size(self, app_client: TestClient):
+        with patch("backend.app.config.config.app.READING_FLUSH_SIZE", 3):
+            buffer = ReadingBuffer()
+
+        for i in range(3):
+            await buffer.add(make_reading(i))
+
+        assert len(buffer) == 0, "Buffer was not flushed when full"
+        assert (
+            await db.Reading.find_all().count() == 3
+        ), "Invalid number of flushed readings"
+
+    # A failed flush keeps the readings for the next one
+    @pytest.mark.asyncio
+    async def test_flush_failure(self, app_client: TestClient):
+        buffer = ReadingBuffer()
+
+        readings = [make_reading(i) for i in range(2)]
+        for x in readings:
+            await buffer.add(x)
+
+        with patch.object(
+            db.Reading, "insert_many", side_effect=ConnectionError("down")
+        ), pytest.raises(ConnectionError):
+            await buffer.flush()
+
+        assert len(buffer) == 2, "Readings were dropped by the failed flush"
+        assert (
+            await db.Reading.find_all().count() == 0
+        ), "Readings were written by the failed flush"
+
+        await buffer.add(make_reading(2))
+        await buffer.flush()
+
+        assert len(buffer) == 0, "Buffer was not emptied"
+        assert (
+            await db.Reading.find_all().count() == 3
+        ), "Readings of the failed flush were not retried"
@@ -0,0 +1,186 @@
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from mock import AsyncMock, patch
+
+from backend.app.entities.node import Node
+from backend.app.models.payload import ReadingPayload, ReadingPayloadData
+from backend.app.services import database as db
+from backend.app.services.mqtt import handle_message
+from backend.app.utils.enums import NodeState
+from backend.app.utils.frames import (
+    FRAME_HEADER,
+    FrameDecoder,
+    decode_payload,
+    encode_frame,
+)
+
+
+def make_payload(
+    payloadType: str,
+    canID: int,
+    value: int,
+    count: int = 123456,
+    readingID: int = 1672531215,
+) -> ReadingPayload:
+    return ReadingPayload(
+        payloadType=payloadType,
+        data=ReadingPayloadData(
+            value=value,
+            count=count,
+            sessionID=1672531200,
+            readingID=readingID,
+            canID=canID,
+            sensorNumber=2,
+        ),
+    )
+
+
+def test_frame_roundtrip():
+    payloads = [make_payload("window", 1, 0), make_payload("total", 4, 9)]
+    frame = encode_frame(payloads)
+
+    assert len(frame) == 10 + 2 * 8, "Invalid frame size"
+    assert decode_payload(frame) == payloads, "Invalid decoded frame"
+
+
+def test_json_fallback():
+    payload = make_payload("window", 3, 2)
+
+    assert decode_payload(payload.json().encode()) == [
+        payload
+    ], "Invalid decoded JSON payload"
+
+
+def test_json_snapshot():
+    payloads = [make_payload("window", x, 1) for x in [1, 2, 3, 4]]
+    snapshot = "[" + ",".join(x.json() for x in payloads) + "]"
+
+    assert (
+        decode_payload(snapshot.encode()) == payloads
+    ), "Invalid decoded JSON snapshot"
+
+
+def test_invalid_frames():
+    frame = encode_frame([make_payload("window", 1, 0)])
+
+    for invalid in [
+        b"",
+        frame[:-1],
+        bytes([3]) + frame[1:],
+        frame[:10] + b"\x05" + frame[11:],
+    ]:
+        with pytest.raises(ValueError):
+            decode_payload(invalid)
+
+    # Readings of different sessions can't share a frame
+    other = make_payload("window", 1, 0)
+    other.data.sessionID += 1
+    with pytest.raises(ValueError):
+        encode_frame([make_payload("window", 1, 0), other])
+
+
+# Delta frames are rebuilt carrying the unchanged readings forward
+def test_delta_frames():
+    decoder = FrameDecoder()
+
+    keyframe = [make_payload("window", x, 1, readingID=1) for x in [1, 2, 3]]
+    assert decoder.decode("app", 1, encode_frame(keyframe)) == (
+        keyframe,
+        [],
+    ), "Invalid decoded keyframe"
+
+    changed = make_payload("window", 2, 1, count=10, readingID=2)
+    received, carried = decoder.decode("app", 1, encode_frame([changed], delta=True))
+    assert received == [changed], "Invalid decoded delta frame"
+    assert sorted((x.data.canID, x.data.readingID, x.data.count) for x in carried) == [
+        (1, 2, 123456),
+        (3, 2, 123456),
+    ], "Invalid carried readings"
+
+    # Nothing changed at all
+    received, carried = decoder.decode("app", 1, FRAME_HEADER.pack(2, 0, 1672531200, 3))
+    assert received == [], "Invalid decoded empty delta frame"
+    assert sorted((x.data.canID, x.data.readingID, x.data.count) for x in carried) == [
+        (1, 3, 123456),
+        (2, 3, 10),
+        (3, 3, 123456),
+    ], "Invalid carried readings"
+
+    # Nodes don't share their state
+    assert decoder.decode("app", 2, encode_frame([changed], delta=True)) == (
+        [changed],
+        [],
+    ), "Invalid decoded delta frame of another Node"
+
+
+# Binary frames received by the backend end up as Readings
+@pytest.mark.asyncio
+async def test_handle_frame(app_client: TestClient):
+    from backend.app import readingBuffer
+
+    o = db.Organization(organizationName="foo")
+    await o.save()
+    a = db.Application(applicationName="bar", organization=o.id)
+    await a.save()
+    node = db.Node(
+        nodeID=123,
+        nodeName="nodeName",
+        application=a.id,
+        state=NodeState.RUNNING,
+        lastSeenAt=datetime.now(),
+    )
+    await node.save()
+    # Done setup
+
+    frame = encode_frame([make_payload("window", x, 1) for x in [1, 2, 3]])
+    await handle_message(str(a.id), 123, "payload", frame)
+    await readingBuffer.flush()
+
+    readings = await db.Reading.find_all().to_list()
+    assert sorted(x.canID for x in readings) == [1, 2, 3], "Invalid stored readings"
+    assert all(
+        x.name == "w2" and x.value == 123456 for x in readings
+    ), "Invalid stored readings"
+
+
+# Unchanged readings of a delta frame fill the aggregated series only
+@pytest.mark.asyncio
+async def test_handle_delta_frame(app_client: TestClient):
+    from backend.app import readingBuffer
+
+    o = db.Organization(organizationName="foo")
+    await o.save()
+    a = db.Application(applicationName="bar", organization=o.id)
+    await a.save()
+    node = db.Node(
+        nodeID=123,
+        nodeName="nodeName",
+        application=a.id,
+        state=NodeState.RUNNING,
+        lastSeenAt=datetime.now(),
+    )
+    await node.save()
+    # Done setup
+
+    keyframe = [make_payload("window", x, 1, readingID=1) for x in [1, 2]]
+    delta = [make_payload("window", 2, 1, count=10, readingID=2)]
+    with patch.object(Node, "on_window_reading", AsyncMock()) as on_window_reading:
+        for frame in [encode_frame(keyframe), encode_frame(delta, delta=True)]:
+            await handle_message(str(a.id), 123, "payload", frame)
+    await readingBuffer.flush()
+
+    # Carried readings don't update the Node
+    assert on_window_reading.await_count == 3, "Invalid Node updates"
+
+    readings = await db.Reading.find_all().to_list()
+    assert len(readings) == 3, "Invalid stored readings"
+
+    rows = await db.AggregatedReading.find(
+        db.AggregatedReading.readingID == 2
+    ).to_list()
+    assert sorted((x.canID, x.w2) for x in rows) == [
+        (1, 123456),
+        (2, 10),
+    ], "Invalid aggregated readings"
@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+from batcher import Batcher
+
+from utils import Data
+
+
+def make_data(sessionID: int, readingID: int) -> Data:
+    return Data(
+        payloadType="w0",
+        nodeID=1,
+        canID=1,
+        sensorNumber=1,
+        sessionID=sessionID,
+        readingID=readingID,
+        value=10,
+    )
+
+
+class TestBatcher:
+    # A batch is flushed once it has max_readings readings
+    def test_size_flush(self):
+        batches: list[list[Data]] = []
+        batcher = Batcher(batches.append, max_readings=3, max_delay_seconds=60)
+
+        for i in range(7):
+            batcher.add(make_data(1, 1))
+
+        assert [len(x) for x in batches] == [3, 3], "Invalid size flushes"
+
+        batcher.flush()
+
+        assert [len(x) for x in batches] == [3, 3, 1], "Pending batch not flushed"
+        assert batcher.readings == 7 and batcher.batches == 3, "Invalid counters"
+
+    # A batch is flushed max_delay_seconds after its first reading
+    def test_deadline_flush(self):
+        flushed = threading.Event()
+        batches: list[list[Data]] = []
+
+        def flush(readings: list[Data]):
+            batches.append(readings)
+            flushed.set()
+
+        batcher = Batcher(flush, max_readings=100, max_delay_seconds=0.2)
+        batcher.start()
+
+        started = time.monotonic()
+        batcher.add(make_data(1, 1))
+        batcher.add(make_data(1, 1))
+
+        assert flushed.wait(5), "Batch was not flushed by its deadline"
+        assert time.monotonic() - started >= 0.15, "Batch was flushed too early"
+        assert [len(x) for x in batches] == [2], "Invalid deadline flush"
+
+    # Readings are grouped by snapshot or by session
+    @pytest.mark.parametrize(
+        "group_by,sizes", [("reading", [1, 1, 1, 1]), ("session", [2, 2])]
+    )
+    def test_group_by(self, group_by: str, sizes: list[int]):
+        batches: list[list[Data]] = []
+        batcher = Batcher(batches.append, group_by=group_by, max_delay_seconds=60)
+
+        for sessionID in [1, 2]:
+            for readingID in [1, 2]:
+                batcher.add(make_data(sessionID, readingID))
+        batcher.flush()
+
+        assert sorted(len(x) for x in batches) == sizes, "Invalid grouping"
+        assert all(
+            len({x.sessionID for x in batch}) == 1 for batch in batches
+        ), "Sessions were mixed in a batch"
@@ -0,0 +1,113 @@
+import threading
+import time
+
+import requests
+from containers import ContainerCache
+from mock import MagicMock, patch
+
+from utils import MobiusRequest, content_instance
+
+
+def make_response(status_code: int, body=None) -> requests.Response:
+    response = MagicMock(spec=requests.Response)
+    response.status_code = status_code
+    response.json.return_value = body
+
+    if status_code >= 400:
+        error = requests.HTTPError(f"{status_code}", response=response)
+        response.raise_for_status.side_effect = error
+
+    return response
+
+
+def insert(sessionID: int) -> MobiusRequest:
+    return content_instance(sessionID, 1, {"foo": "bar"})
+
+
+class TestContainerCache:
+    # Discovery loads the most recent session containers
+    def test_warm(self):
+        session = MagicMock()
+        session.get.return_value = make_response(
+            200, {"m2m:uril": ["Mobius/ae/10", "Mobius/ae/30", "Mobius/ae/20", "x/ae"]}
+        )
+        cache = ContainerCache(max_sessions=2)
+
+        cache.warm(session, 1)
+
+        assert len(cache) == 2, "Invalid number of known containers"
+        with patch("containers.send") as send:
+            cache.ensure(session, 1, 30)
+            cache.ensure(session, 1, 20)
+
+        assert not send.called, "Known containers were created"
+
+    # Servers not answering discovery requests don't stop the adapter
+    def test_warm_unsupported(self):
+        session = MagicMock()
+        cache = ContainerCache()
+
+        for body in [{"foo": "bar"}, None, {"m2m:uril": 123}]:
+            session.get.return_value = make_response(200, body)
+            cache.warm(session, 1)
+
+        assert len(cache) == 0, "Invalid known containers"
+
+    # Concurrent requests of a new session create its container once
+    def test_concurrent_ensure(self):
+        created = []
+
+        def send(session, timeout, request: MobiusRequest):
+            if request.resourceType == 3:
+                # Let the other threads pile up
+                time.sleep(0.2)
+                created.append(request.sessionID)
+
+        cache = ContainerCache()
+        with patch("containers.send", side_effect=send):
+            threads = [
+                threading.Thread(target=cache.send, args=(None, 1, insert(42)))
+                for _ in range(10)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert created == [42], "Container was not created exactly once"
+        assert cache.created == 1, "Creation was not counted"
+        assert cache.waited + cache.hits == 9, "Other requests didn't wait"
+
+    # A container deleted behind our back is created again
+    def test_discard_on_404(self):
+        calls = []
+
+        def send(session, timeout, request: MobiusRequest):
+            calls.append(request.resourceType)
+            if request.resourceType == 4 and len(calls) == 2:
+                make_response(404).raise_for_status()
+
+        cache = ContainerCache()
+        with patch("containers.send", side_effect=send):
+            try:
+                cache.send(None, 1, insert(42))
+                raise AssertionError("404 was not raised")
+            except requests.HTTPError:
+                pass
+
+            cache.send(None, 1, insert(42))
+
+        assert calls == [3, 4, 3, 4], "Container was not created again"
+
+    # A failed creation is reported to every waiting request
+    def test_failed_creation(self):
+        cache = ContainerCache()
+
+        with patch("containers.send", side_effect=requests.ConnectionError("down")):
+            try:
+                cache.ensure(None, 1, 42)
+                raise AssertionError("Failure was not raised")
+            except requests.ConnectionError:
+                pass
+
+        assert len(cache) == 0, "Failed container was cached"
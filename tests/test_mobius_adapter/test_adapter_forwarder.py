@@ -0,0 +1,78 @@
+import threading
+
+import pytest
+from forwarder import Forwarder
+from mock import MagicMock, patch
+
+from utils import MobiusRequest
+
+
+def make_request(ri: str, sessionID: int = 1) -> MobiusRequest:
+    return MobiusRequest(
+        path=f"/{sessionID}", resourceType=4, ri=ri, body={}, sessionID=sessionID
+    )
+
+
+class TestForwarder:
+    # Full queues drop the oldest or the newest request, into the spool
+    @pytest.mark.parametrize(
+        "overflow,sent,dropped",
+        [("drop_oldest", ["b", "c"], "a"), ("drop_newest", ["a", "b"], "c")],
+    )
+    def test_overflow(self, overflow: str, sent: list[str], dropped: str):
+        spool = MagicMock()
+        requests: list[str] = []
+
+        with patch("forwarder.send", lambda s, t, x: requests.append(x.ri)):
+            forwarder = Forwarder(
+                workers=1, queue_size=2, overflow=overflow, spool=spool
+            )
+
+        # Nothing is sent before starting the workers
+        for ri in ["a", "b", "c"]:
+            forwarder.submit(1, make_request(ri))
+
+        forwarder.start()
+        forwarder.stop()
+
+        assert requests == sent, "Invalid sent requests"
+        assert forwarder.dropped == 1, "Drop was not counted"
+        assert [x.args[0].ri for x in spool.put.call_args_list] == [
+            dropped
+        ], "Dropped request was not spooled"
+
+    # Requests with the same key are sent in order by the same worker
+    def test_key_affinity(self):
+        lock = threading.Lock()
+        workers: dict[int, set[str]] = {}
+        order: dict[int, list[str]] = {}
+
+        def send(session, timeout, request: MobiusRequest):
+            with lock:
+                workers.setdefault(request.sessionID, set()).add(
+                    threading.current_thread().name
+                )
+                order.setdefault(request.sessionID, []).append(request.ri)
+
+        with patch("forwarder.send", send):
+            forwarder = Forwarder(workers=4)
+        forwarder.start()
+
+        for i in range(200):
+            forwarder.submit(i % 10, make_request(str(i), i % 10))
+        forwarder.stop()
+
+        assert forwarder.sent == 200, "Invalid number of sent requests"
+        assert all(
+            len(x) == 1 for x in workers.values()
+        ), "Requests of a key were sent by different workers"
+        assert all(
+            [int(x) for x in y] == sorted(int(x) for x in y) for y in order.values()
+        ), "Requests of a key were sent out of order"
+        assert (
+            len(set.union(*workers.values())) > 1
+        ), "Keys were not spread across workers"
+
+    def test_invalid_overflow(self):
+        with pytest.raises(ValueError):
+            Forwarder(overflow="foo")
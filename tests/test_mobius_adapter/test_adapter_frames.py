@@ -0,0 +1,58 @@
+from frames import (
+    DELTA_FRAME_VERSION,
+    FRAME_HEADER,
+    FRAME_READING,
+    FRAME_VERSION,
+    FrameDecoder,
+)
+
+
+def make_frame(version: int, readingID: int, readings: list[tuple]) -> bytes:
+    return FRAME_HEADER.pack(version, len(readings), 1, readingID) + b"".join(
+        FRAME_READING.pack(*x) for x in readings
+    )
+
+
+# (payloadType, canID, sensorNumber, value, count)
+KEYFRAME = [(1, 1, 1, 0, 10), (1, 2, 1, 0, 20)]
+DELTA = [(1, 2, 1, 0, 25)]
+
+
+# Delta frames carry forward the readings of the previous frames
+def test_delta_frame():
+    decoder = FrameDecoder()
+
+    assert len(decoder.decode("app", 1, make_frame(FRAME_VERSION, 1, KEYFRAME))) == 2
+
+    readings = decoder.decode("app", 1, make_frame(DELTA_FRAME_VERSION, 2, DELTA))
+
+    assert sorted((x.canID, x.value, x.readingID) for x in readings) == [
+        (1, 10, 2),
+        (2, 25, 2),
+    ], "Invalid carried forward readings"
+
+
+# Nodes with the same nodeID in different applications don't mix
+def test_delta_frame_applications():
+    decoder = FrameDecoder()
+
+    decoder.decode("foo", 1, make_frame(FRAME_VERSION, 1, KEYFRAME))
+    decoder.decode("bar", 1, make_frame(FRAME_VERSION, 1, [(1, 3, 1, 0, 30)]))
+
+    readings = decoder.decode("foo", 1, make_frame(DELTA_FRAME_VERSION, 2, DELTA))
+
+    assert sorted((x.canID, x.value) for x in readings) == [
+        (1, 10),
+        (2, 25),
+    ], "Readings of another application were carried forward"
+
+
+# Without carry_forward delta frames yield what they carry
+def test_delta_frame_shared():
+    decoder = FrameDecoder(carry_forward=False)
+
+    decoder.decode("app", 1, make_frame(FRAME_VERSION, 1, KEYFRAME))
+    readings = decoder.decode("app", 1, make_frame(DELTA_FRAME_VERSION, 2, DELTA))
+
+    assert [(x.canID, x.value) for x in readings] == [(2, 25)], "Invalid readings"
+    assert decoder.partial == 1, "Partial snapshot was not counted"
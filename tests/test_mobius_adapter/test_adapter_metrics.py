@@ -0,0 +1,66 @@
+from metrics import Registry
+
+
+# Samples in the Prometheus text format
+class TestRegistry:
+    def test_counter_gauge(self):
+        registry = Registry()
+        counter = registry.counter("foo_total", "Foo")
+        gauge = registry.gauge("bar", "Bar")
+
+        counter.inc(topic="payload")
+        counter.inc(2, topic="payload")
+        counter.inc(topic="sessions")
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+
+        assert registry.render() == (
+            "# HELP foo_total Foo\n"
+            "# TYPE foo_total counter\n"
+            'foo_total{topic="payload"} 3\n'
+            'foo_total{topic="sessions"} 1\n'
+            "# HELP bar Bar\n"
+            "# TYPE bar gauge\n"
+            "bar 1\n"
+        ), "Invalid counter and gauge samples"
+        assert counter.total() == 4, "Invalid counter total"
+
+    def test_histogram(self):
+        registry = Registry()
+        histogram = registry.histogram("baz_seconds", "Baz", [0.1, 1])
+
+        for value in [0.05, 0.5, 0.5, 2]:
+            histogram.observe(value, status="201")
+
+        assert registry.render() == (
+            "# HELP baz_seconds Baz\n"
+            "# TYPE baz_seconds histogram\n"
+            'baz_seconds_bucket{status="201",le="0.1"} 1\n'
+            'baz_seconds_bucket{status="201",le="1"} 3\n'
+            'baz_seconds_bucket{status="201",le="+Inf"} 4\n'
+            'baz_seconds_sum{status="201"} 3.05\n'
+            'baz_seconds_count{status="201"} 4\n'
+        ), "Invalid histogram samples"
+        assert histogram.count() == 4, "Invalid histogram count"
+
+    def test_collected(self):
+        registry = Registry()
+        registry.collect("depth", "Depth", "gauge", lambda: {"0": 2, "1": 0}, "worker")
+        registry.collect("sent_total", "Sent", "counter", lambda: 7)
+
+        def fail():
+            raise RuntimeError("foo")
+
+        # A failing collector doesn't break the others
+        registry.collect("broken", "Broken", "gauge", fail)
+
+        assert registry.render() == (
+            "# HELP depth Depth\n"
+            "# TYPE depth gauge\n"
+            'depth{worker="0"} 2\n'
+            'depth{worker="1"} 0\n'
+            "# HELP sent_total Sent\n"
+            "# TYPE sent_total counter\n"
+            "sent_total 7\n"
+        ), "Invalid collected samples"
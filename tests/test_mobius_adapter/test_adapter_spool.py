@@ -0,0 +1,96 @@
+import os
+import tempfile
+
+from mock import patch
+from spool import Spool
+
+from utils import MobiusRequest
+
+
+def make_request(ri: str) -> MobiusRequest:
+    return MobiusRequest(path="/1", resourceType=4, ri=ri, body={}, sessionID=1)
+
+
+class TestSpool:
+    # Spooling a request twice keeps a single copy
+    def test_dedup(self):
+        with tempfile.TemporaryDirectory() as folder:
+            spool = Spool(os.path.join(folder, "spool.sqlite"), base_backoff_seconds=0)
+
+            spool.put(make_request("a"))
+            spool.put(make_request("a"), attempts=3)
+            spool.put(make_request("b"))
+
+            assert len(spool) == 2, "Duplicate request was spooled"
+            assert spool.spooled == 2, "Duplicate request was counted"
+            assert [(x.ri, y) for _, x, y in spool.due(10)] == [
+                ("a", 0),
+                ("b", 0),
+            ], "Invalid spooled requests"
+
+    # The oldest requests are evicted beyond max_requests
+    def test_evict(self):
+        with tempfile.TemporaryDirectory() as folder:
+            spool = Spool(
+                os.path.join(folder, "spool.sqlite"),
+                max_requests=2,
+                base_backoff_seconds=0,
+            )
+
+            for ri in ["a", "b", "c"]:
+                spool.put(make_request(ri))
+
+            assert len(spool) == 2 and spool.evicted == 1, "Invalid eviction"
+            assert [x.ri for _, x, _ in spool.due(10)] == [
+                "b",
+                "c",
+            ], "Invalid evicted request"
+
+    # Requests are due once their backoff elapsed, doubling at each retry
+    def test_backoff(self):
+        with tempfile.TemporaryDirectory() as folder:
+            spool = Spool(
+                os.path.join(folder, "spool.sqlite"),
+                base_backoff_seconds=10,
+                max_backoff_seconds=100,
+            )
+
+            # Jitter is between half and the whole backoff
+            assert all(
+                5 <= spool.backoff(0) <= 10 for _ in range(100)
+            ), "Invalid first backoff"
+            assert all(
+                50 <= spool.backoff(10) <= 100 for _ in range(100)
+            ), "Backoff exceeds its maximum"
+
+            with patch("spool.time.time", return_value=1000):
+                spool.put(make_request("a"))
+
+            with patch("spool.time.time", return_value=1004):
+                assert spool.due(10) == [], "Request due before its backoff"
+            with patch("spool.time.time", return_value=1010):
+                [(id, request, attempts)] = spool.due(10)
+
+                spool.retry(id, attempts + 1)
+
+            with patch("spool.time.time", return_value=1019):
+                assert spool.due(10) == [], "Retry due before its backoff"
+            with patch("spool.time.time", return_value=1030):
+                assert [(x.ri, y) for _, x, y in spool.due(10)] == [
+                    ("a", 1)
+                ], "Retry was not due"
+
+            spool.ack(id)
+
+            assert len(spool) == 0, "Acknowledged request was kept"
+
+    # Spooled requests survive a restart
+    def test_reopen(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "spool.sqlite")
+            Spool(path).put(make_request("a"))
+
+            spool = Spool(path, base_backoff_seconds=0)
+
+            assert len(spool) == 1, "Invalid size after reopening"
+            assert spool.oldest_age() >= 0, "Invalid oldest age"
@@ -0,0 +1,93 @@
+import importlib.util
+import os
+import sys
+import tempfile
+import time
+
+import pytest
+from can_protocol import DecodedMessage, MessageType
+from mock import MagicMock
+
+NODE = os.path.join(os.path.dirname(__file__), "..", "..", "node")
+
+
+# mobius_adapter has its own app and frames modules, earlier on the path
+@pytest.fixture
+def node_app(monkeypatch):
+    for name in ["frames", "compression", "app"]:
+        spec = importlib.util.spec_from_file_location(
+            name, os.path.join(NODE, f"{name}.py")
+        )
+        module = importlib.util.module_from_spec(spec)
+        monkeypatch.setitem(sys.modules, name, module)
+        spec.loader.exec_module(module)
+
+    monkeypatch.setattr(module, "BYPASS_CAN", True)
+    return module
+
+
+def make_config(folder: str) -> dict:
+    return {
+        "node_info": {"applicationID": "app", "nodeID": 1, "nodeName": "node"},
+        "mqtt": {
+            "url": "localhost",
+            "port": 1883,
+            "tls": False,
+            "user": "user",
+            "password": "password",
+            "keep_alive_seconds": 30,
+        },
+        "outbox": {"path": os.path.join(folder, "outbox.sqlite")},
+        "can": {"interval_seconds": 60, "detectors": 1},
+    }
+
+
+def make_message(sipm: int, window: int) -> DecodedMessage:
+    return {
+        "message_type": MessageType.RETURN_COUNT_WINDOW,
+        "n_detector": 1,
+        "sipm": sipm,
+        "value": window,
+        "count": 100,
+        "sessionID": 1,
+        "readingID": 1,
+    }
+
+
+def wait_for(condition, seconds: float = 5) -> bool:
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+
+    return condition()
+
+
+class TestNode:
+    # A Node started with the broker down keeps its readings in the Outbox
+    # and sends them once connected
+    def test_broker_down(self, node_app, monkeypatch):
+        client = MagicMock()
+        client.connect.side_effect = ConnectionRefusedError()
+        monkeypatch.setattr(node_app.mqtt, "Client", lambda: client)
+
+        with tempfile.TemporaryDirectory() as folder:
+            node = node_app.Node(make_config(folder))
+
+            assert client.connect_async.called, "Connection was not deferred"
+
+            node.publish_readings(
+                [make_message(sipm, window) for sipm in [1, 2] for window in range(3)]
+            )
+
+            assert len(node.outbox) == 1, "Readings were not kept in the Outbox"
+            assert not client.publish.called, "Readings were sent while offline"
+
+            client.on_connect(client, None, {}, 0)
+
+            assert wait_for(
+                lambda: any(
+                    x.args[0] == "app/1/payload" for x in client.publish.call_args_list
+                )
+            ), "Readings were not sent once connected"
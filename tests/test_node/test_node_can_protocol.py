@@ -0,0 +1,52 @@
+from random import Random
+
+from can.message import Message
+from can_protocol import MessageType, decode, decode_batch
+from mock_bus import pack_reply
+
+
+def make_frames(count: int) -> list[bytes]:
+    random = Random(42)
+    frames = []
+
+    for _ in range(count):
+        kind = random.choice(
+            [MessageType.RETURN_COUNT_WINDOW, MessageType.RETURN_COUNT_TOTAL]
+        )
+        frames.append(
+            pack_reply(
+                random.randint(0, 255),
+                random.randint(0, 255),
+                random.randint(0, 2**24 - 1),
+                kind,
+                random.randint(1, 16),
+            )
+        )
+
+    return frames
+
+
+# The batch decoder yields what the per-frame decoder does
+def test_decode_batch_equivalence():
+    frames = make_frames(1000)
+
+    expected = [decode(Message(data=x), 12, 34) for x in frames]
+    decoded = decode_batch(b"".join(frames))
+
+    assert decoded.messages(12, 34) == expected, "Decoders disagree"
+    assert decode_batch([Message(data=x) for x in frames]).messages(12, 34) == (
+        expected
+    ), "Decoders disagree on Messages"
+
+
+# Unknown replies are counted and skipped
+def test_decode_batch_unknown():
+    frames = make_frames(2)
+    unknown = pack_reply(0, 0, 0, MessageType.PING, 1)
+
+    decoded = decode_batch(frames[0] + unknown + frames[1])
+
+    assert decoded.unknown == 1, "Unknown reply was not counted"
+    assert decoded.messages(1, 1) == [
+        decode(Message(data=x), 1, 1) for x in frames
+    ], "Invalid decoded replies"
@@ -0,0 +1,79 @@
+import threading
+
+import can_protocol
+from can.interface import Bus
+from can.message import Message
+from can_protocol import MessageType
+from irma_bus import IrmaBus
+from mock_bus import pack_reply
+
+CHANNEL = "test-irma-bus"
+
+
+def reply(window: int, sipm: int, detector: int, count: int) -> Message:
+    return Message(
+        arbitration_id=detector,
+        is_extended_id=False,
+        data=pack_reply(
+            window | (sipm - 1) << 7,
+            0,
+            count,
+            MessageType.RETURN_COUNT_WINDOW,
+            detector,
+        ),
+    )
+
+
+class TestIrmaBus:
+    # Replies are decoded and handed over as soon as they're received
+    def test_listening(self):
+        bus = IrmaBus("virtual", CHANNEL, 125000, detectors=2)
+        detectors = Bus(interface="virtual", channel=CHANNEL)
+
+        received = []
+        done = threading.Event()
+
+        def callback(message: can_protocol.DecodedMessage):
+            received.append(message)
+            if len(received) == 2:
+                done.set()
+
+        try:
+            bus.start_listening(callback)
+            detectors.send(reply(1, 2, 1, 70000))
+            detectors.send(reply(2, 1, 2, 5))
+
+            assert done.wait(5), "Replies were not received"
+        finally:
+            bus.stop()
+            detectors.shutdown()
+
+        assert [
+            (x["n_detector"], x["sipm"], x["value"], x["count"]) for x in received
+        ] == [(1, 2, 1, 70000), (2, 1, 2, 5)], "Invalid decoded replies"
+
+    # A request completes once every detector replied
+    def test_request(self):
+        bus = IrmaBus("virtual", CHANNEL, 125000, detectors=2)
+        detectors = Bus(interface="virtual", channel=CHANNEL)
+
+        # Fake detectors replying to the window requests
+        def answer():
+            request = detectors.recv(5)
+            if request is not None:
+                for detector in [1, 2]:
+                    detectors.send(reply(request.data[0] & 0b111111, 1, detector, 1))
+
+        try:
+            bus.start_listening(lambda _: None)
+            thread = threading.Thread(target=answer)
+            thread.start()
+
+            assert bus.request(
+                can_protocol.get_window(can_protocol.Window.W2, can_protocol.Sipm.S1),
+                (MessageType.RETURN_COUNT_WINDOW, 1, 1),
+            ), "Request did not complete"
+            thread.join()
+        finally:
+            bus.stop()
+            detectors.shutdown()
@@ -0,0 +1,43 @@
+import pytest
+from can_protocol import MessageType, decode_batch
+from mock_bus import TrafficGenerator
+
+
+def generate(seed: int) -> list[bytes]:
+    generator = TrafficGenerator(detectors=4, seed=seed, alert_probability=0.5)
+    frames = []
+
+    for _ in range(3):
+        generator.start_session()
+        frames += [bytes(generator.window_frames()) for _ in range(5)]
+        frames.append(bytes(generator.total_frames()))
+
+    return frames
+
+
+class TestTrafficGenerator:
+    # Same seed, same traffic
+    def test_seed(self):
+        assert generate(42) == generate(42), "Seeded traffic is not reproducible"
+        assert generate(42) != generate(43), "Seed is ignored"
+
+    # Window counts never decrease within a session
+    def test_window_frames(self):
+        generator = TrafficGenerator(detectors=2, windows=3, seed=1)
+        generator.start_session()
+
+        first = decode_batch(generator.window_frames())
+        second = decode_batch(generator.window_frames())
+
+        assert len(first) == 2 * 2 * 3, "Invalid number of replies"
+        assert set(first.message_type) == {
+            MessageType.RETURN_COUNT_WINDOW
+        }, "Invalid reply type"
+        assert all(
+            x <= y for x, y in zip(first.count, second.count)
+        ), "Window counts decreased"
+
+    # The backend only stores 3 windows
+    def test_windows(self):
+        with pytest.raises(ValueError):
+            TrafficGenerator(windows=4)
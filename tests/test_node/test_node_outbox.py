@@ -0,0 +1,193 @@
+import os
+import tempfile
+import threading
+import time
+
+from outbox import Outbox, OutboxForwarder
+
+
+class PublishInfo:
+    def __init__(self, mid: int):
+        self.mid = mid
+
+
+# Hands out mids like paho, acknowledging right away if early_ack
+class FakeClient:
+    def __init__(self, forwarder_ref: list, early_ack: bool = False):
+        self._forwarder_ref = forwarder_ref
+        self._early_ack = early_ack
+        self._lock = threading.Lock()
+        self.mid = 0
+        self.published: list[tuple[int, str, bytes]] = []
+
+    def publish(self, topic: str, payload: bytes, qos: int = 0) -> PublishInfo:
+        with self._lock:
+            self.mid += 1
+            mid = self.mid
+            self.published.append((mid, topic, payload))
+
+        if self._early_ack:
+            self._forwarder_ref[0].on_publish(mid)
+
+        return PublishInfo(mid)
+
+
+def wait_for(condition, seconds: float = 5) -> bool:
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+
+    return condition()
+
+
+class TestOutbox:
+    # The oldest messages are evicted beyond max_messages
+    def test_put_evict(self):
+        with tempfile.TemporaryDirectory() as folder:
+            outbox = Outbox(os.path.join(folder, "outbox.sqlite"), max_messages=3)
+
+            for i in range(5):
+                outbox.put(f"topic/{i}", bytes([i]))
+
+            assert len(outbox) == 3, "Invalid outbox size"
+            assert outbox.evicted == 2, "Evictions were not counted"
+            assert [x[1] for x in outbox.pending(0, 10)] == [
+                "topic/2",
+                "topic/3",
+                "topic/4",
+            ], "Invalid evicted messages"
+
+    # Messages are pending in order until acknowledged
+    def test_pending_ack(self):
+        with tempfile.TemporaryDirectory() as folder:
+            outbox = Outbox(os.path.join(folder, "outbox.sqlite"))
+
+            for i in range(4):
+                outbox.put("topic", bytes([i]))
+
+            pending = outbox.pending(0, 2)
+
+            assert [x[2] for x in pending] == [b"\x00", b"\x01"], "Invalid order"
+            assert [x[2] for x in outbox.pending(pending[-1][0], 10)] == [
+                b"\x02",
+                b"\x03",
+            ], "Invalid pending after id"
+
+            outbox.ack(pending[1][0])
+
+            assert len(outbox) == 3, "Acknowledged message was kept"
+            assert [x[2] for x in outbox.pending(0, 10)] == [
+                b"\x00",
+                b"\x02",
+                b"\x03",
+            ], "Invalid pending messages"
+
+    # Messages not acknowledged survive a restart
+    def test_reopen(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "outbox.sqlite")
+            outbox = Outbox(path)
+            outbox.put("topic", b"foo")
+            outbox.put("topic", b"bar")
+            outbox.ack(outbox.pending(0, 1)[0][0])
+            del outbox
+
+            outbox = Outbox(path)
+
+            assert len(outbox) == 1, "Invalid size after reopening"
+            assert [x[2] for x in outbox.pending(0, 10)] == [
+                b"bar"
+            ], "Invalid messages after reopening"
+
+
+class TestOutboxForwarder:
+    def start(
+        self, outbox: Outbox, early_ack: bool = False, replay_rate: float = 1000
+    ) -> tuple[OutboxForwarder, FakeClient]:
+        ref: list = []
+        client = FakeClient(ref, early_ack)
+        forwarder = OutboxForwarder(outbox, client, replay_rate=replay_rate)
+        ref.append(forwarder)
+
+        forwarder.start()
+        forwarder.on_connect()
+        return forwarder, client
+
+    # Acknowledgements may come in any order
+    def test_out_of_order_acks(self):
+        with tempfile.TemporaryDirectory() as folder:
+            outbox = Outbox(os.path.join(folder, "outbox.sqlite"))
+            for i in range(5):
+                outbox.put("topic", bytes([i]))
+
+            forwarder, client = self.start(outbox)
+
+            assert wait_for(lambda: len(client.published) == 5), "Not published"
+
+            for mid in [3, 1, 5, 2]:
+                forwarder.on_publish(mid)
+
+            assert [x[2] for x in outbox.pending(0, 10)] == [
+                b"\x03"
+            ], "Invalid acknowledged messages"
+
+            forwarder.on_publish(4)
+
+            assert len(outbox) == 0, "Acknowledged messages were kept"
+
+    # Acknowledgements may come before publish() returns
+    def test_early_acks(self):
+        with tempfile.TemporaryDirectory() as folder:
+            outbox = Outbox(os.path.join(folder, "outbox.sqlite"))
+            for i in range(3):
+                outbox.put("topic", bytes([i]))
+
+            self.start(outbox, early_ack=True)
+
+            assert wait_for(lambda: len(outbox) == 0), "Messages were not removed"
+
+    # Acknowledgements of other messages don't remove later ones
+    def test_foreign_acks(self):
+        with tempfile.TemporaryDirectory() as folder:
+            outbox = Outbox(os.path.join(folder, "outbox.sqlite"))
+            forwarder, client = self.start(outbox)
+
+            # A QoS 0 status message with the mid the next reading gets
+            forwarder.on_publish(1)
+
+            outbox.put("topic", b"foo")
+            forwarder.notify()
+
+            assert wait_for(lambda: len(client.published) == 1), "Not published"
+            assert len(outbox) == 1, "Message removed before being acknowledged"
+
+            forwarder.on_publish(1)
+
+            assert len(outbox) == 0, "Acknowledged message was kept"
+
+    # Live messages aren't throttled, only a backlog is
+    def test_throttle_backlog(self):
+        with tempfile.TemporaryDirectory() as folder:
+            outbox = Outbox(os.path.join(folder, "outbox.sqlite"))
+            forwarder, client = self.start(outbox, replay_rate=2)
+
+            started = time.monotonic()
+            for i in range(3):
+                outbox.put("topic", bytes([i]))
+            forwarder.notify()
+
+            assert wait_for(lambda: len(client.published) == 3, 1), "Not published"
+            assert time.monotonic() - started < 1, "Live messages were throttled"
+
+            # More than a batch of max_inflight messages
+            for mid in range(1, 4):
+                forwarder.on_publish(mid)
+            for i in range(25):
+                outbox.put("topic", bytes([i]))
+            forwarder.notify()
+
+            time.sleep(1)
+
+            assert len(client.published) < 3 + 20, "Backlog was not throttled"
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import threading
+
+import can_protocol
+from can.interface import Bus
+from can.message import Message
+from can_protocol import MessageType
+from irma_bus import IrmaBus
+from mock_bus import pack_reply
+from recording import Recorder, Replayer
+
+CHANNEL = "test-recording"
+
+
+def reply(detector: int, count: int) -> Message:
+    return Message(
+        arbitration_id=detector,
+        is_extended_id=False,
+        data=pack_reply(0, 0, count, MessageType.RETURN_COUNT_WINDOW, detector),
+    )
+
+
+def request() -> Message:
+    return can_protocol.get_window(can_protocol.Window.W1, can_protocol.Sipm.S1)
+
+
+def record(path: str, cycles: list[list[Message]]):
+    recorder = Recorder(path)
+    for replies in cycles:
+        recorder.record(request(), is_rx=False)
+        for message in replies:
+            recorder.record(message)
+    recorder.stop()
+
+
+def receive(bus: Bus, count: int) -> list[Message]:
+    received = []
+    while len(received) < count and (message := bus.recv(1)) is not None:
+        received.append(message)
+
+    return received
+
+
+class TestRecording:
+    # Replayed frames are the recorded ones
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "can.asc")
+            replies = [reply(1, 10), reply(2, 70000), reply(3, 5)]
+            record(path, [replies])
+
+            listener = Bus(interface="virtual", channel=CHANNEL)
+            sender = Bus(interface="virtual", channel=CHANNEL)
+            try:
+                replayer = Replayer(path, sender, speed=None)
+                replayer.replay()
+                received = receive(listener, 3)
+
+                assert replayer.frames == 3, "Requests were replayed"
+                assert [(x.arbitration_id, bytes(x.data)) for x in received] == [
+                    (x.arbitration_id, bytes(x.data)) for x in replies
+                ], "Invalid replayed frames"
+
+                Replayer(path, sender, speed=None, send_requests=True).replay()
+                received = receive(listener, 4)
+
+                assert [bytes(x.data) for x in received] == [bytes(request().data)] + [
+                    bytes(x.data) for x in replies
+                ], "Invalid replayed requests"
+            finally:
+                listener.shutdown()
+                sender.shutdown()
+
+    # Each replayed reading cycle gets its own readingID
+    def test_replay_reading_cycles(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "can.asc")
+            record(path, [[reply(1, 10)], [reply(1, 20)], [reply(1, 30)]])
+
+            bus = IrmaBus("virtual", CHANNEL, 125000, detectors=1)
+            sender = Bus(interface="virtual", channel=CHANNEL)
+
+            received = []
+            done = threading.Event()
+
+            def callback(message: can_protocol.DecodedMessage):
+                received.append(message)
+                if len(received) == 3:
+                    done.set()
+
+            try:
+                bus.start_listening(callback)
+                Replayer(path, sender, speed=None, send_requests=True).replay()
+
+                assert done.wait(5), "Replies were not received"
+            finally:
+                bus.stop()
+                sender.shutdown()
+
+            assert [x["count"] for x in received] == [10, 20, 30], "Invalid replies"
+            assert (
+                len({x["readingID"] for x in received}) == 3
+            ), "Reading cycles share a readingID"
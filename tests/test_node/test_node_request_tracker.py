@@ -0,0 +1,56 @@
+from can_protocol import DecodedMessage, MessageType
+from mock import patch
+from request_tracker import RequestTracker
+
+KEY = (MessageType.RETURN_COUNT_WINDOW, 0, 1)
+
+
+def make_reply(detector: int) -> DecodedMessage:
+    return {
+        "message_type": MessageType.RETURN_COUNT_WINDOW,
+        "n_detector": detector,
+        "sipm": 1,
+        "value": 0,
+        "count": 100,
+        "sessionID": 1,
+        "readingID": 1,
+    }
+
+
+class TestRequestTracker:
+    # The timeout follows the latency of the complete requests
+    def test_adaptive_timeout(self):
+        tracker = RequestTracker(
+            detectors=2, min_timeout=0.05, max_timeout=0.5, latency_factor=3
+        )
+
+        assert tracker.timeout == 0.5, "Timeout should start from the maximum"
+
+        with patch("request_tracker.time.monotonic", side_effect=[0, 0.1, 0.1]):
+            tracker.sent(KEY)
+            tracker.reply(make_reply(1))
+            tracker.reply(make_reply(2))
+
+        assert tracker.wait(KEY), "Complete request was not reported"
+        assert abs(tracker.timeout - 0.3) < 1e-9, "Timeout didn't follow latency"
+
+        with patch("request_tracker.time.monotonic", side_effect=[0, 0.001, 0.001]):
+            tracker.sent(KEY)
+            tracker.reply(make_reply(1))
+            tracker.reply(make_reply(2))
+        tracker.wait(KEY)
+
+        assert tracker.timeout > 0.05, "Latency was not smoothed"
+
+    # Missing replies time out, without teaching the latency
+    def test_timeout(self):
+        tracker = RequestTracker(detectors=2, max_timeout=0.05)
+
+        tracker.sent(KEY)
+        tracker.reply(make_reply(1))
+        # Replies to requests not sent are ignored
+        tracker.reply({**make_reply(2), "value": 1})
+
+        assert not tracker.wait(KEY), "Incomplete request was reported complete"
+        assert tracker.timeouts == 1, "Timeout was not counted"
+        assert tracker.timeout == 0.05, "Timeout taught the latency"
@@ -0,0 +1,80 @@
+from can_protocol import DecodedMessage, MessageType
+from snapshot import SnapshotCollector
+
+
+def make_message(
+    detector: int,
+    sipm: int,
+    window: int,
+    message_type: MessageType = MessageType.RETURN_COUNT_WINDOW,
+    readingID: int = 1,
+) -> DecodedMessage:
+    return {
+        "message_type": message_type,
+        "n_detector": detector,
+        "sipm": sipm,
+        "value": window,
+        "count": 100,
+        "sessionID": 1,
+        "readingID": readingID,
+    }
+
+
+class TestSnapshotCollector:
+    # A snapshot is released once every detector replied for every window
+    def test_complete(self):
+        collector = SnapshotCollector(detectors=2, windows=3)
+        messages = [
+            make_message(detector, sipm, window)
+            for detector in [1, 2]
+            for sipm in [1, 2]
+            for window in range(3)
+        ]
+
+        for message in messages[:-1]:
+            assert collector.add(message) is None, "Snapshot released too early"
+
+        assert collector.add(messages[-1]) == messages, "Invalid snapshot"
+        assert collector.next_deadline_in() is None, "Snapshot was not released"
+
+    # Totals only need one reply per sipm
+    def test_complete_totals(self):
+        collector = SnapshotCollector(detectors=1)
+
+        assert (
+            collector.add(make_message(1, 1, 0, MessageType.RETURN_COUNT_TOTAL)) is None
+        ), "Totals released too early"
+        assert (
+            collector.add(make_message(1, 2, 0, MessageType.RETURN_COUNT_TOTAL))
+            is not None
+        ), "Totals were not released"
+
+    # Reading cycles are collected separately
+    def test_reading_cycles(self):
+        collector = SnapshotCollector(detectors=1, windows=1)
+
+        collector.add(make_message(1, 1, 0, readingID=1))
+        collector.add(make_message(1, 1, 0, readingID=2))
+
+        assert (
+            collector.add(make_message(1, 2, 0, readingID=2)) is not None
+        ), "Reading cycle was not released"
+        assert (
+            collector.add(make_message(1, 2, 0, readingID=1)) is not None
+        ), "Reading cycle was not released"
+
+    # Incomplete snapshots are released by their deadline
+    def test_expired(self):
+        collector = SnapshotCollector(detectors=2, deadline_seconds=60)
+        message = make_message(1, 1, 0)
+        collector.add(message)
+
+        assert 0 < collector.next_deadline_in() <= 60, "Invalid next deadline"
+        assert collector.expired() == [], "Snapshot expired too early"
+
+        collector = SnapshotCollector(detectors=2, deadline_seconds=0)
+        collector.add(message)
+
+        assert collector.next_deadline_in() == 0, "Invalid next deadline"
+        assert collector.expired() == [[message]], "Snapshot did not expire"
+        assert collector.next_deadline_in() is None, "Expired snapshot was kept"